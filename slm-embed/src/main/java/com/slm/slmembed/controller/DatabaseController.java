@@ -2,8 +2,13 @@ package com.slm.slmembed.controller;
 
 import com.slm.slmembed.response.ResponseWrapper;
 import com.slm.slmembed.dto.DatabaseSchemaDto;
+import com.slm.slmembed.dto.QueryResultDto;
+import com.slm.slmembed.dto.SqliteHandleDto;
+import com.slm.slmembed.request.DbConnectionBatchQueryRequest;
 import com.slm.slmembed.request.DbConnectionRequest;
 import com.slm.slmembed.request.DbConnectionWithQueryRequest;
+import com.slm.slmembed.request.SqliteHandleBatchQueryRequest;
+import com.slm.slmembed.request.SqliteHandleQueryRequest;
 import com.slm.slmembed.service.SchemaService;
 import jakarta.validation.Valid;
 import lombok.RequiredArgsConstructor;
@@ -37,6 +42,34 @@ public class DatabaseController {
                 schemaService.executeQuerySQLite(file, query));
     }
 
+    @PostMapping(value = "/sqlite/register", consumes = MediaType.MULTIPART_FORM_DATA_VALUE)
+    public ResponseWrapper<SqliteHandleDto> registerSqliteDatabase(@RequestPart(value = "file") MultipartFile file) {
+        return ResponseWrapper.success(SQLITE_FILE_REGISTERED_SUCCESSFULLY,
+                schemaService.registerSQLite(file));
+    }
+
+    @PostMapping("/get-schema/sqlite/{handle}")
+    public ResponseWrapper<DatabaseSchemaDto> getSqliteSchemaByHandle(@PathVariable String handle) {
+        return ResponseWrapper.success(SQLITE_SCHEMA_RETRIEVED_SUCCESSFULLY,
+                schemaService.getDatabaseSchemaSQLite(handle));
+    }
+
+    @PostMapping("/query/sqlite/{handle}")
+    public ResponseWrapper<List<Map<String, Object>>> querySqliteDatabaseByHandle(
+            @PathVariable String handle,
+            @Valid @RequestBody SqliteHandleQueryRequest request) {
+        return ResponseWrapper.success(SQLITE_QUERY_EXECUTED_SUCCESSFULLY,
+                schemaService.executeQuerySQLite(handle, request.getQuery()));
+    }
+
+    @PostMapping("/query/sqlite/{handle}/batch")
+    public ResponseWrapper<List<QueryResultDto>> querySqliteDatabaseBatch(
+            @PathVariable String handle,
+            @Valid @RequestBody SqliteHandleBatchQueryRequest request) {
+        return ResponseWrapper.success(BATCH_QUERY_EXECUTED_SUCCESSFULLY,
+                schemaService.executeQuerySQLiteBatch(handle, request.getQueries(), request.getTimeoutSeconds()));
+    }
+
     @PostMapping("/get-schema")
     public ResponseWrapper<DatabaseSchemaDto> getDatabaseSchema(@Valid @RequestBody DbConnectionRequest request) {
         return ResponseWrapper.success(SCHEMA_RETRIEVED_SUCCESSFULLY,
@@ -49,6 +82,12 @@ public class DatabaseController {
                 schemaService.queryDatabase(request));
     }
 
+    @PostMapping("/query/batch")
+    public ResponseWrapper<List<QueryResultDto>> queryDatabaseBatch(@Valid @RequestBody DbConnectionBatchQueryRequest request) {
+        return ResponseWrapper.success(BATCH_QUERY_EXECUTED_SUCCESSFULLY,
+                schemaService.queryDatabaseBatch(request));
+    }
+
     @PostMapping("/test-connection")
     public ResponseWrapper<Void> testDatabaseConnection(@Valid @RequestBody DbConnectionRequest request) {
         schemaService.testDatabaseConnection(request);
@@ -0,0 +1,33 @@
+package com.slm.slmembed.dto;
+
+import com.fasterxml.jackson.annotation.JsonInclude;
+import lombok.Getter;
+import lombok.Setter;
+
+import java.util.List;
+import java.util.Map;
+
+/**
+ * DTO for the outcome of one statement in a batch: either rows or an error
+ */
+@Getter
+@Setter
+@JsonInclude(JsonInclude.Include.ALWAYS)
+public class QueryResultDto {
+    private List<Map<String, Object>> data;
+    private Integer code;
+    private String error;
+
+    public static QueryResultDto ofRows(List<Map<String, Object>> rows) {
+        QueryResultDto dto = new QueryResultDto();
+        dto.setData(rows);
+        return dto;
+    }
+
+    public static QueryResultDto ofError(int code, String error) {
+        QueryResultDto dto = new QueryResultDto();
+        dto.setCode(code);
+        dto.setError(error);
+        return dto;
+    }
+}
@@ -0,0 +1,14 @@
+package com.slm.slmembed.dto;
+
+import lombok.Getter;
+import lombok.Setter;
+
+/**
+ * DTO for a registered SQLite file handle
+ */
+@Getter
+@Setter
+public class SqliteHandleDto {
+    private String handle;
+    private long size;
+}
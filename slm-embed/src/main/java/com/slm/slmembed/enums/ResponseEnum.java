@@ -13,8 +13,10 @@ public enum ResponseEnum {
     SQLITE_SCHEMA_RETRIEVED_SUCCESSFULLY(0, "SQLite schema retrieved successfully"),
     QUERY_EXECUTED_SUCCESSFULLY(0, "Query executed successfully"),
     SQLITE_QUERY_EXECUTED_SUCCESSFULLY(0, "SQLite query executed successfully"),
+    BATCH_QUERY_EXECUTED_SUCCESSFULLY(0, "Batch query executed successfully"),
     CONNECTION_SUCCESSFUL(0, "Connection successful"),
     SQLITE_CONNECTION_SUCCESSFUL(0, "SQLite connection successful"),
+    SQLITE_FILE_REGISTERED_SUCCESSFULLY(0, "SQLite file registered successfully"),
 
     // HTTP Status Codes
     BAD_REQUEST(400, "Bad Request"),
@@ -52,7 +54,8 @@ public enum ResponseEnum {
     RATE_LIMIT_EXCEEDED(4000, "Rate limit exceeded. Please try again later"),
 
     // Resource errors (all return HTTP 200 but with error codes in 5000 range)
-    RESOURCE_NOT_FOUND(5000, "Resource not found");
+    RESOURCE_NOT_FOUND(5000, "Resource not found"),
+    SQLITE_HANDLE_NOT_FOUND(5001, "SQLite handle not found or evicted");
 
     private final int code;
     private final String message;
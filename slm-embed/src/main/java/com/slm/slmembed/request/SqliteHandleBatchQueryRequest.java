@@ -0,0 +1,19 @@
+package com.slm.slmembed.request;
+
+import jakarta.validation.constraints.NotBlank;
+import jakarta.validation.constraints.NotEmpty;
+import jakarta.validation.constraints.Positive;
+import lombok.Getter;
+import lombok.Setter;
+
+import java.util.List;
+
+@Getter
+@Setter
+public class SqliteHandleBatchQueryRequest {
+    @NotEmpty(message = "At least one query is required")
+    private List<@NotBlank(message = "Query is required") String> queries;
+
+    @Positive(message = "Timeout must be positive")
+    private Integer timeoutSeconds;
+}
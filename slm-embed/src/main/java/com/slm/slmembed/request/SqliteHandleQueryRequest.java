@@ -0,0 +1,12 @@
+package com.slm.slmembed.request;
+
+import jakarta.validation.constraints.NotBlank;
+import lombok.Getter;
+import lombok.Setter;
+
+@Getter
+@Setter
+public class SqliteHandleQueryRequest {
+    @NotBlank(message = "Query is required")
+    private String query;
+}
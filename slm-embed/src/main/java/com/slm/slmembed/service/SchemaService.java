@@ -1,8 +1,11 @@
 package com.slm.slmembed.service;
 
 import com.slm.slmembed.dto.DatabaseSchemaDto;
+import com.slm.slmembed.dto.QueryResultDto;
+import com.slm.slmembed.dto.SqliteHandleDto;
 import com.slm.slmembed.dto.TableDto;
 import com.slm.slmembed.exception.AppException;
+import com.slm.slmembed.request.DbConnectionBatchQueryRequest;
 import com.slm.slmembed.request.DbConnectionRequest;
 import com.slm.slmembed.request.DbConnectionWithQueryRequest;
 import com.zaxxer.hikari.HikariConfig;
@@ -46,6 +49,7 @@ public class SchemaService {
     private final Map<String, DataSource> connectionPool = new ConcurrentHashMap<>();
     private final ScheduledExecutorService scheduledExecutor = Executors.newSingleThreadScheduledExecutor();
     private final FileService fileService;
+    private final SqliteFileRegistry sqliteFileRegistry;
 
     // SQL injection prevention patterns
     private static final String[] BLACKLISTED_PATTERNS = {
@@ -57,6 +61,18 @@ public class SchemaService {
     @PostConstruct
     public void init() {
         scheduledExecutor.scheduleAtFixedRate(this::cleanupIdleConnections, 10, 10, TimeUnit.MINUTES);
+        sqliteFileRegistry.setEvictionListener(this::closeSQLiteDataSource);
+    }
+
+    /**
+     * Close and forget the pooled data source of an evicted SQLite file
+     */
+    private void closeSQLiteDataSource(File file) {
+        DataSource dataSource = connectionPool.remove(createConnectionKey(file.getAbsolutePath(), null, SQLITE_DRIVER));
+        if (dataSource != null) {
+            log.info("Closing connection pool for evicted SQLite file: {}", file.getName());
+            closeDataSource(dataSource);
+        }
     }
 
     /**
@@ -284,7 +300,31 @@ public class SchemaService {
 
         try {
             tempFile = fileService.saveToTempFile(file);
-            String url = tempFile.getAbsolutePath();
+            return readSQLiteSchema(tempFile);
+        } finally {
+            fileService.safeDeleteFile(tempFile);
+        }
+    }
+
+    /**
+     * Register a SQLite file once so later calls can refer to it by handle
+     */
+    public SqliteHandleDto registerSQLite(MultipartFile file) {
+        return sqliteFileRegistry.register(file);
+    }
+
+    /**
+     * SQLite schema retrieval for a previously registered file
+     */
+    public DatabaseSchemaDto getDatabaseSchemaSQLite(String handle) {
+        try (SqliteFileRegistry.Lease lease = sqliteFileRegistry.acquire(handle)) {
+            return readSQLiteSchema(lease.getFile());
+        }
+    }
+
+    private DatabaseSchemaDto readSQLiteSchema(File databaseFile) {
+        try {
+            String url = databaseFile.getAbsolutePath();
 
             // For SQLite files, use the file path as the key
             DataSource dataSource = getOrCreateDataSource(url, null, null, SQLITE_DRIVER);
@@ -294,7 +334,7 @@ public class SchemaService {
                 log.info("Connected to {} {}", metaData.getDatabaseProductName(), metaData.getDatabaseProductVersion());
 
                 DatabaseSchemaDto schema = new DatabaseSchemaDto();
-                schema.setDatabase(tempFile.getName());
+                schema.setDatabase(databaseFile.getName());
                 List<TableDto> tables = new ArrayList<>();
 
                 try (var statement = connection.createStatement();
@@ -320,8 +360,6 @@ public class SchemaService {
         } catch (SQLException e) {
             log.error("SQLite schema retrieval error: ", e);
             throw new AppException(DATABASE_CONNECTION_ERROR);
-        } finally {
-            fileService.safeDeleteFile(tempFile);
         }
     }
 
@@ -429,15 +467,33 @@ public class SchemaService {
         if (isNotValidSQLQuery(query)) {
         }
 
-        List<Map<String, Object>> result = new ArrayList<>();
         File tempFile = null;
 
         try {
             // Save the uploaded file to a temporary directory.
             tempFile = fileService.saveToTempFile(file);
+            return runSQLiteQuery(tempFile, query);
+        } finally {
+            // Delete the temporary file after processing but keep connection in pool
+            fileService.safeDeleteFile(tempFile);
+        }
+    }
+
+    /**
+     * Execute a query against a previously registered SQLite file
+     */
+    public List<Map<String, Object>> executeQuerySQLite(String handle, String query) {
+        try (SqliteFileRegistry.Lease lease = sqliteFileRegistry.acquire(handle)) {
+            return runSQLiteQuery(lease.getFile(), query);
+        }
+    }
+
+    private List<Map<String, Object>> runSQLiteQuery(File databaseFile, String query) {
+        List<Map<String, Object>> result = new ArrayList<>();
 
-            // Create the SQLite connection URL using the temporary file's absolute path.
-            String url = tempFile.getAbsolutePath();
+        try {
+            // Create the SQLite connection URL using the file's absolute path.
+            String url = databaseFile.getAbsolutePath();
             DataSource dataSource = getOrCreateDataSource(url, null, null, SQLITE_DRIVER);
 
             try (var connection = dataSource.getConnection();
@@ -459,12 +515,84 @@ public class SchemaService {
         } catch (SQLException e) {
             log.error("SQLite query execution error: ", e);
             throw new AppException(SQL_ERROR, e.getMessage());
-        } finally {
-            // Delete the temporary file after processing but keep connection in pool
-            fileService.safeDeleteFile(tempFile);
         }
     }
 
+    /**
+     * Entry point for executing a batch of queries on MySQL/PostgreSQL databases
+     */
+    public List<QueryResultDto> queryDatabaseBatch(DbConnectionBatchQueryRequest request) {
+        String driver = switch (request.getDbType().toLowerCase()) {
+            case "mysql" -> MYSQL_DRIVER;
+            case "postgresql" -> POSTGRESQL_DRIVER;
+            default -> throw new AppException(UNSUPPORTED_DATABASE_TYPE);
+        };
+
+        DataSource dataSource = getOrCreateDataSource(
+                request.getUrl(), request.getUsername(), request.getPassword(), driver);
+        return runBatch(dataSource, request.getQueries(), request.getTimeoutSeconds(), true);
+    }
+
+    /**
+     * Execute a batch of queries against a previously registered SQLite file
+     */
+    public List<QueryResultDto> executeQuerySQLiteBatch(String handle, List<String> queries, Integer timeoutSeconds) {
+        try (SqliteFileRegistry.Lease lease = sqliteFileRegistry.acquire(handle)) {
+            DataSource dataSource = getOrCreateDataSource(lease.getFile().getAbsolutePath(), null, null, SQLITE_DRIVER);
+            return runBatch(dataSource, queries, timeoutSeconds, false);
+        }
+    }
+
+    /**
+     * Run each statement on one pooled connection, collecting rows or an error per statement
+     * so that one failing or slow statement does not fail the whole batch
+     */
+    private List<QueryResultDto> runBatch(DataSource dataSource, List<String> queries, Integer timeoutSeconds,
+                                          boolean validate) {
+        List<QueryResultDto> results = new ArrayList<>(queries.size());
+
+        try (var connection = dataSource.getConnection()) {
+            for (String query : queries) {
+                if (validate && isNotValidSQLQuery(query)) {
+                    results.add(QueryResultDto.ofError(INVALID_QUERY.getCode(), INVALID_QUERY.getMessage()));
+                    continue;
+                }
+
+                try (var statement = connection.createStatement()) {
+                    if (timeoutSeconds != null) {
+                        statement.setQueryTimeout(timeoutSeconds);
+                    }
+                    try (var resultSet = statement.executeQuery(query)) {
+                        results.add(QueryResultDto.ofRows(readRows(resultSet)));
+                    }
+                } catch (SQLException e) {
+                    log.debug("Batch statement failed: {}", e.getMessage());
+                    results.add(QueryResultDto.ofError(SQL_ERROR.getCode(), e.getMessage()));
+                }
+            }
+        } catch (SQLException e) {
+            log.error("Batch query execution error: ", e);
+            throw new AppException(DATABASE_CONNECTION_ERROR);
+        }
+
+        return results;
+    }
+
+    private List<Map<String, Object>> readRows(ResultSet resultSet) throws SQLException {
+        List<Map<String, Object>> rows = new ArrayList<>();
+        int columnCount = resultSet.getMetaData().getColumnCount();
+
+        while (resultSet.next()) {
+            Map<String, Object> row = new HashMap<>();
+            for (int i = 1; i <= columnCount; i++) {
+                // The label is the AS alias; MySQL Connector/J returns the base column name from getColumnName
+                row.put(resultSet.getMetaData().getColumnLabel(i), resultSet.getObject(i));
+            }
+            rows.add(row);
+        }
+        return rows;
+    }
+
     /**
      * Validate SQL query for security
      * Implements multiple layers of SQL injection prevention
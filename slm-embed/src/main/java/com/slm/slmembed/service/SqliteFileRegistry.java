@@ -0,0 +1,216 @@
+package com.slm.slmembed.service;
+
+import com.slm.slmembed.dto.SqliteHandleDto;
+import com.slm.slmembed.exception.AppException;
+import jakarta.annotation.PreDestroy;
+import lombok.extern.slf4j.Slf4j;
+import org.springframework.beans.factory.annotation.Value;
+import org.springframework.stereotype.Service;
+import org.springframework.web.multipart.MultipartFile;
+
+import java.io.File;
+import java.io.IOException;
+import java.io.InputStream;
+import java.io.OutputStream;
+import java.nio.file.Files;
+import java.nio.file.Path;
+import java.security.DigestInputStream;
+import java.security.MessageDigest;
+import java.security.NoSuchAlgorithmException;
+import java.util.HashMap;
+import java.util.HashSet;
+import java.util.HexFormat;
+import java.util.LinkedHashMap;
+import java.util.Map;
+import java.util.Set;
+import java.util.function.Consumer;
+
+import static com.slm.slmembed.enums.ResponseEnum.*;
+
+/**
+ * Content-addressed store for uploaded SQLite files.
+ * A file is uploaded once, referenced afterwards by the SHA-256 of its content,
+ * and evicted in least-recently-used order once the registry is full.
+ * An evicted file that queries still hold a lease on is deleted once the last lease is released.
+ */
+@Service
+@Slf4j
+public class SqliteFileRegistry {
+
+    private final int maxFiles;
+    private final Map<String, File> files;
+    // In-flight leases per file, and evicted files waiting for their leases to be released
+    private final Map<File, Integer> leases = new HashMap<>();
+    private final Set<File> pendingDeletion = new HashSet<>();
+    private Consumer<File> evictionListener = file -> {
+    };
+
+    public SqliteFileRegistry(@Value("${sqlite.registry.max-files:32}") int maxFiles) {
+        this.maxFiles = maxFiles;
+        this.files = new LinkedHashMap<>(16, 0.75f, true);
+    }
+
+    public void setEvictionListener(Consumer<File> evictionListener) {
+        this.evictionListener = evictionListener;
+    }
+
+    /**
+     * Store an uploaded SQLite file and return its content handle
+     */
+    public SqliteHandleDto register(MultipartFile file) {
+        if (file == null || file.isEmpty()) {
+            log.warn("Attempted to register an empty or null SQLite file");
+            throw new AppException(FILE_IS_EMPTY);
+        }
+
+        Path tempFile = null;
+        try {
+            tempFile = Files.createTempFile("sqlite_", ".sqlite");
+            MessageDigest digest = MessageDigest.getInstance("SHA-256");
+            try (InputStream in = new DigestInputStream(file.getInputStream(), digest);
+                 OutputStream out = Files.newOutputStream(tempFile)) {
+                in.transferTo(out);
+            }
+            String handle = HexFormat.of().formatHex(digest.digest());
+
+            synchronized (files) {
+                if (files.get(handle) != null) {
+                    Files.deleteIfExists(tempFile);
+                    log.debug("SQLite file {} already registered", handle);
+                } else {
+                    // Deleted on eviction or in cleanup(); deleteOnExit would keep every path ever registered in memory
+                    File physicalFile = tempFile.toFile();
+                    files.put(handle, physicalFile);
+                    log.info("Registered SQLite file {} ({} bytes)", handle, file.getSize());
+                    evictOverflow();
+                }
+            }
+
+            SqliteHandleDto dto = new SqliteHandleDto();
+            dto.setHandle(handle);
+            dto.setSize(file.getSize());
+            return dto;
+        } catch (IOException | NoSuchAlgorithmException e) {
+            log.error("Failed to register SQLite file: ", e);
+            deleteQuietly(tempFile);
+            throw new AppException(FILE_UPLOAD_ERROR);
+        }
+    }
+
+    /**
+     * Resolve a handle to the registered file, marking it as recently used
+     */
+    public File resolve(String handle) {
+        synchronized (files) {
+            File file = files.get(handle);
+            if (file == null || !file.exists()) {
+                files.remove(handle);
+                throw new AppException(SQLITE_HANDLE_NOT_FOUND);
+            }
+            return file;
+        }
+    }
+
+    /**
+     * Resolve a handle and hold the file until the returned lease is closed,
+     * so that eviction cannot delete it while a query is using it
+     */
+    public Lease acquire(String handle) {
+        synchronized (files) {
+            File file = resolve(handle);
+            leases.merge(file, 1, Integer::sum);
+            return new Lease(file);
+        }
+    }
+
+    private void release(File file) {
+        boolean dispose = false;
+        synchronized (files) {
+            Integer remaining = leases.merge(file, -1, Integer::sum);
+            if (remaining == null || remaining <= 0) {
+                leases.remove(file);
+                dispose = pendingDeletion.remove(file);
+            }
+        }
+        if (dispose) {
+            log.info("Deleting evicted SQLite file {} after its last query", file.getName());
+            dispose(file);
+        }
+    }
+
+    private void evictOverflow() {
+        var iterator = files.entrySet().iterator();
+        while (files.size() > maxFiles && iterator.hasNext()) {
+            Map.Entry<String, File> eldest = iterator.next();
+            iterator.remove();
+            File file = eldest.getValue();
+            if (leases.containsKey(file)) {
+                log.info("Evicting SQLite file {}, deletion deferred until its queries finish", eldest.getKey());
+                pendingDeletion.add(file);
+            } else {
+                log.info("Evicting SQLite file {}", eldest.getKey());
+                dispose(file);
+            }
+        }
+    }
+
+    private void dispose(File file) {
+        evictionListener.accept(file);
+        deleteQuietly(file.toPath());
+    }
+
+    private void deleteQuietly(Path path) {
+        if (path == null) {
+            return;
+        }
+        try {
+            Files.deleteIfExists(path);
+        } catch (IOException e) {
+            log.warn("Failed to delete SQLite file: {}", path);
+            path.toFile().deleteOnExit();
+        }
+    }
+
+    /**
+     * Remove all registered files when the service is destroyed
+     */
+    @PreDestroy
+    public void cleanup() {
+        synchronized (files) {
+            for (File file : files.values()) {
+                deleteQuietly(file.toPath());
+            }
+            for (File file : pendingDeletion) {
+                deleteQuietly(file.toPath());
+            }
+            files.clear();
+            pendingDeletion.clear();
+            leases.clear();
+        }
+    }
+
+    /**
+     * A registered file held for the duration of a query
+     */
+    public final class Lease implements AutoCloseable {
+
+        private final File file;
+        private boolean closed;
+
+        private Lease(File file) {
+            this.file = file;
+        }
+
+        public File getFile() {
+            return file;
+        }
+
+        @Override
+        public void close() {
+            if (!closed) {
+                closed = true;
+                release(file);
+            }
+        }
+    }
+}
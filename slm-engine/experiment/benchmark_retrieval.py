@@ -0,0 +1,134 @@
+"""
+Benchmark the fused translate-and-retrieve call against the two-call retrieval path.
+
+Each case is a question with the tables a correct query needs. Both paths run on every
+case with the LLM response cache bypassed, and the script reports latency and retrieval
+recall/precision per path.
+
+Usage (from slm-engine/src, with the same .env as the service):
+
+    python ../experiment/benchmark_retrieval.py --cases cases.json --schema schema.json
+    python ../experiment/benchmark_retrieval.py --cases cases.json --connection connection.json --runs 3
+
+cases.json:      [{"question": "...", "expected_tables": ["orders", "customers"]}, ...]
+schema.json:     the table details returned by the schema endpoint
+connection.json: a connection payload, used to read the schema from the database instead
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from core.llm import llm_config
+from core.templates import text2sql_prompt_routing
+from core.services import get_schema
+from core.workflows.sql_agent import SQLAgentWorkflow
+
+
+def _normalize(tables):
+    return {table.lower().strip() for table in tables}
+
+def _score(expected, predicted):
+    expected, predicted = _normalize(expected), _normalize(predicted)
+    recall = len(expected & predicted) / len(expected) if expected else 1.0
+    precision = len(expected & predicted) / len(predicted) if predicted else (1.0 if not expected else 0.0)
+    return recall, precision
+
+def _percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+async def _run_two_calls(workflow, question, table_details, description):
+    schema = workflow._retrieval_schema(table_details, description, question, fused=False)
+    start = time.perf_counter()
+    query = await workflow._atranslate_query(question, schema, description, refresh=True)
+    tables = await workflow._aretrieve_tables(query, schema, description, refresh=True)
+    return time.perf_counter() - start, query, tables
+
+async def _run_fused(workflow, question, table_details, description):
+    schema = workflow._retrieval_schema(table_details, description, question, fused=True)
+    start = time.perf_counter()
+    query, tables = await workflow._atranslate_and_retrieve(question, schema, description, refresh=True)
+    return time.perf_counter() - start, query, tables
+
+async def benchmark(cases, table_details, description, runs):
+    prompt_routing = llm_config.settings["prompt_routing"]
+    workflow = SQLAgentWorkflow(
+        text2sql_prompt=text2sql_prompt_routing(prompt_routing),
+        llm=llm_config.get_llm(),
+        prompt_routing=prompt_routing
+    )
+    modes = {"two_calls": _run_two_calls, "fused": _run_fused}
+    results = {mode: [] for mode in modes}
+
+    for run in range(runs):
+        for case in cases:
+            # Alternate the order so neither path always runs on a warm backend
+            order = list(modes) if run % 2 == 0 else list(reversed(modes))
+            for mode in order:
+                try:
+                    seconds, query, tables = await modes[mode](workflow, case["question"], table_details, description)
+                except Exception as e:
+                    print(f"[{mode}] {case['question']!r} failed: {e}")
+                    results[mode].append({"question": case["question"], "error": str(e)})
+                    continue
+                recall, precision = _score(case["expected_tables"], tables)
+                results[mode].append({
+                    "question": case["question"],
+                    "translated_query": query,
+                    "relevant_tables": tables,
+                    "seconds": seconds,
+                    "recall": recall,
+                    "precision": precision
+                })
+                print(f"[{mode}] {seconds:6.2f}s recall={recall:.2f} precision={precision:.2f} {case['question']!r} -> {tables}")
+
+    summary = {}
+    for mode, rows in results.items():
+        ok = [row for row in rows if "error" not in row]
+        latencies = [row["seconds"] for row in ok]
+        summary[mode] = {
+            "runs": len(rows),
+            "errors": len(rows) - len(ok),
+            "latency_mean_seconds": round(statistics.mean(latencies), 3) if latencies else None,
+            "latency_p50_seconds": round(_percentile(latencies, 0.5), 3) if latencies else None,
+            "latency_p95_seconds": round(_percentile(latencies, 0.95), 3) if latencies else None,
+            "recall_mean": round(statistics.mean(row["recall"] for row in ok), 4) if ok else None,
+            "precision_mean": round(statistics.mean(row["precision"] for row in ok), 4) if ok else None,
+            "perfect_recall_rate": round(sum(1 for row in ok if row["recall"] == 1.0) / len(ok), 4) if ok else None
+        }
+    return summary, results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cases", required=True, help="JSON file of questions and expected tables")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--schema", help="JSON file of table details")
+    source.add_argument("--connection", help="JSON file of a connection payload to read the schema from")
+    parser.add_argument("--description", default="", help="Database description used in the prompts")
+    parser.add_argument("--runs", type=int, default=1, help="Passes over the cases")
+    parser.add_argument("--output", help="Write the summary and per-question results to this JSON file")
+    args = parser.parse_args()
+
+    with open(args.cases) as f:
+        cases = json.load(f)
+    if args.schema:
+        with open(args.schema) as f:
+            table_details = json.load(f)
+    else:
+        with open(args.connection) as f:
+            table_details = get_schema(json.load(f))
+
+    summary, results = asyncio.run(benchmark(cases, table_details, args.description, args.runs))
+    print(json.dumps(summary, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"summary": summary, "results": results}, f, indent=2, ensure_ascii=False)
+
+if __name__ == "__main__":
+    main()
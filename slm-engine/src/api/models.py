@@ -15,13 +15,18 @@ def create_api_models(api):
 
     query_request_model = api.model('QueryRequest', {
         'query': fields.String(required=True, description='Natural language query'),
-        'connection_payload': fields.Nested(connection_payload_model, required=True)
+        'connection_payload': fields.Nested(connection_payload_model, required=True),
+        'bypass_cache': fields.Boolean(required=False, description='Skip the question-to-SQL cache lookup and regenerate every cached LLM response')
     })
 
     schema_enrich_request_model = api.model('SchemaEnrichRequest', {
         'connection_payload': fields.Nested(connection_payload_model, required=True)
     })
     
+    schema_cache_invalidate_model = api.model('SchemaCacheInvalidateRequest', {
+        'connection_payload': fields.Nested(connection_payload_model, required=False, description='Connection to invalidate (omit to clear the whole cache)')
+    })
+    
     question_request_model = api.model('QuestionRequest', {
         'top_k': fields.Integer(required=False, description='Number of question suggestions to generate', default=5),
         'tables': fields.List(fields.String, required=True, description='List of table names')
@@ -30,6 +35,7 @@ def create_api_models(api):
     settings_model = api.model('Settings', {
         'provider': fields.String(required=False, description='LLM provider (ollama or google)'),
         'ollama_host': fields.String(required=False, description='Ollama host URL'),
+        'ollama_hosts': fields.List(fields.String, required=False, description='Ollama host URLs serving the same model, load balanced as a pool'),
         'ollama_model': fields.String(required=False, description='Ollama model name'),
         'additional_kwargs': fields.Raw(required=False, description='Additional Ollama parameters'),
         'model': fields.String(required=False, description='Google model name'),
@@ -37,8 +43,9 @@ def create_api_models(api):
         'temperature': fields.Float(required=False, description='Model temperature'),
         'max_tokens': fields.Integer(required=False, description='Maximum tokens'),
         'thinking_budget': fields.Integer(required=False, description='Thinking budget for Google Gemini'),
-        'prompt_routing': fields.Integer(required=False, description='Prompt routing setting (0 or 1)'),
-        'enrich_schema': fields.Boolean(required=False, description='Schema enrichment setting')
+        'prompt_routing': fields.Integer(required=False, description='Prompt routing setting (0, 1 or 2 for prefix-stable prompts)'),
+        'enrich_schema': fields.Boolean(required=False, description='Schema enrichment setting'),
+        'generation_profiles': fields.Raw(required=False, description='Per-step overrides of max_tokens, temperature, stop and num_ctx, e.g. {"retrieve": {"max_tokens": 128}}')
     })
     
     
@@ -47,5 +54,6 @@ def create_api_models(api):
         'query_request_model': query_request_model,
         'question_request_model': question_request_model,
         'settings_model': settings_model,
-        'schema_enrich_request_model': schema_enrich_request_model
+        'schema_enrich_request_model': schema_enrich_request_model,
+        'schema_cache_invalidate_model': schema_cache_invalidate_model
     } 
\ No newline at end of file
@@ -3,13 +3,28 @@ import logging
 from flask import request, jsonify
 from flask_restx import Resource
 from config.app_config import llm_config
-from core.services import get_schema, get_sample_data_improved, validate_connection_payload
+from core.llm import OllamaPool
+from core.services import aget_schema, aget_sample_data_batch, validate_connection_payload, invalidate_schema_cache
 from core.utils import enrich_schema_with_info, prompt_export
 from exceptions.app_exception import AppException
 from response.app_response import ResponseWrapper
 from middleware.async_handler import async_route
 from services.observability import observability_service
 from enums.response_enum import ResponseEnum
+from enums.llm_priority import LLMPriority
+from services.cache import schema_cache, sample_cache, profile_cache
+from services.embed_client import async_embed_client
+from services.sqlite_store import sqlite_store
+from services.llm_loop import llm_loop
+from services.llm_cache import llm_response_cache
+from services.question_cache import question_cache
+from services.single_flight import llm_single_flight
+from services.llm_scheduler import llm_scheduler, llm_priority
+from services.llm_hedging import llm_hedger
+from services.prompt_prefix import prompt_prefix_tracker
+from services.context_window import context_window_sizer
+from services.structured_output import structured_output_stats
+from core.language import translation_gate
 
 logger = logging.getLogger(__name__)
 
@@ -29,6 +44,7 @@ def initialize_routes(api, api_models, workflows):
     question_request_model = api_models['question_request_model']
     settings_model = api_models['settings_model']
     schema_enrich_request_model = api_models['schema_enrich_request_model'] 
+    schema_cache_invalidate_model = api_models['schema_cache_invalidate_model']
 
     @api.route('/')
     class Home(Resource):
@@ -61,6 +77,7 @@ def initialize_routes(api, api_models, workflows):
                 connection_payload = data.get("connection_payload")
                 logger.info(f"Processing query: {query}")
                 session_information = data.get("session_information")
+                bypass_cache = bool(data.get("bypass_cache", False))
                 schema_enrich_info = connection_payload.get("schema_enrich_info")
                 
                 schema = []
@@ -102,7 +119,7 @@ def initialize_routes(api, api_models, workflows):
                 from config.app_config import app_config
                 
                 logger.info("Retrieving schema from database")
-                table_details = get_schema(connection_payload)
+                table_details = await aget_schema(connection_payload)
                 for table in table_details:
                     table["sample_data"] = []
                 
@@ -137,7 +154,8 @@ def initialize_routes(api, api_models, workflows):
                         table_details=table_details,
                         database_description=database_description,
                         connection_payload=connection_payload,
-                        session_information=session_information
+                        session_information=session_information,
+                        bypass_cache=bypass_cache
                     )
                     logger.info(f"Trace ID: {trace.id}")
                 
@@ -226,12 +244,13 @@ def initialize_routes(api, api_models, workflows):
                 )
                 
                 logger.info("Retrieving schema from database")
-                table_details = get_schema(connection_payload)
-                for table in table_details:
-                    table["sample_data"] = get_sample_data_improved(
-                        connection_payload=connection_payload, 
-                        table_details=table
-                    )
+                table_details = await aget_schema(connection_payload)
+                samples = await aget_sample_data_batch(
+                    connection_payload=connection_payload, 
+                    tables=table_details
+                )
+                for table, sample_data in zip(table_details, samples):
+                    table["sample_data"] = sample_data
                 
                 # Enrich schema with additional information
                 table_details, database_description = enrich_schema_with_info(table_details, connection_payload)
@@ -332,7 +351,7 @@ def initialize_routes(api, api_models, workflows):
                 )
                 
                 logger.info("Retrieving database schema...")
-                table_details = get_schema(connection_payload)
+                table_details = await aget_schema(connection_payload)
                 
                 schema_span.update(
                     metadata={
@@ -344,13 +363,13 @@ def initialize_routes(api, api_models, workflows):
 
                 # Trace the enrichment workflow using LlamaIndex instrumentor
                 logger.info("Executing workflow")
-                with observability_service.llama_index_instrumentor.observe(trace_id=trace.id):
+                with observability_service.llama_index_instrumentor.observe(trace_id=trace.id), llm_priority(LLMPriority.ENRICHMENT):
                     response = await schema_workflow.run(
                         connection_payload=connection_payload,
                         database_schema=table_details
                     )
                 
-                response["original_schema"] = get_schema(connection_payload)
+                response["original_schema"] = await aget_schema(connection_payload)
                 
                 # Update trace with enrichment results
                 if response:
@@ -428,7 +447,7 @@ def initialize_routes(api, api_models, workflows):
                 )
                 
                 logger.info("Retrieving database schema...")
-                table_details = get_schema(connection_payload)
+                table_details = await aget_schema(connection_payload)
                 
                 schema_span.update(
                     metadata={
@@ -440,7 +459,7 @@ def initialize_routes(api, api_models, workflows):
 
                 # Trace the enrichment workflow using LlamaIndex instrumentor
                 logger.info("Executing workflow")
-                with observability_service.llama_index_instrumentor.observe(trace_id=trace.id):
+                with observability_service.llama_index_instrumentor.observe(trace_id=trace.id), llm_priority(LLMPriority.ENRICHMENT):
                     response = await schema_workflow.run(
                         connection_payload=connection_payload,
                         database_schema=table_details
@@ -532,7 +551,7 @@ def initialize_routes(api, api_models, workflows):
 
                 
                 logger.info("Retrieving schema from database")
-                table_details = get_schema(connection_payload)
+                table_details = await aget_schema(connection_payload)
                 for table in table_details:
                     table["sample_data"] = []
                 
@@ -631,15 +650,18 @@ def initialize_routes(api, api_models, workflows):
                 # Extract common settings
                 prompt_routing = data.get("prompt_routing")
                 enrich_schema = data.get("enrich_schema")
+                generation_profiles = data.get("generation_profiles")
                 
                 # Extract provider-specific settings
                 if new_provider == "ollama":
                     settings = {
                         "host": data.get("ollama_host"),
+                        "hosts": data.get("ollama_hosts"),
                         "model": data.get("ollama_model"),
                         "additional_kwargs": data.get("additional_kwargs"),
                         "prompt_routing": prompt_routing,
-                        "enrich_schema": enrich_schema
+                        "enrich_schema": enrich_schema,
+                        "generation_profiles": generation_profiles
                     }
                 elif new_provider == "google":
                     settings = {
@@ -649,7 +671,8 @@ def initialize_routes(api, api_models, workflows):
                         "max_tokens": data.get("max_tokens"),
                         "thinking_budget": data.get("thinking_budget"),
                         "prompt_routing": prompt_routing,
-                        "enrich_schema": enrich_schema
+                        "enrich_schema": enrich_schema,
+                        "generation_profiles": generation_profiles
                     }
                 
                 # Validate that at least one setting is provided
@@ -670,6 +693,9 @@ def initialize_routes(api, api_models, workflows):
                 
                 global workflow, schema_workflow, baseline_workflow
                 workflow.llm = llm_config.get_llm()
+                workflow.text2sql_prompt = TEXT_TO_SQL_PROMPT_TMPL
+                workflow.prompt_routing = llm_config.settings["prompt_routing"]
+                baseline_workflow.text2sql_prompt = TEXT_TO_SQL_PROMPT_TMPL
                 schema_workflow.llm = llm_config.get_llm()
                 baseline_workflow.llm = llm_config.get_llm()
                 
@@ -709,6 +735,85 @@ def initialize_routes(api, api_models, workflows):
             logger.debug("Health check request received")
             return jsonify({"status": "ok"})   
 
+    @api.route('/stats')
+    class Stats(Resource):
+        @api.doc('stats',
+            responses={
+                200: 'Success'
+            }
+        )
+        def get(self):
+            """Get runtime cache and connection pool statistics"""
+            logger.debug("Stats request received")
+            llm = llm_config.get_llm()
+            return ResponseWrapper.success({
+                "schema_cache": schema_cache.get_stats(),
+                "sample_cache": sample_cache.get_stats(),
+                "profile_cache": profile_cache.get_stats(),
+                "embed_client": async_embed_client.get_stats(),
+                "sqlite_store": sqlite_store.get_stats(),
+                "llm_response_cache": llm_response_cache.get_stats(),
+                "question_cache": question_cache.get_stats(),
+                "llm_single_flight": llm_single_flight.get_stats(),
+                "llm_scheduler": llm_scheduler.get_stats(),
+                "llm_hedging": llm_hedger.get_stats(),
+                "prompt_prefix_reuse": prompt_prefix_tracker.get_stats(),
+                "translation_gate": translation_gate.get_stats(),
+                "context_window": context_window_sizer.get_stats(),
+                "structured_output": structured_output_stats.get_stats(),
+                "llm_pool": llm.get_stats() if isinstance(llm, OllamaPool) else None,
+                "llm_loop": llm_loop.get_stats()
+            })
+
+    @api.route('/schema-cache/invalidate')
+    class SchemaCacheInvalidate(Resource):
+        @api.expect(schema_cache_invalidate_model)
+        @api.doc('schema_cache_invalidate',
+            responses={
+                200: 'Success',
+                400: 'Bad Request - Invalid connection payload',
+                500: 'Internal Server Error'
+            }
+        )
+        def post(self):
+            """Invalidate cached schemas and sample data for one connection, or for all connections"""
+            logger.info("Received request to /schema-cache/invalidate endpoint")
+            try:
+                data = request.get_json(silent=True) or {}
+                connection_payload = data.get("connection_payload")
+
+                if connection_payload:
+                    is_valid, error_message = validate_connection_payload(connection_payload)
+                    if not is_valid:
+                        logger.warning(f"Invalid connection payload: {error_message}")
+                        return jsonify({"error": error_message}), 400
+
+                removed = invalidate_schema_cache(connection_payload)
+                logger.info(f"Invalidated {removed} cached schema/sample entries")
+                return ResponseWrapper.success({"invalidated": removed})
+            except Exception as e:
+                logger.error(f"Error invalidating schema cache: {str(e)}", exc_info=True)
+                raise AppException(str(e), 500)
+
+    @api.route('/llm-cache/invalidate')
+    class LLMCacheInvalidate(Resource):
+        @api.doc('llm_cache_invalidate',
+            responses={
+                200: 'Success',
+                500: 'Internal Server Error'
+            }
+        )
+        def post(self):
+            """Drop every cached LLM response, in memory and on disk"""
+            logger.info("Received request to /llm-cache/invalidate endpoint")
+            try:
+                removed = llm_response_cache.invalidate()
+                logger.info(f"Invalidated {removed} cached LLM responses")
+                return ResponseWrapper.success({"invalidated": removed})
+            except Exception as e:
+                logger.error(f"Error invalidating LLM response cache: {str(e)}", exc_info=True)
+                raise AppException(str(e), 500)
+
     @api.route('/suggest-questions')
     class SuggestQuestions(Resource):
         @api.expect(question_request_model)
@@ -766,7 +871,7 @@ def initialize_routes(api, api_models, workflows):
 
                 # Trace the query processing using LlamaIndex instrumentor
                 logger.info("Executing workflow")
-                with observability_service.llama_index_instrumentor.observe(trace_id=trace.id):
+                with observability_service.llama_index_instrumentor.observe(trace_id=trace.id), llm_priority(LLMPriority.SUGGESTION):
                     from core.events import QuestionSuggestionEvent
                     response = await question_workflow.run(
                         table_details=table_details,
@@ -34,6 +34,100 @@ class AppConfig:
         self.ENRICH_SCHEMA = True
         self.PRIVACY_MODE = os.getenv("PRIVACY_MODE", "False").lower() in ["true", "1", "yes", "y"]
         
+        # Embed service client configuration
+        self.EMBED_HOST_API = f"http://{os.getenv('EMBED_HOST_API')}"
+        self.EMBED_POOL_SIZE = int(os.getenv("EMBED_POOL_SIZE", 20))
+        self.EMBED_CONNECT_TIMEOUT = float(os.getenv("EMBED_CONNECT_TIMEOUT", 5))
+        self.EMBED_SCHEMA_TIMEOUT = float(os.getenv("EMBED_SCHEMA_TIMEOUT", 120))
+        self.EMBED_QUERY_TIMEOUT = float(os.getenv("EMBED_QUERY_TIMEOUT", 200))
+        self.SQLITE_HANDLE_CACHE_SIZE = int(os.getenv("SQLITE_HANDLE_CACHE_SIZE", 32))
+        
+        # SQLite execution backend: "embed" (Java embed service) or "local" (in-process sqlite3)
+        self.SQLITE_EXECUTION_BACKEND = os.getenv("SQLITE_EXECUTION_BACKEND", "embed").lower()
+        self.SQLITE_LOCAL_DIR = os.getenv("SQLITE_LOCAL_DIR")
+        self.SQLITE_LOCAL_POOL_SIZE = int(os.getenv("SQLITE_LOCAL_POOL_SIZE", 4))
+        self.SQLITE_LOCAL_MMAP_SIZE = int(os.getenv("SQLITE_LOCAL_MMAP_SIZE", 256 * 1024 * 1024))
+        self.SQLITE_LOCAL_QUERY_TIMEOUT = float(os.getenv("SQLITE_LOCAL_QUERY_TIMEOUT", 30))
+        
+        # Batch SQL execution configuration
+        self.SQL_BATCH_SIZE = int(os.getenv("SQL_BATCH_SIZE", 50))
+        self.SQL_BATCH_STATEMENT_TIMEOUT = float(os.getenv("SQL_BATCH_STATEMENT_TIMEOUT", 30))
+        
+        # Sample data fetching configuration
+        self.SAMPLE_DATA_CONCURRENCY = int(os.getenv("SAMPLE_DATA_CONCURRENCY", 4))
+        self.SAMPLE_DATA_BATCH_SIZE = int(os.getenv("SAMPLE_DATA_BATCH_SIZE", 10))
+        self.SAMPLE_DATA_TIMEOUT = float(os.getenv("SAMPLE_DATA_TIMEOUT", 60))
+        self.SAMPLE_LARGE_TABLE_ROWS = int(os.getenv("SAMPLE_LARGE_TABLE_ROWS", 1000000))
+        self.SAMPLE_SCAN_ROWS = int(os.getenv("SAMPLE_SCAN_ROWS", 10000))
+        self.SAMPLE_MAX_VALUE_LENGTH = int(os.getenv("SAMPLE_MAX_VALUE_LENGTH", 1000))
+        
+        # Column profile configuration
+        self.USE_COLUMN_PROFILE = os.getenv("USE_COLUMN_PROFILE", "False").lower() in ["true", "1", "yes", "y"]
+        self.PROFILE_SAMPLE_ROWS = int(os.getenv("PROFILE_SAMPLE_ROWS", 10000))
+        self.PROFILE_TOP_K = int(os.getenv("PROFILE_TOP_K", 5))
+        self.PROFILE_TOP_VALUES_MAX_DISTINCT = int(os.getenv("PROFILE_TOP_VALUES_MAX_DISTINCT", 50))
+        self.PROFILE_CACHE_TTL = int(os.getenv("PROFILE_CACHE_TTL", 86400))
+        self.PROFILE_CACHE_MAX_SIZE = int(os.getenv("PROFILE_CACHE_MAX_SIZE", 4096))
+        
+        # Schema cache configuration
+        self.SCHEMA_CACHE_TTL = int(os.getenv("SCHEMA_CACHE_TTL", 600))
+        self.SCHEMA_CACHE_MAX_SIZE = int(os.getenv("SCHEMA_CACHE_MAX_SIZE", 128))
+        
+        # Sample data cache configuration
+        self.SAMPLE_CACHE_TTL = int(os.getenv("SAMPLE_CACHE_TTL", 3600))
+        self.SAMPLE_CACHE_MAX_SIZE = int(os.getenv("SAMPLE_CACHE_MAX_SIZE", 4096))
+        
+        # LLM response cache configuration; LLM_CACHE_PATH enables the on-disk tier
+        self.LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "True").lower() in ["true", "1", "yes", "y"]
+        self.LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", 86400))
+        self.LLM_CACHE_MAX_SIZE = int(os.getenv("LLM_CACHE_MAX_SIZE", 1024))
+        self.LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH")
+
+        # Question-to-SQL cache configuration
+        self.QUESTION_CACHE_ENABLED = os.getenv("QUESTION_CACHE_ENABLED", "True").lower() in ["true", "1", "yes", "y"]
+        self.QUESTION_CACHE_THRESHOLD = float(os.getenv("QUESTION_CACHE_THRESHOLD", 0.9))
+        self.QUESTION_CACHE_MAX_SIZE = int(os.getenv("QUESTION_CACHE_MAX_SIZE", 512))
+        self.QUESTION_CACHE_MAX_SCOPES = int(os.getenv("QUESTION_CACHE_MAX_SCOPES", 64))
+        self.QUESTION_CACHE_TTL = int(os.getenv("QUESTION_CACHE_TTL", 86400))
+
+        # LLM request scheduling: in-flight requests per backend, and queue time promoting a request one priority class
+        self.LLM_MAX_IN_FLIGHT = int(os.getenv("LLM_MAX_IN_FLIGHT", 4))
+        self.LLM_SCHEDULER_AGING_SECONDS = float(os.getenv("LLM_SCHEDULER_AGING_SECONDS", 30))
+
+        # Hedged LLM requests over a pool of servers; LLM_HEDGE_BUDGETS sets fixed per-step delays, e.g. "generate=8,retrieve=4"
+        self.LLM_HEDGING_ENABLED = os.getenv("LLM_HEDGING_ENABLED", "False").lower() in ["true", "1", "yes", "y"]
+        self.LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", 0.95))
+        self.LLM_HEDGE_MAX_RATIO = float(os.getenv("LLM_HEDGE_MAX_RATIO", 0.1))
+        self.LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", 20))
+        self.LLM_HEDGE_BUDGETS = {
+            step.strip(): float(seconds)
+            for step, seconds in (item.split("=", 1) for item in os.getenv("LLM_HEDGE_BUDGETS", "").split(",") if "=" in item)
+        }
+
+        # Use English questions as they are instead of running them through the translation LLM call
+        self.SKIP_ENGLISH_TRANSLATION = os.getenv("SKIP_ENGLISH_TRANSLATION", "True").lower() in ["true", "1", "yes", "y"]
+
+        # Translate the question and retrieve its tables in one LLM call instead of two
+        self.FUSED_RETRIEVAL = os.getenv("FUSED_RETRIEVAL", "False").lower() in ["true", "1", "yes", "y"]
+
+        # Stream SQL generation and reflection, stopping once the statement is complete (instead of structured output)
+        self.SQL_STREAMING = os.getenv("SQL_STREAMING", "False").lower() in ["true", "1", "yes", "y"]
+
+        # Token budget of the schema prompts (0 disables trimming); PROMPT_TOKENIZER is a Hugging Face
+        # tokenizer id for exact counts, otherwise tokens are estimated from the prompt length
+        self.PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", 8192))
+        self.PROMPT_TOKENIZER = os.getenv("PROMPT_TOKENIZER", "")
+
+        # Ollama context window per request: smallest bucket fitting the prompt plus the step's max tokens
+        # (OLLAMA_NUM_CTX_RESERVE when the step sets none)
+        self.OLLAMA_NUM_CTX_AUTO = os.getenv("OLLAMA_NUM_CTX_AUTO", "True").lower() in ["true", "1", "yes", "y"]
+        self.OLLAMA_NUM_CTX_BUCKETS = [int(size) for size in os.getenv("OLLAMA_NUM_CTX_BUCKETS", "4096,8192,16384,32768").split(",") if size.strip()]
+        self.OLLAMA_NUM_CTX_RESERVE = int(os.getenv("OLLAMA_NUM_CTX_RESERVE", 1024))
+        # Padding on the estimated prompt tokens, and idle time after which a backend's window may shrink
+        # (the model is unloaded after its 30 minute keep-alive anyway)
+        self.OLLAMA_NUM_CTX_MARGIN = float(os.getenv("OLLAMA_NUM_CTX_MARGIN", 0.25))
+        self.OLLAMA_NUM_CTX_IDLE_SECONDS = float(os.getenv("OLLAMA_NUM_CTX_IDLE_SECONDS", 1800))
+
         # Langfuse configuration
         self.LANGFUSE_PUBLIC_KEY = os.getenv("LANGFUSE_PUBLIC_KEY")
         self.LANGFUSE_SECRET_KEY = os.getenv("LANGFUSE_SECRET_KEY")
@@ -44,7 +138,38 @@ class AppConfig:
         logger.info(f"PROMPT_ROUTING: {self.PROMPT_ROUTING}")
         logger.info(f"ENRICH_SCHEMA: {self.ENRICH_SCHEMA}")
         logger.info(f"PRIVACY_MODE: {self.PRIVACY_MODE}")
-    
+        logger.info(f"EMBED_HOST_API: {self.EMBED_HOST_API}")
+        logger.info(f"EMBED_POOL_SIZE: {self.EMBED_POOL_SIZE}")
+        logger.info(f"SQLITE_HANDLE_CACHE_SIZE: {self.SQLITE_HANDLE_CACHE_SIZE}")
+        logger.info(f"SQLITE_EXECUTION_BACKEND: {self.SQLITE_EXECUTION_BACKEND}")
+        logger.info(f"SQL_BATCH_SIZE: {self.SQL_BATCH_SIZE}")
+        logger.info(f"SAMPLE_DATA_CONCURRENCY: {self.SAMPLE_DATA_CONCURRENCY}")
+        logger.info(f"SAMPLE_LARGE_TABLE_ROWS: {self.SAMPLE_LARGE_TABLE_ROWS}")
+        logger.info(f"USE_COLUMN_PROFILE: {self.USE_COLUMN_PROFILE}")
+        logger.info(f"SCHEMA_CACHE_TTL: {self.SCHEMA_CACHE_TTL}")
+        logger.info(f"SCHEMA_CACHE_MAX_SIZE: {self.SCHEMA_CACHE_MAX_SIZE}")
+        logger.info(f"SAMPLE_CACHE_TTL: {self.SAMPLE_CACHE_TTL}")
+        logger.info(f"SAMPLE_CACHE_MAX_SIZE: {self.SAMPLE_CACHE_MAX_SIZE}")
+        logger.info(f"LLM_CACHE_ENABLED: {self.LLM_CACHE_ENABLED}")
+        logger.info(f"LLM_CACHE_TTL: {self.LLM_CACHE_TTL}")
+        logger.info(f"LLM_CACHE_PATH: {self.LLM_CACHE_PATH}")
+        logger.info(f"QUESTION_CACHE_ENABLED: {self.QUESTION_CACHE_ENABLED}")
+        logger.info(f"QUESTION_CACHE_THRESHOLD: {self.QUESTION_CACHE_THRESHOLD}")
+        logger.info(f"LLM_MAX_IN_FLIGHT: {self.LLM_MAX_IN_FLIGHT}")
+        logger.info(f"LLM_SCHEDULER_AGING_SECONDS: {self.LLM_SCHEDULER_AGING_SECONDS}")
+        logger.info(f"LLM_HEDGING_ENABLED: {self.LLM_HEDGING_ENABLED}")
+        logger.info(f"LLM_HEDGE_BUDGETS: {self.LLM_HEDGE_BUDGETS}")
+        logger.info(f"SKIP_ENGLISH_TRANSLATION: {self.SKIP_ENGLISH_TRANSLATION}")
+        logger.info(f"FUSED_RETRIEVAL: {self.FUSED_RETRIEVAL}")
+        logger.info(f"SQL_STREAMING: {self.SQL_STREAMING}")
+        logger.info(f"PROMPT_TOKEN_BUDGET: {self.PROMPT_TOKEN_BUDGET}")
+        logger.info(f"PROMPT_TOKENIZER: {self.PROMPT_TOKENIZER}")
+        logger.info(f"OLLAMA_NUM_CTX_AUTO: {self.OLLAMA_NUM_CTX_AUTO}")
+        logger.info(f"OLLAMA_NUM_CTX_BUCKETS: {self.OLLAMA_NUM_CTX_BUCKETS}")
+        logger.info(f"OLLAMA_NUM_CTX_RESERVE: {self.OLLAMA_NUM_CTX_RESERVE}")
+        logger.info(f"OLLAMA_NUM_CTX_MARGIN: {self.OLLAMA_NUM_CTX_MARGIN}")
+        logger.info(f"OLLAMA_NUM_CTX_IDLE_SECONDS: {self.OLLAMA_NUM_CTX_IDLE_SECONDS}")
+
     def print_banner(self, banner_file='banner.txt'):
         """Print a banner from a file when the application starts if it exists"""
         try:
@@ -74,6 +199,7 @@ def initialize_workflows():
     workflow = SQLAgentWorkflow(
         text2sql_prompt=TEXT_TO_SQL_PROMPT_SKELETON,
         llm=llm_config.get_llm(),
+        prompt_routing=llm_config.settings["prompt_routing"],
         verbose=True
     )
     logger.info("SQL Agent Workflow initialized successfully")
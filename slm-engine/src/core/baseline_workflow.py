@@ -15,7 +15,7 @@ from core.utils import (
 from llama_index.core import PromptTemplate
 from llama_index.llms.ollama import Ollama
 from llama_index.llms.google_genai import GoogleGenAI
-from core.services import llm_chat
+from core.services import allm_chat
 import logging
 from datetime import datetime
 
@@ -91,7 +91,7 @@ class BaselineWorkflow(Workflow):
         
         logger.info("\033[93m[GENERATE] Querying LLM for SQL generation...\033[0m")
         llm_start_time = datetime.now()
-        chat_response = llm_chat(self.llm, fmt_messages)
+        chat_response = await allm_chat(self.llm, fmt_messages, step="generate")
         llm_end_time = datetime.now()
         
         logger.info(f"\033[93m[GENERATE] LLM response time: {(llm_end_time - llm_start_time).total_seconds():.2f} seconds\033[0m")
@@ -34,4 +34,8 @@ class QuestionSuggestionEvent(Event):
     """Event for generating question suggestions based on schema."""
     table_details: list[object]
     database_description: str = ""
-    top_k: int = 5 
\ No newline at end of file
+    top_k: int = 5 
+class SQLProgressEvent(Event):
+    """Partial SQL streamed by a workflow step, written to the workflow's event stream."""
+    step: str
+    text: str
@@ -0,0 +1,172 @@
+import difflib
+import re
+import threading
+import unicodedata
+from typing import Any, Dict, List, Optional, Set
+from unidecode import unidecode
+from config.app_config import app_config
+
+ENGLISH = "en"
+VIETNAMESE = "vi"
+OTHER = "other"
+UNKNOWN = "unknown"
+
+# Letters and tone marks (hook above, dot below) only Vietnamese uses among Latin scripts;
+# acute, grave and tilde are shared with other languages and left to the word lists
+_VIETNAMESE_LETTERS = set("ăâđêôơưĂÂĐÊÔƠƯ")
+_VIETNAMESE_TONE_MARKS = {"\u0309", "\u0323"}
+
+# Function words and question vocabulary; a question needs some of them to count as English
+_ENGLISH_WORDS = {
+    "a", "about", "above", "after", "all", "an", "and", "any", "are", "as", "at", "average", "be", "before",
+    "below", "between", "by", "count", "did", "do", "does", "each", "every", "find", "for", "from", "get",
+    "give", "has", "have", "highest", "how", "in", "is", "last", "least", "list", "lowest", "many", "me",
+    "most", "much", "number", "of", "on", "or", "order", "over", "per", "show", "than", "that", "the",
+    "their", "there", "this", "those", "to", "top", "total", "under", "was", "were", "what", "when",
+    "where", "which", "who", "whose", "with", "without", "year", "month", "week", "day", "today"
+}
+
+# Frequent Vietnamese words written without diacritics, as users often type them
+_VIETNAMESE_WORDS = {
+    "bao", "nhieu", "cua", "nhung", "cac", "khach", "hang", "trong", "nhat", "theo", "thang", "nhu", "the",
+    "nao", "duoc", "co", "khong", "tong", "so", "luong", "danh", "sach", "cho", "toi", "hay", "liet", "ke",
+    "tat", "ca", "moi", "ngay", "tuan", "doanh", "thu", "san", "pham", "don", "nguoi", "dung", "gia", "tri"
+}
+
+# Words the two lists share (e.g. "the") do not decide anything
+_AMBIGUOUS_WORDS = _ENGLISH_WORDS & _VIETNAMESE_WORDS
+
+def _words(text: str) -> List[str]:
+    return re.findall(r"[a-z]+", unidecode(text).lower())
+
+def _script(char: str) -> Optional[str]:
+    """Script of a letter, taken from its Unicode name (LATIN, CYRILLIC, CJK, ...)."""
+    try:
+        return unicodedata.name(char).split(" ")[0]
+    except ValueError:
+        return None
+
+def detect_language(text: str) -> str:
+    """
+    Language of a question: English, Vietnamese, another language, or unknown.
+
+    Detection is local and cheap: letters outside the Latin script mean another language,
+    Vietnamese-only letters or tone marks (or Vietnamese words typed without them) mean
+    Vietnamese, and ASCII text needs English function or question words to be English.
+    """
+    letters = [char for char in text if char.isalpha()]
+    if not letters:
+        return UNKNOWN
+    if any(_script(char) != "LATIN" for char in letters):
+        return OTHER
+
+    composed = unicodedata.normalize("NFC", text)
+    decomposed = unicodedata.normalize("NFD", text)
+    if any(char in _VIETNAMESE_LETTERS for char in composed) or any(char in _VIETNAMESE_TONE_MARKS for char in decomposed):
+        return VIETNAMESE
+
+    words = [word for word in _words(text) if word not in _AMBIGUOUS_WORDS]
+    vietnamese = sum(1 for word in words if word in _VIETNAMESE_WORDS)
+    english = sum(1 for word in words if word in _ENGLISH_WORDS)
+    if vietnamese >= 2 and vietnamese > english:
+        return VIETNAMESE
+    if any(not char.isascii() for char in letters):
+        # Accented Latin letters that are not Vietnamese: French, Spanish, German...
+        return OTHER
+    return ENGLISH if english else UNKNOWN
+
+def _identifier_words(identifier: str) -> List[str]:
+    # order_items, orderItems and OrderItems all give ["order", "items"]
+    spaced = re.sub(r"([a-z0-9])([A-Z])", r"\1 \2", identifier)
+    return [word for word in re.split(r"[^A-Za-z0-9]+", spaced.lower()) if word]
+
+def schema_vocabulary(tables: List[dict]) -> Set[str]:
+    """Lower-case table and column names, and the words they are made of."""
+    vocabulary = set()
+    for table in tables:
+        names = [table["tableIdentifier"]] + [column["columnIdentifier"] for column in table.get("columns", [])]
+        for name in names:
+            vocabulary.add(name.lower())
+            vocabulary.update(_identifier_words(name))
+    return vocabulary
+
+def _singular(word: str) -> str:
+    if word.endswith("ies"):
+        return word[:-3] + "y"
+    if word.endswith("es") and word[:-2].endswith(("s", "x", "ch", "sh")):
+        return word[:-2]
+    if word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+def schema_ambiguous_terms(question: str, vocabulary: Set[str]) -> List[str]:
+    """
+    Terms of a question that nearly, but not exactly, name something in the schema.
+
+    These are misspellings or variants of table and column names (e.g. "custmers" for
+    "customers"), and identifier-like tokens (with underscores or digits) the schema does not
+    have. The refinement step maps such terms onto the schema, so it should not be skipped.
+    """
+    singulars = {_singular(word) for word in vocabulary}
+    ambiguous = []
+    for token in re.findall(r"[A-Za-z_][A-Za-z0-9_]*", question):
+        word = token.lower()
+        if word in vocabulary or _singular(word) in singulars or word in _ENGLISH_WORDS:
+            continue
+        if "_" in word or any(char.isdigit() for char in word):
+            ambiguous.append(token)
+        elif len(word) >= 4 and difflib.get_close_matches(word, vocabulary, n=1, cutoff=0.8):
+            ambiguous.append(token)
+    return ambiguous
+
+class TranslationGate:
+    """
+    Decides whether a question needs the LLM translation and refinement step.
+
+    English questions whose terms are either exact schema names or unrelated to the schema
+    are used as they are; everything else is translated. Counts of checked and skipped
+    questions are kept per language and per reason.
+    """
+
+    def __init__(self, enabled: bool):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._checked = 0
+        self._skipped = 0
+        self._languages: Dict[str, int] = {}
+        self._reasons: Dict[str, int] = {}
+
+    def _count(self, language: str, reason: str, skipped: bool) -> None:
+        with self._lock:
+            self._checked += 1
+            self._skipped += int(skipped)
+            self._languages[language] = self._languages.get(language, 0) + 1
+            self._reasons[reason] = self._reasons.get(reason, 0) + 1
+
+    def needs_translation(self, question: str, tables: List[dict]) -> bool:
+        if not self.enabled:
+            return True
+        language = detect_language(question)
+        if language != ENGLISH:
+            self._count(language, "not_english", skipped=False)
+            return True
+        if schema_ambiguous_terms(question, schema_vocabulary(tables)):
+            self._count(language, "schema_ambiguous_terms", skipped=False)
+            return True
+        self._count(language, "english", skipped=True)
+        return False
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get how often translation was skipped, and why questions were translated."""
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "checked": self._checked,
+                "skipped": self._skipped,
+                "skip_rate": round(self._skipped / self._checked, 4) if self._checked else 0.0,
+                "languages": dict(self._languages),
+                "reasons": dict(self._reasons)
+            }
+
+# Create a singleton instance
+translation_gate = TranslationGate(enabled=app_config.SKIP_ENGLISH_TRANSLATION)
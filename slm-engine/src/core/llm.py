@@ -1,7 +1,12 @@
 from ast import Tuple
 import os
+import contextlib
 import logging
-from typing import Dict, Any, Optional, Union
+import threading
+import time
+import httpx
+from ollama import ResponseError
+from typing import Dict, Any, List, Optional, Union
 from abc import ABC, abstractmethod
 from llama_index.llms.ollama import Ollama
 from llama_index.llms.google_genai import GoogleGenAI
@@ -36,7 +41,9 @@ class BaseLLMConfig(ABC):
 
     def get_settings(self) -> Dict[str, Any]:
         """Get current LLM settings."""
-        return self.settings.copy()
+        settings = self.settings.copy()
+        settings["generation_profiles"] = generation_profiles.as_dict()
+        return settings
 
     def get_llm(self) -> LLM:
         """Get the current LLM instance."""
@@ -46,13 +53,302 @@ class BaseLLMConfig(ABC):
         """Get the health check result."""
         return self._health_check()
 
+class _PoolBackend:
+    """One Ollama server of an OllamaPool with its load, health and latency counters."""
+
+    def __init__(self, host: str, llm: Ollama):
+        self.host = host
+        self.llm = llm
+        self.outstanding = 0
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+        self.ejections = 0
+        self.latency_ewma = None
+
+    def is_available(self, now: float) -> bool:
+        return self.ejected_until <= now
+
+def _is_backend_failure(error: Exception) -> bool:
+    """Whether an error means the server is unhealthy, as opposed to a bad response to one request."""
+    if isinstance(error, (httpx.TransportError, ConnectionError, TimeoutError)):
+        return True
+    return isinstance(error, ResponseError) and (getattr(error, "status_code", 0) or 0) >= 500
+
+# Settings every server of a pool shares, readable on the pool itself
+_POOL_SHARED_SETTINGS = frozenset({
+    "model", "temperature", "max_tokens", "context_window", "request_timeout", "prompt_key", "json_mode",
+    "additional_kwargs", "keep_alive", "is_function_calling_model", "thinking", "metadata"
+})
+
+# Client methods a pool does not route: callers must route() a server and call its client
+_POOL_UNROUTED_METHODS = frozenset({
+    "stream_complete", "astream_complete", "stream_chat", "astream_chat", "predict", "apredict",
+    "stream", "astream", "model_copy"
+})
+
+class OllamaPool:
+    """
+    Several Ollama servers serving the same model, used as one LLM.
+
+    Each request goes to the available server with the fewest outstanding requests, ties
+    broken by recent latency. Servers are health checked passively: after eject_after
+    consecutive connection failures, timeouts or server errors, a server is ejected for
+    eject_seconds and then tried again. The request methods (chat, complete, structured
+    predict and their async forms) route every call; streaming must go through route().
+    Of the other attributes only the settings all servers share (model, generation
+    parameters) can be read, so nothing silently reaches one server unbalanced.
+    """
+
+    def __init__(self, hosts: List[str], eject_after: int = 3, eject_seconds: float = 30.0, **ollama_kwargs):
+        self.backends = [_PoolBackend(host, Ollama(base_url=host, **ollama_kwargs)) for host in hosts]
+        self.eject_after = eject_after
+        self.eject_seconds = eject_seconds
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name: str) -> Any:
+        # Only reached for attributes the pool does not define itself
+        if name in _POOL_SHARED_SETTINGS and "backends" in self.__dict__:
+            # Every server's client is built from the same settings
+            return getattr(self.__dict__["backends"][0].llm, name)
+        if name in _POOL_UNROUTED_METHODS:
+            raise AttributeError(f"OllamaPool does not route {name}; use route() to pick a server and call its client")
+        raise AttributeError(name)
+
+    @property
+    def backend_key(self) -> str:
+        return "pool:" + ",".join(backend.host for backend in self.backends)
+
+    @property
+    def capacity(self) -> int:
+        """Number of servers currently taking requests."""
+        now = time.monotonic()
+        return max(1, sum(1 for backend in self.backends if backend.is_available(now)))
+
+    def _choose(self, exclude) -> _PoolBackend:
+        now = time.monotonic()
+        with self._lock:
+            available = [backend for backend in self.backends if backend.is_available(now)]
+            preferred = [backend for backend in available if all(backend.llm is not llm for llm in exclude)]
+            available = preferred or available
+            if available:
+                backend = min(available, key=lambda b: (b.outstanding, b.latency_ewma or 0.0))
+            else:
+                # Every server is ejected: try the one that comes back first
+                backend = min(self.backends, key=lambda b: b.ejected_until)
+            backend.outstanding += 1
+            backend.requests += 1
+            return backend
+
+    def _record(self, backend: _PoolBackend, elapsed: float, error: Optional[Exception]) -> None:
+        with self._lock:
+            backend.outstanding -= 1
+            if error is not None and _is_backend_failure(error):
+                backend.failures += 1
+                backend.consecutive_failures += 1
+                if backend.consecutive_failures >= self.eject_after:
+                    backend.ejected_until = time.monotonic() + self.eject_seconds
+                    backend.ejections += 1
+                    logger.warning(f"Ejected Ollama backend {backend.host} for {self.eject_seconds}s: {error}")
+                return
+            backend.consecutive_failures = 0
+            backend.latency_ewma = elapsed if backend.latency_ewma is None else 0.8 * backend.latency_ewma + 0.2 * elapsed
+
+    @contextlib.contextmanager
+    def route(self, exclude=()):
+        """
+        Pick a server for one request and yield its client, recording the outcome on exit.
+
+        Servers whose clients are in exclude are only used when no other server is available.
+        """
+        backend = self._choose(exclude)
+        start = time.monotonic()
+        try:
+            yield backend.llm
+        except Exception as e:
+            self._record(backend, time.monotonic() - start, e)
+            raise
+        except BaseException:
+            # Cancelled requests say nothing about the server's health
+            with self._lock:
+                backend.outstanding -= 1
+            raise
+        self._record(backend, time.monotonic() - start, None)
+
+    def complete(self, *args, **kwargs):
+        with self.route() as llm:
+            return llm.complete(*args, **kwargs)
+
+    async def acomplete(self, *args, **kwargs):
+        with self.route() as llm:
+            return await llm.acomplete(*args, **kwargs)
+
+    def chat(self, *args, **kwargs):
+        with self.route() as llm:
+            return llm.chat(*args, **kwargs)
+
+    async def achat(self, *args, **kwargs):
+        with self.route() as llm:
+            return await llm.achat(*args, **kwargs)
+
+    def structured_predict(self, *args, **kwargs):
+        with self.route() as llm:
+            return llm.structured_predict(*args, **kwargs)
+
+    async def astructured_predict(self, *args, **kwargs):
+        with self.route() as llm:
+            return await llm.astructured_predict(*args, **kwargs)
+
+    def health_check(self) -> List[Tuple[str, bool, str]]:
+        """Send a short completion to every server, ejected ones included: (host, healthy, response or error)."""
+        results = []
+        for backend in self.backends:
+            try:
+                results.append((backend.host, True, str(backend.llm.complete("Say 'Hi'"))))
+            except Exception as e:
+                results.append((backend.host, False, str(e)))
+        return results
+
+    def get_stats(self) -> List[Dict[str, Any]]:
+        """Get load, health and latency per server."""
+        now = time.monotonic()
+        with self._lock:
+            return [
+                {
+                    "host": backend.host,
+                    "available": backend.is_available(now),
+                    "outstanding": backend.outstanding,
+                    "requests": backend.requests,
+                    "failures": backend.failures,
+                    "ejections": backend.ejections,
+                    "latency_ewma_seconds": round(backend.latency_ewma, 3) if backend.latency_ewma is not None else None
+                }
+                for backend in self.backends
+            ]
+
+# Decoding limits per workflow step. Steps that return a short structured answer get a small
+# max_tokens, so a small model that starts rambling is cut off early; None keeps the model's setting.
+DEFAULT_GENERATION_PROFILES = {
+    "translate": {"max_tokens": 256, "temperature": 0.0, "stop": [], "num_ctx": None},
+    "retrieve": {"max_tokens": 256, "temperature": 0.0, "stop": [], "num_ctx": None},
+    "translate_retrieve": {"max_tokens": 512, "temperature": 0.0, "stop": [], "num_ctx": None},
+    "generate": {"max_tokens": 1024, "temperature": 0.0, "stop": [], "num_ctx": None},
+    "reflect": {"max_tokens": 1024, "temperature": 0.0, "stop": [], "num_ctx": None},
+    "describe": {"max_tokens": 512, "temperature": 0.3, "stop": [], "num_ctx": None},
+    "enrich": {"max_tokens": 4096, "temperature": 0.2, "stop": [], "num_ctx": None},
+    "suggest": {"max_tokens": 1024, "temperature": 0.7, "stop": [], "num_ctx": None},
+}
+
+_PROFILE_FIELDS = ("max_tokens", "temperature", "stop", "num_ctx")
+
+def _profiled_client(llm, profile: Dict[str, Any]):
+    """Copy of an LLM client that decodes with a generation profile."""
+    if isinstance(llm, Ollama):
+        # additional_kwargs are sent as the request options and win over the client's fields
+        options = dict(llm.additional_kwargs or {})
+        if profile.get("max_tokens") is not None:
+            options["num_predict"] = profile["max_tokens"]
+        if profile.get("temperature") is not None:
+            options["temperature"] = profile["temperature"]
+        if profile.get("stop"):
+            options["stop"] = list(profile["stop"])
+        if profile.get("num_ctx"):
+            options["num_ctx"] = profile["num_ctx"]
+        return llm.model_copy(update={"additional_kwargs": options})
+    if isinstance(llm, GoogleGenAI):
+        variant = llm.model_copy()
+        generation_config = dict(getattr(llm, "_generation_config", None) or {})
+        if profile.get("max_tokens") is not None:
+            generation_config["max_output_tokens"] = profile["max_tokens"]
+        if profile.get("temperature") is not None:
+            generation_config["temperature"] = profile["temperature"]
+        if profile.get("stop"):
+            generation_config["stop_sequences"] = list(profile["stop"])
+        variant._generation_config = generation_config
+        return variant
+    return llm
+
+class GenerationProfiles:
+    """
+    Generation profiles per workflow step: max tokens, temperature, stop sequences and num_ctx.
+
+    The LLM layer runs each request of a step on a copy of the client configured with the
+    step's profile; copies are made once per client and profile version. Profiles are
+    independent of the provider, so they survive switching providers in /settings.
+    """
+
+    def __init__(self, profiles: Dict[str, Dict[str, Any]]):
+        self._profiles = {step: dict(profile) for step, profile in profiles.items()}
+        self._version = 0
+        self._clients: Dict[Tuple[int, str, Optional[int]], Tuple[Any, int, Any]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, step: Optional[str]) -> Dict[str, Any]:
+        """Profile of a step, empty for steps without one."""
+        with self._lock:
+            return dict(self._profiles.get(step, {}))
+
+    def as_dict(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {step: dict(profile) for step, profile in self._profiles.items()}
+
+    def update(self, overrides: Dict[str, Dict[str, Any]]) -> None:
+        """Merge per-step overrides, e.g. {"retrieve": {"max_tokens": 128}}; unknown fields are rejected."""
+        for step, profile in overrides.items():
+            unknown = set(profile) - set(_PROFILE_FIELDS)
+            if unknown:
+                raise ValueError(f"Unknown generation profile fields for step '{step}': {sorted(unknown)}")
+        with self._lock:
+            for step, profile in overrides.items():
+                merged = self._profiles.setdefault(step, {field: None for field in _PROFILE_FIELDS})
+                merged.update(profile)
+            self._version += 1
+            self._clients.clear()
+        logger.info(f"Generation profiles updated: {overrides}")
+
+    def client_for(self, llm, step: Optional[str], num_ctx: Optional[int] = None):
+        """
+        The client to send a request of a step with: a profiled copy of llm, or llm itself.
+
+        num_ctx, when given, replaces the profile's context window for this request.
+        """
+        profile = self.get(step)
+        if num_ctx:
+            profile["num_ctx"] = num_ctx
+        if all(profile.get(field) in (None, []) for field in _PROFILE_FIELDS):
+            return llm
+        key = (id(llm), step, profile.get("num_ctx"))
+        with self._lock:
+            cached = self._clients.get(key)
+            # The base client is kept in the entry so a reused id never maps to a stale copy
+            if cached is not None and cached[0] is llm and cached[1] == self._version:
+                return cached[2]
+            version = self._version
+        variant = _profiled_client(llm, profile)
+        with self._lock:
+            self._clients[key] = (llm, version, variant)
+        return variant
+
+# Create a singleton instance
+generation_profiles = GenerationProfiles(DEFAULT_GENERATION_PROFILES)
+
+def _update_generation_profiles(overrides: Dict[str, Dict[str, Any]]) -> None:
+    # update_settings receives the overrides under the singleton's name
+    generation_profiles.update(overrides)
+
 class OllamaConfig(BaseLLMConfig):
     """Ollama-specific LLM configuration."""
     
     def _get_default_settings(self) -> Dict[str, Any]:
+        ollama_host = os.getenv("OLLAMA_HOST", "http://localhost:9292/")
         return {
-            "ollama_host": os.getenv("OLLAMA_HOST", "http://localhost:9292/"),
+            "ollama_host": ollama_host,
+            # Comma-separated servers serving the same model; more than one enables the pool
+            "ollama_hosts": [host.strip() for host in os.getenv("OLLAMA_HOSTS", ollama_host).split(",") if host.strip()],
             "ollama_model": os.getenv("OLLAMA_MODEL", "llama3.1:8b"),
+            "pool_eject_after": int(os.getenv("OLLAMA_POOL_EJECT_AFTER", 3)),
+            "pool_eject_seconds": float(os.getenv("OLLAMA_POOL_EJECT_SECONDS", 30)),
             "additional_kwargs": {
                 "num_predict": 8192,
                 "temperature": 0.7,
@@ -64,24 +360,43 @@ class OllamaConfig(BaseLLMConfig):
     def _initialize_llm(self) -> None:
         """Initialize the Ollama LLM client with current settings."""
         logger.info("Initializing Ollama LLM client with settings:")
-        logger.info(f"Host: {self.settings['ollama_host']}")
+        logger.info(f"Hosts: {self.settings['ollama_hosts']}")
         logger.info(f"Model: {self.settings['ollama_model']}")
         logger.info(f"Additional kwargs: {self.settings['additional_kwargs']}")
         logger.info(f"Prompt routing: {self.settings['prompt_routing']}")
         logger.info(f"Enrich schema: {self.settings['enrich_schema']}")
         
-        self.llm = Ollama(
-            model=self.settings["ollama_model"],
-            base_url=self.settings["ollama_host"],
-            request_timeout=300.0,
-            keep_alive=30*60,
-            # additional_kwargs=self.settings["additional_kwargs"]
-        )
+        if len(self.settings["ollama_hosts"]) > 1:
+            self.llm = OllamaPool(
+                hosts=self.settings["ollama_hosts"],
+                eject_after=self.settings["pool_eject_after"],
+                eject_seconds=self.settings["pool_eject_seconds"],
+                model=self.settings["ollama_model"],
+                request_timeout=300.0,
+                keep_alive=30*60,
+                additional_kwargs=self.settings["additional_kwargs"]
+            )
+        else:
+            self.llm = Ollama(
+                model=self.settings["ollama_model"],
+                base_url=self.settings["ollama_hosts"][0],
+                request_timeout=300.0,
+                keep_alive=30*60,
+                additional_kwargs=self.settings["additional_kwargs"]
+            )
         
         logger.info("Ollama LLM client initialized successfully")
     
     def _health_check(self) -> Tuple[bool, str]:
-        """Check if the LLM is healthy."""
+        """Check if the LLM is healthy; a pool is healthy when every server answers."""
+        if isinstance(self.llm, OllamaPool):
+            results = self.llm.health_check()
+            for host, healthy, detail in results:
+                if healthy:
+                    logger.info(f"Test response from {host}: {detail}")
+                else:
+                    logger.error(f"Failed to connect to Ollama at {host}: {detail}")
+            return all(healthy for _, healthy, _ in results), "\n".join(f"{host}: {detail}" for host, _, detail in results)
         try:
             response = self.llm.complete("Say 'Hi'")
             logger.info(f"Test response: {response}")
@@ -96,11 +411,21 @@ class OllamaConfig(BaseLLMConfig):
         model: Optional[str] = None,
         additional_kwargs: Optional[Dict[str, Any]] = None,
         prompt_routing: Optional[int] = None,
-        enrich_schema: Optional[bool] = None
+        enrich_schema: Optional[bool] = None,
+        hosts: Optional[List[str]] = None,
+        generation_profiles: Optional[Dict[str, Dict[str, Any]]] = None
     ) -> None:
         """Update Ollama LLM settings and reinitialize the client."""
+        if generation_profiles:
+            _update_generation_profiles(generation_profiles)
         if host is not None:
             self.settings["ollama_host"] = host
+            self.settings["ollama_hosts"] = [host]
+        if hosts:
+            if isinstance(hosts, str):
+                hosts = hosts.split(",")
+            self.settings["ollama_hosts"] = [h.strip() for h in hosts if h.strip()]
+            self.settings["ollama_host"] = self.settings["ollama_hosts"][0]
         if model is not None:
             self.settings["ollama_model"] = model
         if additional_kwargs is not None:
@@ -170,9 +495,12 @@ class GoogleGenAIConfig(BaseLLMConfig):
         max_tokens: Optional[int] = None,
         thinking_budget: Optional[int] = None,
         prompt_routing: Optional[int] = None,
-        enrich_schema: Optional[bool] = None
+        enrich_schema: Optional[bool] = None,
+        generation_profiles: Optional[Dict[str, Dict[str, Any]]] = None
     ) -> None:
         """Update Google Gemini LLM settings and reinitialize the client."""
+        if generation_profiles:
+            _update_generation_profiles(generation_profiles)
         if model is not None:
             self.settings["model"] = model
         if api_key is not None:
@@ -8,6 +8,11 @@ class TranslatedQuery(BaseModel):
 class ListOfRelevantTables(BaseModel):
     relevant_tables: List[str] = Field(..., description="The list of ***ALL POTENTIALLY RELEVANT*** tables to use in the SQL query")
 
+class TranslatedQueryWithTables(BaseModel):
+    """Model for the fused query translation and table retrieval step."""
+    translated_query: str = Field(..., description="The translated question in English")
+    relevant_tables: List[str] = Field(..., description="The list of ***ALL POTENTIALLY RELEVANT*** tables to use in the SQL query")
+
 class SQLQuery(BaseModel):
     """Model for SQL query generation and correction."""
     sql_query: str = Field(..., description="The SQL query to execute")
@@ -0,0 +1,125 @@
+"""
+Compact per-column statistics used in prompts instead of raw sample rows.
+
+A table is profiled with one aggregate statement over a bounded row sample, plus one
+UNION ALL statement collecting the most frequent values of low-cardinality columns.
+Profiles only depend on the table definition, so they are cached per table version.
+"""
+import hashlib
+import json
+from typing import Any, Dict, List
+from core.sampling import quote_identifier, cast_to_text, sampled_columns, type_matches, TEXT_TYPE_HINTS
+
+# Column type names for which min/max describe a meaningful range
+_RANGE_TYPE_HINTS = frozenset({
+    "int", "integer", "tinyint", "smallint", "mediumint", "bigint", "serial", "smallserial", "bigserial",
+    "real", "float", "double", "decimal", "numeric", "number", "money", "smallmoney",
+    "date", "datetime", "smalldatetime", "timestamp", "timestamptz", "time", "timetz", "year"
+})
+
+def table_version(table: Dict[str, Any]) -> str:
+    """Hash of a table's name and column definitions; changes whenever the table does."""
+    definition = [table["tableIdentifier"], [
+        [column.get("columnIdentifier"), column.get("columnType")] for column in table.get("columns", [])
+    ]]
+    return hashlib.sha256(json.dumps(definition).encode("utf-8")).hexdigest()[:16]
+
+def schema_version(tables: List[Dict[str, Any]]) -> str:
+    """Hash of all table definitions of a schema, independent of table order."""
+    versions = sorted(table_version(table) for table in tables)
+    return hashlib.sha256("|".join(versions).encode("utf-8")).hexdigest()[:16]
+
+def _sampled_source(db_type: str, table_name: str, sample_rows: int, columns: str = "*") -> str:
+    # LIMIT bounds the scan on large tables; small tables are profiled in full
+    return f"(SELECT {columns} FROM {quote_identifier(db_type, table_name)} LIMIT {int(sample_rows)}) AS sampled"
+
+def profile_table_query(db_type: str, table: Dict[str, Any], sample_rows: int) -> str:
+    """One aggregate statement computing the statistics of every profiled column."""
+    length_function = "CHAR_LENGTH" if db_type == "mysql" else "LENGTH"
+    aggregates = ["COUNT(*) AS row_count"]
+    for index, column in enumerate(sampled_columns(table)):
+        quoted = quote_identifier(db_type, column["columnIdentifier"])
+        column_type = column.get("columnType")
+        aggregates.append(f"SUM(CASE WHEN {quoted} IS NULL THEN 1 ELSE 0 END) AS c{index}_nulls")
+        aggregates.append(f"COUNT(DISTINCT {cast_to_text(db_type, quoted)}) AS c{index}_distinct")
+        if type_matches(column_type, _RANGE_TYPE_HINTS):
+            aggregates.append(f"MIN({quoted}) AS c{index}_min")
+            aggregates.append(f"MAX({quoted}) AS c{index}_max")
+        if type_matches(column_type, TEXT_TYPE_HINTS):
+            aggregates.append(f"AVG({length_function}({quoted})) AS c{index}_avg_length")
+    return f"SELECT {', '.join(aggregates)} FROM {_sampled_source(db_type, table['tableIdentifier'], sample_rows)}"
+
+def _row_value(row: Dict[str, Any], key: str) -> Any:
+    # Some drivers upper-case unquoted aliases
+    return row.get(key, row.get(key.upper()))
+
+def parse_profile_row(row: Dict[str, Any], table: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Turn the single row of profile_table_query into per-column statistics."""
+    row_count = int(_row_value(row, "row_count") or 0)
+    stats = {}
+    for index, column in enumerate(sampled_columns(table)):
+        nulls = int(_row_value(row, f"c{index}_nulls") or 0)
+        column_stats = {
+            "sampled_rows": row_count,
+            "null_ratio": round(nulls / row_count, 4) if row_count else 0.0,
+            "distinct_count": int(_row_value(row, f"c{index}_distinct") or 0),
+        }
+        for key in ("min", "max"):
+            value = _row_value(row, f"c{index}_{key}")
+            if value is not None:
+                column_stats[key] = value
+        avg_length = _row_value(row, f"c{index}_avg_length")
+        if avg_length is not None:
+            column_stats["avg_length"] = round(float(avg_length), 1)
+        stats[column["columnIdentifier"]] = column_stats
+    return stats
+
+def top_value_columns(table: Dict[str, Any], stats: Dict[str, Dict[str, Any]], max_distinct: int) -> List[str]:
+    """Low-cardinality, non-key columns whose most frequent values are worth showing."""
+    return [
+        column["columnIdentifier"] for column in sampled_columns(table)
+        if not column.get("isPrimaryKey")
+        and 1 < stats.get(column["columnIdentifier"], {}).get("distinct_count", 0) <= max_distinct
+    ]
+
+def top_values_query(db_type: str, table_name: str, column_names: List[str], sample_rows: int, top_k: int) -> str:
+    """Most frequent values of several columns in one UNION ALL statement."""
+    branches = []
+    for index, column_name in enumerate(column_names):
+        quoted = quote_identifier(db_type, column_name)
+        value = cast_to_text(db_type, quoted)
+        branches.append(
+            f"SELECT {index} AS column_index, top_value, frequency FROM ("
+            f"SELECT {value} AS top_value, COUNT(*) AS frequency "
+            f"FROM {_sampled_source(db_type, table_name, sample_rows, quoted)} "
+            f"WHERE {quoted} IS NOT NULL GROUP BY {value} ORDER BY COUNT(*) DESC LIMIT {int(top_k)}"
+            f") AS top_{index}"
+        )
+    return "\nUNION ALL\n".join(branches)
+
+def parse_top_values_rows(rows: List[Dict[str, Any]], column_names: List[str]) -> Dict[str, List[Any]]:
+    """Group the rows of top_values_query by column name, most frequent first."""
+    top_values = {column_name: [] for column_name in column_names}
+    for row in sorted(rows or [], key=lambda r: -int(_row_value(r, "frequency") or 0)):
+        index = _row_value(row, "column_index")
+        if index is None or not 0 <= int(index) < len(column_names):
+            continue
+        top_values[column_names[int(index)]].append(_row_value(row, "top_value"))
+    return top_values
+
+def format_column_stats(stats: Dict[str, Any]) -> str:
+    """Render column statistics as a short, prompt-friendly phrase."""
+    if not stats:
+        return ""
+    parts = []
+    if stats.get("null_ratio"):
+        parts.append(f"nulls {stats['null_ratio'] * 100:.0f}%")
+    if stats.get("distinct_count"):
+        parts.append(f"~{stats['distinct_count']} distinct")
+    if "min" in stats or "max" in stats:
+        parts.append(f"range {stats.get('min')}..{stats.get('max')}")
+    if stats.get("top_values"):
+        parts.append("top: " + ", ".join(str(value)[:40] for value in stats["top_values"]))
+    if stats.get("avg_length") is not None:
+        parts.append(f"avg len {stats['avg_length']}")
+    return "; ".join(parts)
@@ -0,0 +1,175 @@
+import logging
+import math
+from typing import Any, Callable, Dict, List, Optional
+from config.app_config import app_config
+from core.utils import schema_parser, count_tokens
+from services.question_cache import normalize_question, question_vector, cosine_similarity
+
+logger = logging.getLogger(__name__)
+
+# Rough characters per token of the SQL-heavy prompts, used when no tokenizer is configured
+CHARS_PER_TOKEN = 3.5
+
+def prompt_tokens(text: str) -> int:
+    """Token count of a prompt, with the configured tokenizer or estimated from its length."""
+    if not text:
+        return 0
+    if app_config.PROMPT_TOKENIZER:
+        return count_tokens(text, app_config.PROMPT_TOKENIZER)
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+def _relevance(question_vec, *texts: Optional[str]) -> float:
+    return cosine_similarity(question_vec, question_vector(normalize_question(" ".join(t for t in texts if t))))
+
+def _key_columns(tables: List[dict]) -> Dict[str, set]:
+    """Primary key, foreign key and referenced columns per table; these are never dropped."""
+    keys = {table["tableIdentifier"]: set() for table in tables}
+    for table in tables:
+        for column in table["columns"]:
+            if column.get("isPrimaryKey") or column.get("relations"):
+                keys[table["tableIdentifier"]].add(column["columnIdentifier"])
+            for relation in column.get("relations") or []:
+                if relation.get("tableIdentifier") in keys:
+                    keys[relation["tableIdentifier"]].add(relation.get("toColumn"))
+    return keys
+
+def _without(table: dict, **overrides) -> dict:
+    return {**table, **overrides}
+
+def assemble_schema(
+    tables: List[dict],
+    type: str,
+    question: str,
+    render: Callable[[str], str],
+    include_sample_data: bool = False,
+    include_column_stats: bool = False,
+    description: str = None,
+    budget: int = None,
+    stable: bool = False
+) -> Dict[str, Any]:
+    """
+    Render the schema section of a prompt within a token budget.
+
+    render(schema) must return the whole prompt around the schema, so the database
+    description and instructions are charged to the budget first. The schema is then filled by priority:
+    table DDL with its key columns and foreign key lines always stay, sample rows are
+    dropped first (least relevant table first), and then the columns least relevant to the
+    question. Costs are measured per section, so the budget is filled without re-rendering
+    the schema for every candidate.
+
+    With stable, the drop order ignores the question: sample rows go from the last table
+    up, then columns from the last position up. A schema shared by many questions then
+    loses the same sections for all of them, so prefix-stable prompts stay byte-identical.
+
+    Returns the schema text, the prompt token count and a report of the section costs and
+    of everything that was dropped.
+    """
+    budget = app_config.PROMPT_TOKEN_BUDGET if budget is None else budget
+    options = {"include_sample_data": include_sample_data, "include_column_stats": include_column_stats}
+    schema = schema_parser(tables, type, **options)
+    if budget <= 0:
+        return {"schema": schema, "report": None}
+
+    fixed_tokens = prompt_tokens(render(""))
+    total = prompt_tokens(render(schema))
+    report = {
+        "budget": budget,
+        "fixed_tokens": fixed_tokens,
+        "full_schema_tokens": total - fixed_tokens,
+        "dropped_sample_rows": [],
+        "dropped_columns": {},
+        "over_budget": False
+    }
+    if total <= budget:
+        report["prompt_tokens"] = total
+        report["schema_tokens"] = total - fixed_tokens
+        return {"schema": schema, "report": report}
+
+    question_vec = question_vector(normalize_question(question))
+    key_columns = _key_columns(tables)
+    bare_tables = [_without(table, sample_data=[]) for table in tables]
+    bare_tokens = prompt_tokens(schema_parser(bare_tables, type, **options))
+
+    # Section costs: sample rows per table, then each droppable column
+    table_scores = {}
+    table_costs = {}
+    sample_costs = {}
+    column_costs = []
+    table_positions = {}
+    for table_position, table in enumerate(tables):
+        name = table["tableIdentifier"]
+        table_positions[name] = table_position
+        table_scores[name] = _relevance(
+            question_vec, name, table.get("tableDescription"),
+            " ".join(column["columnIdentifier"] for column in table["columns"])
+        )
+        table_costs[name] = prompt_tokens(schema_parser([_without(table, sample_data=[])], type, **options))
+        if include_sample_data and table.get("sample_data"):
+            sample_costs[name] = (
+                prompt_tokens(schema_parser([table], type, **options)) - table_costs[name]
+            )
+        empty_tokens = prompt_tokens(schema_parser([_without(table, columns=[], sample_data=[])], type, **options))
+        for column_position, column in enumerate(table["columns"]):
+            if column["columnIdentifier"] in key_columns[name]:
+                continue
+            cost = prompt_tokens(schema_parser([_without(table, columns=[column], sample_data=[])], type, **options)) - empty_tokens
+            if stable:
+                rank = (-column_position, -table_position)
+            else:
+                rank = (_relevance(question_vec, column["columnIdentifier"], column.get("columnDescription")), table_scores[name])
+            column_costs.append((rank, name, column["columnIdentifier"], max(cost, 1)))
+
+    report["sections"] = {
+        "description": prompt_tokens(description),
+        "instructions": fixed_tokens - prompt_tokens(description),
+        "tables": table_costs,
+        "sample_rows": sample_costs,
+        "foreign_keys": bare_tokens - prompt_tokens(schema_parser(
+            [_without(table, columns=[_without(c, relations=[]) for c in table["columns"]]) for table in bare_tables],
+            type, **options
+        ))
+    }
+
+    # Drops in priority order: sample rows of the least relevant (or last) tables, then the least relevant (or last) columns
+    table_rank = (lambda n: -table_positions[n]) if stable else (lambda n: table_scores[n])
+    drops = [("sample_rows", name, None, sample_costs[name]) for name in sorted(sample_costs, key=table_rank)]
+    drops += [("column", name, column_name, cost) for _, name, column_name, cost in sorted(column_costs)]
+
+    drop_samples = set()
+    drop_columns: Dict[str, set] = {}
+
+    def apply(drop) -> None:
+        kind, name, column_name, _ = drop
+        if kind == "sample_rows":
+            drop_samples.add(name)
+        else:
+            drop_columns.setdefault(name, set()).add(column_name)
+
+    estimate = total
+    while drops and estimate > budget:
+        drop = drops.pop(0)
+        apply(drop)
+        estimate -= drop[3]
+
+    while True:
+        budgeted_tables = [
+            _without(
+                table,
+                columns=[c for c in table["columns"] if c["columnIdentifier"] not in drop_columns.get(table["tableIdentifier"], ())],
+                sample_data=[] if table["tableIdentifier"] in drop_samples else table.get("sample_data", [])
+            )
+            for table in tables
+        ]
+        schema = schema_parser(budgeted_tables, type, **options)
+        total = prompt_tokens(render(schema))
+        # Section costs are estimates; keep going down the list if the rendered prompt still overflows
+        if total <= budget or not drops:
+            break
+        apply(drops.pop(0))
+
+    report["prompt_tokens"] = total
+    report["schema_tokens"] = total - fixed_tokens
+    report["over_budget"] = total > budget
+    report["dropped_sample_rows"] = sorted(drop_samples)
+    report["dropped_columns"] = {name: sorted(columns) for name, columns in drop_columns.items()}
+    return {"schema": schema, "report": report}
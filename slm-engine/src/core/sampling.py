@@ -0,0 +1,196 @@
+"""
+Dialect-specific SQL for sampling table data.
+
+All identifier quoting, random ordering, text casting, row-count estimation and
+large-table sampling strategies used by the sample data fetchers live here, so
+supporting a new dialect means touching a single module.
+"""
+import random
+import re
+from typing import Any, Dict, List, Optional
+
+# Identifier quote character per dialect; ANSI double quotes otherwise
+_QUOTE_CHARS = {
+    "mysql": "`",
+    "postgresql": '"',
+    "postgres": '"',
+    "sqlite": '"',
+}
+
+# Random ordering expression per dialect
+_RANDOM_ORDER = {
+    "mysql": "RAND()",
+    "sqlite": "RANDOM()",
+}
+
+# Text type to cast sampled values to, so UNION ALL branches share one column type
+_TEXT_TYPES = {
+    "mysql": "CHAR",
+    "postgresql": "TEXT",
+    "postgres": "TEXT",
+    "sqlite": "TEXT",
+}
+
+# Column type names (digits dropped, so int4/float8/varchar2 match int/float/varchar) for which
+# length is worth bounding at the database
+TEXT_TYPE_HINTS = frozenset({
+    "char", "varchar", "nchar", "nvarchar", "character", "bpchar", "text", "tinytext", "mediumtext",
+    "longtext", "ntext", "citext", "clob", "nclob", "string"
+})
+
+# Column type names that are never sampled: binary or spatial values are useless in prompts
+OPAQUE_TYPE_HINTS = frozenset({
+    "blob", "tinyblob", "mediumblob", "longblob", "bytea", "binary", "varbinary", "image",
+    "geometry", "geography", "point", "multipoint", "line", "lseg", "linestring", "multilinestring",
+    "polygon", "multipolygon", "box", "path", "circle", "geometrycollection"
+})
+
+def type_names(column_type: str) -> set:
+    """Words of a column type without its parameters: "timestamp(3) with time zone" gives timestamp, with, time, zone."""
+    column_type = re.sub(r"\([^)]*\)", " ", (column_type or "").lower())
+    return {name for name in re.split(r"[^a-z]+", column_type) if name}
+
+def type_matches(column_type: str, hints) -> bool:
+    """Whether any word of a column type is one of the given type names (never a substring: point is not int)."""
+    return not type_names(column_type).isdisjoint(hints)
+
+def sampled_columns(table_details: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Named columns of a table, without binary and spatial columns."""
+    return [
+        column for column in table_details.get("columns", [])
+        if column.get("columnIdentifier") and not type_matches(column.get("columnType"), OPAQUE_TYPE_HINTS)
+    ]
+
+def get_db_type(connection_payload) -> str:
+    """Normalized database type of a connection payload."""
+    return (connection_payload.get("dbType") or connection_payload.get("db_type") or "").lower()
+
+def quote_identifier(db_type: str, identifier: str) -> str:
+    """Quote a table or column name for the given dialect, escaping embedded quotes."""
+    quote_char = _QUOTE_CHARS.get(db_type, '"')
+    return f"{quote_char}{identifier.replace(quote_char, quote_char * 2)}{quote_char}"
+
+def cast_to_text(db_type: str, expression: str) -> str:
+    """Cast an expression to the dialect's text type."""
+    return f"CAST({expression} AS {_TEXT_TYPES.get(db_type, 'VARCHAR(1000)')})"
+
+def truncated_text(db_type: str, expression: str, max_length: int) -> str:
+    """Text value of an expression cut to max_length characters at the database."""
+    return f"SUBSTR({cast_to_text(db_type, expression)}, 1, {int(max_length)})"
+
+def row_estimate_query(db_type: str, table_name: str) -> Optional[str]:
+    """Cheap row-count estimate of a table from catalog statistics, when the dialect has one."""
+    if db_type in ("postgresql", "postgres"):
+        literal = quote_identifier(db_type, table_name).replace("'", "''")
+        return f"SELECT CAST(reltuples AS BIGINT) AS row_estimate FROM pg_class WHERE oid = to_regclass('{literal}')"
+    if db_type == "mysql":
+        literal = table_name.replace("'", "''")
+        return (
+            "SELECT TABLE_ROWS AS row_estimate FROM information_schema.TABLES "
+            f"WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = '{literal}'"
+        )
+    if db_type == "sqlite":
+        # rowids are dense unless rows were deleted, so the largest one bounds the row count
+        return f"SELECT MAX(rowid) AS row_estimate FROM {quote_identifier(db_type, table_name)}"
+    return None
+
+def parse_row_estimate(rows: List[Dict[str, Any]]) -> Optional[int]:
+    """Row estimate from the result of row_estimate_query, None when unknown."""
+    if not rows:
+        return None
+    row = rows[0]
+    # The query has one column; a driver that reports its base name (TABLE_ROWS) instead of the alias still parses
+    value = row.get("row_estimate", row.get("ROW_ESTIMATE", next(iter(row.values())) if len(row) == 1 else None))
+    if value is None or int(value) < 0:
+        # PostgreSQL reports -1 for tables that were never analyzed
+        return None
+    return int(value)
+
+def plan_sampling(db_type: str, table_name: str, row_estimate: Optional[int], large_table_rows: int, scan_rows: int) -> Dict[str, Any]:
+    """
+    Choose a bounded source to read a table's samples from, based on its estimated size.
+
+    Every plan reads about scan_rows rows at most, so sampling never scans and sorts a
+    whole table. Tables up to large_table_rows are read through a LIMIT window in random
+    order. Larger tables sample pages with TABLESAMPLE SYSTEM on PostgreSQL, probe a random
+    rowid range on SQLite, and read a LIMIT window without random ordering elsewhere. A
+    table of unknown size (e.g. a PostgreSQL table that was never analyzed) counts as large.
+    """
+    table = quote_identifier(db_type, table_name)
+    window = f"(SELECT * FROM {table} LIMIT {int(scan_rows)}) AS bounded"
+    if row_estimate is None:
+        return {"strategy": "limit", "source": window, "random_order": False}
+    if row_estimate <= large_table_rows:
+        return {"strategy": "window", "source": window, "random_order": True}
+    if db_type in ("postgresql", "postgres"):
+        percent = max(0.0001, min(100.0, scan_rows * 100.0 / row_estimate))
+        return {"strategy": "tablesample", "source": f"{table} TABLESAMPLE SYSTEM ({percent:.4f})", "random_order": False}
+    if db_type == "sqlite":
+        start = random.randint(0, max(0, row_estimate - scan_rows))
+        return {
+            "strategy": "rowid_probe",
+            "source": f"(SELECT * FROM {table} WHERE rowid > {start} LIMIT {int(scan_rows)}) AS probe",
+            "random_order": False
+        }
+    return {"strategy": "limit", "source": window, "random_order": False}
+
+def sample_projection(db_type: str, table_details: Dict[str, Any], max_length: int) -> str:
+    """Select list for sample rows: binary columns skipped, text columns truncated at the database."""
+    projection = []
+    for column in sampled_columns(table_details):
+        quoted = quote_identifier(db_type, column["columnIdentifier"])
+        if type_matches(column.get("columnType"), TEXT_TYPE_HINTS):
+            projection.append(f"{truncated_text(db_type, quoted, max_length)} AS {quoted}")
+        else:
+            projection.append(quoted)
+    return ", ".join(projection) if projection else "*"
+
+def _distinct_order_by(db_type: str, value_expression: str, random_order: bool = True) -> str:
+    if db_type in ("postgresql", "postgres"):
+        # PostgreSQL requires ORDER BY expressions of a SELECT DISTINCT to appear in the select list
+        return f"ORDER BY {value_expression}"
+    if random_order and db_type in _RANDOM_ORDER:
+        return f"ORDER BY {_RANDOM_ORDER[db_type]}"
+    return ""
+
+def distinct_table_query(
+    db_type: str,
+    column_names: List[str],
+    limit: int,
+    plan: Dict[str, Any],
+    max_length: int = 1000
+) -> str:
+    """
+    Distinct non-null values of every column of a table in a single statement.
+
+    Each column is sampled in its own derived table and the branches are combined with
+    UNION ALL, yielding (column_index, sample_value) rows with values cast to text and
+    truncated to max_length. Rows are only ever read from the plan's bounded source.
+    """
+    source = plan["source"]
+    random_order = plan["random_order"]
+    branches = []
+    for index, column_name in enumerate(column_names):
+        column = quote_identifier(db_type, column_name)
+        value = truncated_text(db_type, column, max_length)
+        branches.append(
+            f"SELECT {index} AS column_index, sample_value FROM ("
+            f"SELECT DISTINCT {value} AS sample_value FROM {source} "
+            f"WHERE {column} IS NOT NULL {_distinct_order_by(db_type, value, random_order)} LIMIT {limit}"
+            f") AS sample_{index}"
+        )
+    return "\nUNION ALL\n".join(branches)
+
+def parse_distinct_table_rows(rows: List[Dict[str, Any]], column_names: List[str]) -> Dict[str, List[Any]]:
+    """Group (column_index, sample_value) rows of distinct_table_query by column name."""
+    column_samples = {column_name: [] for column_name in column_names}
+    for row in rows or []:
+        # Some drivers upper-case unquoted aliases
+        index = row.get("column_index", row.get("COLUMN_INDEX"))
+        value = row.get("sample_value", row.get("SAMPLE_VALUE"))
+        if index is None or value is None:
+            continue
+        index = int(index)
+        if 0 <= index < len(column_names):
+            column_samples[column_names[index]].append(value)
+    return column_samples
@@ -1,16 +1,44 @@
+import asyncio
+import contextlib
+import copy
+import httpx
 import requests
 import os
-import base64
+import hashlib
 import io
+import math
 from enums.response_enum import ResponseEnum
 from exceptions.app_exception import AppException
 from llama_index.core import PromptTemplate
+from llama_index.core.llms import ChatMessage, ChatResponse, MessageRole
 from llama_index.llms.ollama import Ollama
 from llama_index.llms.google_genai import GoogleGenAI
+from core.llm import OllamaPool, generation_profiles
 import logging
-import time
 import re
 from pydantic import BaseModel
+from typing import List, Optional
+from config.app_config import app_config
+from core.sampling import (
+    get_db_type, quote_identifier, sampled_columns, sample_projection, distinct_table_query,
+    parse_distinct_table_rows, row_estimate_query, parse_row_estimate, plan_sampling
+)
+from core.utils import complete_sql_statement
+from core.prompt_budget import prompt_tokens
+from core.profiling import table_version, profile_table_query, parse_profile_row, top_value_columns, top_values_query, parse_top_values_rows
+from services.cache import schema_cache, sample_cache, profile_cache
+from services.embed_client import embed_client, async_embed_client, parse_schema_response, parse_query_response, parse_batch_response
+from services.sqlite_store import sqlite_store, sqlite_payload_digest
+from services.llm_loop import llm_loop
+from services.llm_cache import llm_response_cache
+from services.question_cache import question_cache
+from services.single_flight import llm_single_flight
+from services.llm_scheduler import llm_scheduler, llm_backend_key, llm_backend_capacity
+from services.llm_hedging import llm_hedger, HedgedProgress
+from services.prompt_prefix import prompt_prefix_tracker
+from services.context_window import context_window_sizer
+from services.limiter import KeyedLimiters
+from services.structured_output import structured_output_stats
 
 logging.basicConfig(
     level=logging.INFO,
@@ -19,18 +47,6 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-API_HOST = f"http://{os.getenv('EMBED_HOST_API')}"
-# API_HOST = "http://localhost:8181"
-logger.info("EMBED_HOST_API: " + API_HOST)
-
-_endpoints = {
-    "connect": f"{API_HOST}/api/v1/db/get-schema",
-    "connect_sqlite": f"{API_HOST}/api/v1/db/get-schema/sqlite",
-    "query": f"{API_HOST}/api/v1/db/query",
-    "query_sqlite": f"{API_HOST}/api/v1/db/query/sqlite",
-}
-
-
 def validate_connection_payload(connection_payload):
     db_type = connection_payload.get("dbType", "").lower()
     
@@ -48,93 +64,182 @@ def validate_connection_payload(connection_payload):
     
     return True, None
 
-def get_schema(connection_payload) -> list:
+def connection_fingerprint(connection_payload) -> str:
+    """
+    Build a canonical key identifying the database behind a connection payload.
     
+    Server databases are keyed by dbType + url + username + a hash of the password, so a
+    request with other credentials never shares the cached results of a connection it could
+    not open. SQLite databases are keyed by a content hash of the uploaded file.
+    """
     db_type = connection_payload.get("dbType", "").lower()
+    if db_type == "sqlite":
+        digest = sqlite_payload_digest(connection_payload)
+    else:
+        password_digest = hashlib.sha256(str(connection_payload.get("password", "")).encode("utf-8")).hexdigest()
+        identity = "|".join([
+            db_type,
+            str(connection_payload.get("url", "")).strip().lower(),
+            str(connection_payload.get("username", "")).strip(),
+            password_digest
+        ])
+        digest = hashlib.sha256(identity.encode("utf-8")).hexdigest()
+    return f"{db_type}:{digest}"
+
+def invalidate_schema_cache(connection_payload=None) -> int:
+    """Invalidate the cached schema, sample data, column profiles and question SQL for one connection, or for all connections."""
+    if connection_payload is None:
+        removed = schema_cache.invalidate() + sample_cache.invalidate() + profile_cache.invalidate()
+        return removed + question_cache.invalidate_where(lambda scope: True)
+    fingerprint = connection_fingerprint(connection_payload)
+    removed = schema_cache.invalidate(fingerprint)
+    removed += sample_cache.invalidate_where(lambda key: key[0] == fingerprint)
+    removed += question_cache.invalidate_where(lambda scope: scope[0] == fingerprint)
+    return removed + profile_cache.invalidate_where(lambda key: key[0] == fingerprint)
+
+def get_schema(connection_payload, use_cache: bool = True) -> list:
+    """Get the table details for a connection, served from the schema cache when possible."""
+    cache_key = connection_fingerprint(connection_payload) if use_cache else None
+    if cache_key is not None:
+        table_details = schema_cache.get(cache_key)
+        if table_details is not None:
+            logger.info(f"Schema cache hit for {cache_key}")
+            return table_details
+
+    table_details = _fetch_schema(connection_payload)
+    if cache_key is not None:
+        schema_cache.set(cache_key, table_details)
+    return table_details
+
+async def aget_schema(connection_payload, use_cache: bool = True) -> list:
+    """Awaitable variant of get_schema that does not block the event loop."""
+    cache_key = connection_fingerprint(connection_payload) if use_cache else None
+    if cache_key is not None:
+        table_details = schema_cache.get(cache_key)
+        if table_details is not None:
+            logger.info(f"Schema cache hit for {cache_key}")
+            return table_details
+
+    if connection_payload.get("dbType", "").lower() == "sqlite":
+        table_details = await asyncio.to_thread(sqlite_store.get_schema_for, connection_payload)
+    else:
+        try:
+            response = await async_embed_client.post("connect", json=connection_payload)
+        except Exception as e:
+            raise AppException(ResponseEnum.CANNOT_CONNECT_TO_EMBEB_SERVER)
+        table_details = parse_schema_response(response)
+
+    if cache_key is not None:
+        schema_cache.set(cache_key, table_details)
+    return table_details
+
+def _fetch_schema(connection_payload) -> list:
+    if connection_payload.get("dbType", "").lower() == "sqlite":
+        # Upload once, then refer to the database by its content handle
+        return sqlite_store.get_schema_for(connection_payload)
+
+    # For PostgreSQL and MySQL
     try:
-        if db_type == "sqlite":
-            api_url = _endpoints["connect_sqlite"]
-            
-            # Check if file is a base64 string and decode it
-            file_data = connection_payload["file"]
-            if isinstance(file_data, str):
-                try:
-                    # Decode base64 to binary
-                    binary_data = base64.b64decode(file_data)
-                    files = {'file': ('database.sqlite', binary_data, 'application/octet-stream')}
-                except Exception as e:
-                    raise ValueError(f"Invalid base64 encoded file: {str(e)}")
-            else:
-                # Already binary data
-                files = {'file': ('database.sqlite', file_data, 'application/octet-stream')}
-                
-            response = requests.post(api_url, files=files)
-        else:
-            # For PostgreSQL and MySQL
-            api_url = _endpoints["connect"]
-            response = requests.post(api_url, json=connection_payload)
+        response = embed_client.post("connect", json=connection_payload)
     except Exception as e:
         raise AppException(ResponseEnum.CANNOT_CONNECT_TO_EMBEB_SERVER);
     
-    if response.status_code == 200:
-        result = response.json()
-        if result.get("code") == 0:
-            schema = result.get("data", {})
-            if not schema:
-                raise ValueError("Schema not found in the API response.")
-            table_details = schema.get("tables", [])
-            return table_details
-        else:
-            raise AppException(ResponseEnum.FAILED_TO_GET_SCHEMA);
-    else:
-        raise AppException(ResponseEnum.FAILED_TO_GET_SCHEMA);
+    return parse_schema_response(response)
 
 def execute_sql(connection_payload, sql_query):
-    db_type = connection_payload.get("dbType", "").lower()
+    if connection_payload.get("dbType", "").lower() == "sqlite":
+        return sqlite_store.execute_for(connection_payload, sql_query)
+
     try:
-        if db_type == "sqlite":
-            api_url = _endpoints["query_sqlite"]
-            
-            # Check if file is a base64 string and decode it
-            file_data = connection_payload["file"]
-            if isinstance(file_data, str):
-                try:
-                    # Decode base64 to binary
-                    binary_data = base64.b64decode(file_data)
-                    files = {'file': ('database.sqlite', binary_data, 'application/octet-stream')}
-                except Exception as e:
-                    raise ValueError(f"Invalid base64 encoded file: {str(e)}")
-            else:
-                # Already binary data
-                files = {'file': ('database.sqlite', file_data, 'application/octet-stream')}
-                
-            # Update to match curl format - query parameter sent as form field
-            response = requests.post(api_url, files=files, data={"query": sql_query}, timeout=200)
-        else:
-            # For PostgreSQL and MySQL
-            api_url = _endpoints["query"]
-            # Update to match curl format - include all connection details along with query
-            payload = {**connection_payload, "query": sql_query}
-            response = requests.post(api_url, json=payload, timeout=200)
+        # For PostgreSQL and MySQL, include all connection details along with query
+        payload = {**connection_payload, "query": sql_query}
+        response = embed_client.post("query", json=payload)
     except requests.exceptions.Timeout:
         raise AppException(ResponseEnum.TIMEOUT_ERROR)
     except Exception as e:
         raise AppException(ResponseEnum.CANNOT_CONNECT_TO_EMBEB_SERVER)
     
-    result = response.json()
-    if response.status_code == 200 and result.get("code") == 0:
-        return {
-            "data": result.get("data", {}),
-            "error": None
-        }
-    elif response.status_code == 200 and (result.get("code") == 2002 or result.get("code") == 2004):
-        return {
-            "data": None,
-            "error": result.get("message", {})
-        }
-    else:
-        raise AppException(ResponseEnum.FAILED_TO_EXECUTE_QUERY)
+    return parse_query_response(response)
+
+async def aexecute_sql(connection_payload, sql_query):
+    """Awaitable variant of execute_sql that does not block the event loop."""
+    if connection_payload.get("dbType", "").lower() == "sqlite":
+        return await asyncio.to_thread(sqlite_store.execute_for, connection_payload, sql_query)
+
+    try:
+        payload = {**connection_payload, "query": sql_query}
+        response = await async_embed_client.post("query", json=payload)
+    except httpx.TimeoutException:
+        raise AppException(ResponseEnum.TIMEOUT_ERROR)
+    except Exception as e:
+        raise AppException(ResponseEnum.CANNOT_CONNECT_TO_EMBEB_SERVER)
+    
+    return parse_query_response(response)
+    
+def execute_sql_batch(connection_payload, sql_queries: List[str], timeout: float = None) -> List[dict]:
+    """
+    Execute several statements in as few round trips as possible.
+
+    Returns one {"data", "error"} dict per statement, in order. A failing or timed out
+    statement only affects its own result.
+    """
+    if not sql_queries:
+        return []
+
+    timeout = timeout if timeout is not None else app_config.SQL_BATCH_STATEMENT_TIMEOUT
+    batch_size = max(1, app_config.SQL_BATCH_SIZE)
+    is_sqlite = connection_payload.get("dbType", "").lower() == "sqlite"
+
+    results = []
+    for start in range(0, len(sql_queries), batch_size):
+        chunk = sql_queries[start:start + batch_size]
+        if is_sqlite:
+            results.extend(sqlite_store.execute_batch_for(connection_payload, chunk, timeout))
+            continue
+
+        try:
+            payload = {**connection_payload, "queries": chunk, "timeoutSeconds": max(1, int(math.ceil(timeout)))}
+            response = embed_client.post("query_batch", json=payload)
+        except requests.exceptions.Timeout:
+            raise AppException(ResponseEnum.TIMEOUT_ERROR)
+        except Exception as e:
+            raise AppException(ResponseEnum.CANNOT_CONNECT_TO_EMBEB_SERVER)
+        results.extend(parse_batch_response(response, len(chunk)))
+    return results
+
+async def aexecute_sql_batch(connection_payload, sql_queries: List[str], timeout: float = None) -> List[dict]:
+    """Awaitable variant of execute_sql_batch that does not block the event loop."""
+    return await asyncio.to_thread(execute_sql_batch, connection_payload, sql_queries, timeout)
+
+def get_row_estimates(connection_payload, tables):
+    """
+    Estimated row counts of several tables from catalog statistics, keyed by table name.
     
+    Estimates are cached alongside sample data; None means the size is unknown.
+    """
+    db_type = get_db_type(connection_payload)
+    fingerprint = connection_fingerprint(connection_payload)
+    estimates = {}
+    missing = []
+    for table in tables:
+        table_name = table['tableIdentifier']
+        cached = sample_cache.get((fingerprint, table_name, "row_estimate"))
+        if cached is not None:
+            estimates[table_name] = cached["rows"]
+        elif row_estimate_query(db_type, table_name) is None:
+            estimates[table_name] = None
+        else:
+            missing.append(table_name)
+    if not missing:
+        return estimates
+    
+    results = execute_sql_batch(connection_payload, [row_estimate_query(db_type, table_name) for table_name in missing])
+    for table_name, result in zip(missing, results):
+        rows = None if result.get("error") else parse_row_estimate(result.get("data"))
+        estimates[table_name] = rows
+        sample_cache.set((fingerprint, table_name, "row_estimate"), {"rows": rows})
+    return estimates
+
 def get_sample_data(connection_payload, table_details, limit=3):
     """
     Lấy dữ liệu mẫu từ cơ sở dữ liệu với giá trị distinct cho mỗi cột.
@@ -146,162 +251,9 @@ def get_sample_data(connection_payload, table_details, limit=3):
         limit: Số lượng giá trị mẫu cần lấy cho mỗi cột (mặc định: 3)
         
     Returns:
-        Danh sách các hàng CSV với nội dung phong phú và đa dạng
+        Danh sách các hàng CSV (dòng đầu là tên cột)
     """
-    try:
-        # Lấy thông tin loại DB từ connection_payload
-        db_type = connection_payload.get('db_type', '').lower()
-        table_name = table_details['tableIdentifier']
-        
-        # Lấy danh sách tên cột từ thông tin bảng
-        column_names = []
-        for column in table_details.get('columns', []):
-            column_name = column.get('columnIdentifier')
-            if column_name:  # Đảm bảo cột có tên
-                column_names.append(column_name)
-        print(f"Get sample data for table: {table_name} with column names: {column_names}")
-        if not column_names:
-            return []
-            
-        # Định nghĩa cách quote identifier và random ordering cho từng loại DB
-        quote_char = '"'
-        
-        if db_type == 'mysql':
-            quote_char = '`'
-        elif db_type == 'sqlite':
-            quote_char = '"'
-        else:  # postgresql hoặc mặc định
-            quote_char = '"'
-        
-        # Hàm trợ giúp để quote đúng tên cột và bảng
-        def quote_identifier(identifier):
-            return f'{quote_char}{identifier}{quote_char}'
-        
-        # Lấy dữ liệu mẫu distinct cho mỗi cột
-        column_samples = {}
-        
-        for column_name in column_names:
-            # Xây dựng câu truy vấn phù hợp với từng loại DB
-            quoted_col = quote_identifier(column_name)
-            quoted_table = quote_identifier(table_name)
-            
-            query = ""
-            try:
-                # Các truy vấn khác nhau cho từng loại DB
-                if db_type == 'postgresql':
-                    # Đối với PostgreSQL khi dùng SELECT DISTINCT, ORDER BY phải có trong danh sách select
-                    query = f"""
-                        SELECT DISTINCT {quoted_col}
-                        FROM {quoted_table} 
-                        WHERE {quoted_col} IS NOT NULL
-                        ORDER BY {quoted_col}
-                        LIMIT {limit}
-                    """
-                elif db_type == 'mysql':
-                    query = f"""
-                        SELECT DISTINCT {quoted_col}
-                        FROM {quoted_table}
-                        WHERE {quoted_col} IS NOT NULL
-                        ORDER BY RAND()
-                        LIMIT {limit}
-                    """
-                elif db_type == 'sqlite':
-                    query = f"""
-                        SELECT DISTINCT {quoted_col}
-                        FROM {quoted_table}
-                        WHERE {quoted_col} IS NOT NULL
-                        ORDER BY RANDOM()
-                        LIMIT {limit}
-                    """
-                else:
-                    # Mặc định an toàn nhất
-                    query = f"""
-                        SELECT DISTINCT {quoted_col}
-                        FROM {quoted_table}
-                        WHERE {quoted_col} IS NOT NULL
-                        LIMIT {limit}
-                    """
-                # Thực thi truy vấn
-                result = execute_sql(connection_payload, query)
-                
-                # Nếu truy vấn lỗi, thử lại với truy vấn đơn giản hơn
-                if result.get("error"):
-                    simple_query = f"""
-                        SELECT DISTINCT {quoted_col}
-                        FROM {quoted_table}
-                        WHERE {quoted_col} IS NOT NULL
-                        LIMIT {limit}
-                    """
-                    result = execute_sql(connection_payload, simple_query)
-                    
-                    # Nếu vẫn lỗi, thử không dùng trích dẫn
-                    if result.get("error"):
-                        no_quote_query = f"""
-                            SELECT DISTINCT {column_name}
-                            FROM {table_name}
-                            WHERE {column_name} IS NOT NULL
-                            LIMIT {limit}
-                        """
-                        result = execute_sql(connection_payload, no_quote_query)
-                # Lấy giá trị mẫu từ kết quả
-                sample_values = []
-                if not result.get("error") and result.get("data"):
-                    for record in result.get("data", []):
-                        # Thử lấy giá trị với tên cột chính xác
-                        value = record.get(column_name)
-                        
-                        # Nếu không tìm thấy, thử với tên cột viết thường
-                        if value is None and column_name.lower() in record:
-                            value = record.get(column_name.lower())
-                            
-                        if value is not None:
-                            sample_values.append(value)
-                
-                column_samples[column_name] = sample_values
-                
-            except Exception as column_error:
-                print(f"Error processing column {column_name}: {str(column_error)}")
-                column_samples[column_name] = []
-        
-        # Lọc ra các cột có dữ liệu mẫu
-        valid_columns = [col for col, samples in column_samples.items() if samples]
-        
-        if not valid_columns:
-            return []
-        
-        # Tạo số hàng tối đa dựa trên số lượng mẫu có được
-        max_samples = max([len(column_samples[col]) for col in valid_columns], default=0)
-        if max_samples == 0:
-            return []
-        
-        # Tạo các hàng CSV với các giá trị mẫu đa dạng
-        csv_rows = []
-        for i in range(max_samples):
-            row_values = []
-            for column_name in valid_columns:
-                samples = column_samples[column_name]
-                
-                # Lấy giá trị mẫu
-                value = samples[i % len(samples)]
-                str_value = str(value) if value is not None else "NULL"
-                
-                # Cắt ngắn nếu quá dài
-                if len(str_value) > 1000:
-                    str_value = str_value[:1000] + "..."
-                
-                # Thêm dấu ngoặc kép nếu giá trị chứa dấu phẩy
-                if "," in str_value:
-                    str_value = f'"{str_value}"'
-                    
-                row_values.append(str_value)
-            
-            csv_rows.append(", ".join(row_values))
-        
-        return csv_rows
-    except Exception as e:
-        # Ghi lại lỗi và trả về danh sách rỗng
-        print(f"Error getting sample data: {str(e)}")
-        return [str(e)]
+    return get_sample_data_batch(connection_payload, [table_details], limit)[0]
     
 def get_sample_data_simple(connection_payload, table_details, limit=3):
     """
@@ -342,6 +294,205 @@ def get_sample_data_simple(connection_payload, table_details, limit=3):
         print(f"Error in get_sample_data_simple: {str(e)}")
         return []
 
+def _format_sample_rows(data):
+    """Format query result rows into a header line followed by CSV-like rows."""
+    formatted_rows = []
+    if data and len(data) > 0:
+        # Get column names to ensure consistent order
+        columns = list(data[0].keys())
+        
+        # Create header row with column names
+        header = ", ".join(columns)
+        formatted_rows.append(header)
+        
+        # Format each data row
+        for row in data:
+            values = []
+            for col in columns:
+                val = row.get(col)
+                if val is None:
+                    values.append("NULL")
+                elif isinstance(val, str):
+                    # Escape commas and quotes in string values
+                    if ',' in val or '"' in val:
+                        val = '"' + val.replace('"', '""') + '"'
+                    values.append(val)
+                else:
+                    values.append(str(val))
+            
+            formatted_rows.append(", ".join(values))
+    return formatted_rows
+
+def _sample_cache_key(connection_payload, table_details, limit):
+    return (connection_fingerprint(connection_payload), table_details['tableIdentifier'], limit)
+
+def _cached_sample_data(connection_payload, tables, limit):
+    """Look up cached samples, returning None in place of each miss."""
+    return [sample_cache.get(_sample_cache_key(connection_payload, table, limit)) for table in tables]
+
+def get_sample_data_batch(connection_payload, tables, limit=3, use_cache: bool = True):
+    """
+    Get sample data for several tables with batched queries.
+    
+    Args:
+        connection_payload: Database connection information
+        tables: List of table details including name and columns
+        limit: Number of sample rows to retrieve per table (default: 3)
+        use_cache: Serve and store samples through the shared sample cache
+        
+    Returns:
+        List of sample data rows for each table, in the order of `tables`
+    """
+    if not tables:
+        return []
+    samples = _cached_sample_data(connection_payload, tables, limit) if use_cache else [None] * len(tables)
+    missing = [i for i, sample_data in enumerate(samples) if sample_data is None]
+    if not missing:
+        return samples
+    fetched = _fetch_sample_data_batch(connection_payload, [tables[i] for i in missing], limit, store=use_cache)
+    for i, sample_data in zip(missing, fetched):
+        samples[i] = sample_data
+    return samples
+
+def _format_column_samples(column_samples):
+    """Format distinct values per column as a header line and CSV-like rows, cycling columns with fewer values."""
+    valid_columns = [column_name for column_name, samples in column_samples.items() if samples]
+    max_samples = max((len(column_samples[column_name]) for column_name in valid_columns), default=0)
+    return _format_sample_rows([
+        {column_name: column_samples[column_name][i % len(column_samples[column_name])] for column_name in valid_columns}
+        for i in range(max_samples)
+    ])
+
+def _fetch_sample_rows(connection_payload, db_type, tables, limit):
+    """Plain sample rows of several tables, None in place of each table that fails."""
+    table_names = [table['tableIdentifier'] for table in tables]
+    
+    # Build a simple query that works across most database types, skipping binary
+    # columns and truncating long text at the database
+    results = execute_sql_batch(
+        connection_payload,
+        [
+            f"SELECT {sample_projection(db_type, table, app_config.SAMPLE_MAX_VALUE_LENGTH)} "
+            f"FROM {quote_identifier(db_type, table['tableIdentifier'])} LIMIT {limit}"
+            for table in tables
+        ]
+    )
+    
+    # Retry the failed tables without quoting in a second batch
+    failed = [i for i, result in enumerate(results) if result.get("error")]
+    if failed:
+        retry_results = execute_sql_batch(
+            connection_payload,
+            [f"SELECT * FROM {table_names[i]} LIMIT {limit}" for i in failed]
+        )
+        for i, result in zip(failed, retry_results):
+            results[i] = result
+    return [None if result.get("error") else _format_sample_rows(result.get("data")) for result in results]
+
+def _fetch_sample_data_batch(connection_payload, tables, limit, store: bool = True):
+    """
+    Query sample data for tables without looking them up in the sample cache; store stores the results.
+
+    Each table gets one statement returning distinct values of all its columns, read through
+    the bounded sampling plan chosen from its row estimate so no table is ever fully scanned
+    and sorted; all statements go in one batch. The sample rows are recombined from those
+    per-column values, so they are not real rows of the table. Tables whose statement fails
+    fall back to plain sample rows.
+    """
+    try:
+        db_type = get_db_type(connection_payload)
+        row_estimates = get_row_estimates(connection_payload, tables)
+        queries = {}
+        for i, table in enumerate(tables):
+            table_name = table['tableIdentifier']
+            column_names = [column['columnIdentifier'] for column in sampled_columns(table)]
+            if not column_names:
+                continue
+            plan = plan_sampling(
+                db_type, table_name, row_estimates.get(table_name), app_config.SAMPLE_LARGE_TABLE_ROWS, app_config.SAMPLE_SCAN_ROWS
+            )
+            logger.info(f"Sampling {table_name} (~{row_estimates.get(table_name)} rows) with strategy {plan['strategy']}")
+            queries[i] = (column_names, distinct_table_query(
+                db_type, column_names, limit, plan, max_length=app_config.SAMPLE_MAX_VALUE_LENGTH
+            ))
+        
+        samples = [None] * len(tables)
+        results = execute_sql_batch(connection_payload, [query for _, query in queries.values()]) if queries else []
+        for (i, (column_names, _)), result in zip(queries.items(), results):
+            if not result.get("error"):
+                samples[i] = _format_column_samples(parse_distinct_table_rows(result.get("data"), column_names))
+        
+        # e.g. the embed service's keyword filter rejected a column name
+        fallback = [i for i, sample_data in enumerate(samples) if sample_data is None]
+        if fallback:
+            for i, sample_data in zip(fallback, _fetch_sample_rows(connection_payload, db_type, [tables[i] for i in fallback], limit)):
+                samples[i] = sample_data
+        
+        for table, sample_data in zip(tables, samples):
+            # Tables still failing get no sample data and are not cached
+            if sample_data is not None and store:
+                sample_cache.set(_sample_cache_key(connection_payload, table, limit), sample_data)
+        return [sample_data if sample_data is not None else [] for sample_data in samples]
+    except Exception as e:
+        print(f"Error in get_sample_data_batch: {str(e)}")
+        return [[] for _ in tables]
+
+# Per-database cap on concurrent sample fetches, shared across requests
+_sample_limiters = KeyedLimiters(app_config.SAMPLE_DATA_CONCURRENCY)
+
+def _get_sample_data_chunk(limiter, connection_payload, tables, limit):
+    try:
+        # The caller already looked the tables up in the sample cache
+        return _fetch_sample_data_batch(connection_payload, tables, limit)
+    finally:
+        # Released by the worker itself, so a chunk the caller stopped waiting for keeps its slot until done
+        limiter.release()
+
+async def aget_sample_data_batch(connection_payload, tables, limit=3):
+    """
+    Get sample data for several tables concurrently without blocking the event loop.
+
+    Tables are split into chunks of SAMPLE_DATA_BATCH_SIZE that run in parallel, at most
+    SAMPLE_DATA_CONCURRENCY at a time per database. A chunk that fails or exceeds
+    SAMPLE_DATA_TIMEOUT yields empty sample data for its tables instead of an error.
+    Tables found in the shared sample cache are not queried.
+    """
+    if not tables:
+        return []
+
+    # Serve cached tables without a worker thread, fetch only the misses
+    samples = _cached_sample_data(connection_payload, tables, limit)
+    missing = [i for i, sample_data in enumerate(samples) if sample_data is None]
+    if not missing:
+        return samples
+
+    limiter = _sample_limiters.get(connection_fingerprint(connection_payload))
+    batch_size = max(1, app_config.SAMPLE_DATA_BATCH_SIZE)
+    missing_tables = [tables[i] for i in missing]
+    chunks = [missing_tables[start:start + batch_size] for start in range(0, len(missing_tables), batch_size)]
+
+    async def fetch_chunk(chunk):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + app_config.SAMPLE_DATA_TIMEOUT
+        try:
+            # Wait for a slot on the event loop, so only chunks allowed to run occupy executor threads
+            await asyncio.wait_for(limiter.acquire(), timeout=app_config.SAMPLE_DATA_TIMEOUT)
+            return await asyncio.wait_for(
+                asyncio.to_thread(_get_sample_data_chunk, limiter, connection_payload, chunk, limit),
+                timeout=max(0.0, deadline - loop.time())
+            )
+        except asyncio.TimeoutError:
+            logger.warning(f"Sample data timed out for tables: {[table.get('tableIdentifier') for table in chunk]}")
+        except Exception as e:
+            logger.warning(f"Sample data failed for tables {[table.get('tableIdentifier') for table in chunk]}: {e}")
+        return [[] for _ in chunk]
+
+    results = await asyncio.gather(*(fetch_chunk(chunk) for chunk in chunks))
+    fetched = [sample_data for chunk_result in results for sample_data in chunk_result]
+    for i, sample_data in zip(missing, fetched):
+        samples[i] = sample_data
+    return samples
+
 def get_sample_data_improved(connection_payload, table_details, limit=3):
     """
     An improved but still simple function to get sample data from a database table.
@@ -355,111 +506,303 @@ def get_sample_data_improved(connection_payload, table_details, limit=3):
     Returns:
         List of sample data rows
     """
-    try:
-        # Get database type from connection payload
-        db_type = connection_payload.get('dbType', '').lower()
-        table_name = table_details['tableIdentifier']
-        
-        # Determine proper quoting based on database type
-        if db_type == 'mysql':
-            quoted_table = f"`{table_name}`"
-        elif db_type in ['postgresql', 'postgres', 'sqlite']:
-            quoted_table = f'"{table_name}"'
+    return get_sample_data_batch(connection_payload, [table_details], limit)[0]
+
+def get_column_profiles(connection_payload, tables, use_cache: bool = True):
+    """
+    Get per-column statistics for several tables, keyed by table name.
+    
+    Profiles are cached per (connection, table version), so a table is only profiled
+    again after its definition changes or the cache entry expires.
+    """
+    fingerprint = connection_fingerprint(connection_payload)
+    profiles = {}
+    missing = []
+    for table in tables:
+        cached = profile_cache.get((fingerprint, table_version(table))) if use_cache else None
+        if cached is not None:
+            profiles[table['tableIdentifier']] = cached
         else:
-            quoted_table = table_name
-        
-        # Build a simple query that works across most database types
-        query = f"SELECT * FROM {quoted_table} LIMIT {limit}"
-        
-        # Execute the query
-        result = execute_sql(connection_payload, query)
-        
-        # If the first query fails, try without quoting
-        if result.get("error"):
-            query = f"SELECT * FROM {table_name} LIMIT {limit}"
-            result = execute_sql(connection_payload, query)
-            
-            # If still failing, return empty list
+            missing.append(table)
+    if not missing:
+        return profiles
+    
+    db_type = get_db_type(connection_payload)
+    sample_rows = app_config.PROFILE_SAMPLE_ROWS
+    
+    # One aggregate scan per table, all tables in one batch
+    results = execute_sql_batch(
+        connection_payload, [profile_table_query(db_type, table, sample_rows) for table in missing]
+    )
+    fresh = {}
+    for table, result in zip(missing, results):
+        if result.get("error") or not result.get("data"):
+            logger.warning(f"Could not profile table {table['tableIdentifier']}: {result.get('error')}")
+            continue
+        fresh[table['tableIdentifier']] = (table, parse_profile_row(result["data"][0], table))
+    
+    # Most frequent values of low-cardinality columns, one statement per table
+    top_value_requests = []
+    for table, stats in fresh.values():
+        columns = top_value_columns(table, stats, app_config.PROFILE_TOP_VALUES_MAX_DISTINCT)
+        if columns:
+            top_value_requests.append((stats, columns, top_values_query(
+                db_type, table['tableIdentifier'], columns, sample_rows, app_config.PROFILE_TOP_K
+            )))
+    if top_value_requests:
+        top_results = execute_sql_batch(connection_payload, [query for _, _, query in top_value_requests])
+        for (stats, columns, _), result in zip(top_value_requests, top_results):
             if result.get("error"):
-                return []
-        
-        # Format the results into readable rows
-        formatted_rows = []
-        if result.get("data"):
-            # Get column names to ensure consistent order
-            if result.get("data") and len(result.get("data")) > 0:
-                columns = list(result.get("data")[0].keys())
-                
-                # Create header row with column names
-                header = ", ".join(columns)
-                formatted_rows.append(header)
-                
-                # Format each data row
-                for row in result.get("data"):
-                    values = []
-                    for col in columns:
-                        val = row.get(col)
-                        if val is None:
-                            values.append("NULL")
-                        elif isinstance(val, str):
-                            # Escape commas and quotes in string values
-                            if ',' in val or '"' in val:
-                                val = '"' + val.replace('"', '""') + '"'
-                            values.append(val)
-                        else:
-                            values.append(str(val))
-                    
-                    formatted_rows.append(", ".join(values))
-        
-        return formatted_rows
-    except Exception as e:
-        print(f"Error in get_sample_data_improved: {str(e)}")
-        return []
+                continue
+            for column_name, values in parse_top_values_rows(result.get("data"), columns).items():
+                stats[column_name]["top_values"] = values
+    
+    for table_name, (table, stats) in fresh.items():
+        if use_cache:
+            profile_cache.set((fingerprint, table_version(table)), stats)
+        profiles[table_name] = stats
+    return profiles
 
-def llm_chat(llm: Ollama | GoogleGenAI, fmt_messages: PromptTemplate):
-   
+async def aget_column_profiles(connection_payload, tables, use_cache: bool = True):
+    """Awaitable variant of get_column_profiles that does not block the event loop."""
+    return await asyncio.to_thread(get_column_profiles, connection_payload, tables, use_cache)
+
+def attach_column_profiles(tables, profiles) -> None:
+    """Store each table's column statistics on the table for schema_parser."""
+    for table in tables:
+        table["column_stats"] = profiles.get(table['tableIdentifier'], {})
+
+# Google API rate limit errors carry the delay to wait before retrying
+def _retry_delay_seconds(error_str: str):
+    retry_delay_match = re.search(r"'retryDelay': '(\d+)s'", error_str)
+    return int(retry_delay_match.group(1)) if retry_delay_match else None
+
+# Structured prediction disables Gemini thinking: the output is a small JSON object
+_STRUCTURED_LLM_KWARGS = {
+    "generation_config": {
+        "thinking_config": {
+            "thinking_budget": 0
+        }
+    }
+}
+
+def _structured_llm_kwargs() -> dict:
+    # The clients mutate llm_kwargs (Gemini pops generation_config, Ollama sets format),
+    # so every call gets its own copy and the constant keeps describing the request
+    return copy.deepcopy(_STRUCTURED_LLM_KWARGS)
+
+def _profile_call_kwargs(step: str = None) -> dict:
+    # Requests of a step are decoded with its generation profile, so it is part of the cache key
+    profile = generation_profiles.get(step)
+    return {"generation_profile": profile} if profile else {}
+
+def _sampled(llm, step: str = None) -> bool:
+    # Sampled requests are neither served from, stored in nor coalesced through the response cache
+    if llm_response_cache.is_sampled(llm, generation_profiles.get(step)):
+        llm_response_cache.record_sampled()
+        return True
+    return False
+
+def _chat_cache_key(llm, fmt_messages, step: str = None) -> str:
+    prompt = "\n".join(f"{getattr(message.role, 'value', message.role)}: {message.content}" for message in fmt_messages)
+    return llm_response_cache.make_key(llm, prompt, call_kwargs=_profile_call_kwargs(step))
+
+def _cached_chat_response(cache_key: str):
+    content = llm_response_cache.get(cache_key)
+    if content is None:
+        return None
+    logger.info(f"LLM response cache hit for {cache_key[:12]}")
+    return ChatResponse(message=ChatMessage(role=MessageRole.ASSISTANT, content=content))
+
+def _record_structured_error(error: Exception, llm, step: str = None) -> None:
+    # Invalid JSON and schema mismatches surface as ValueError (pydantic's ValidationError included)
+    if isinstance(error, ValueError):
+        structured_output_stats.record_parse_failure(step, type(llm).__name__, error)
+
+def _structured_cache_key(llm, prompt: PromptTemplate, pydantic_model: BaseModel, step: str = None) -> str:
+    return llm_response_cache.make_key(
+        llm, prompt.get_template(), pydantic_model.model_json_schema(),
+        {**_STRUCTURED_LLM_KWARGS, **_profile_call_kwargs(step)}
+    )
+
+def _cached_structured_response(cache_key: str, pydantic_model: BaseModel):
+    content = llm_response_cache.get(cache_key)
+    if content is None:
+        return None
+    try:
+        response = pydantic_model.model_validate_json(content)
+    except ValueError:
+        # Written by an older version of the model class
+        return None
+    logger.info(f"LLM response cache hit for {cache_key[:12]}")
+    return response
+
+def _route(llm, exclude=()):
+    """Context yielding the client that serves one request: a pool member, or the LLM itself."""
+    return llm.route(exclude) if isinstance(llm, OllamaPool) else contextlib.nullcontext(llm)
+
+async def _arun_llm_call(llm, call, step: str = None, prompt_text: str = None, may_hedge=None):
+    """
+    Await call(client) for one LLM request on the shared LLM loop.
+
+    The request is routed over the pool when there is one, is decoded with the step's
+    generation profile, and is hedged on another pool member when it runs past its step's
+    hedge delay (unless may_hedge() vetoes it). Every attempt holds its own scheduler slot.
+    prompt_text, when given, is recorded for the step's prompt prefix reuse stats and sizes
+    the context window of Ollama requests.
+    """
+    num_ctx = None
+    if prompt_text is not None:
+        prompt_prefix_tracker.record(step, prompt_text)
+        if isinstance(llm, (Ollama, OllamaPool)):
+            profile = generation_profiles.get(step)
+            num_ctx = context_window_sizer.size(
+                prompt_tokens(prompt_text), step,
+                max_tokens=profile.get("max_tokens"),
+                fixed=profile.get("num_ctx"),
+                backend=f"{llm_backend_key(llm)}|{getattr(llm, 'model', None)}"
+            )
+    used_clients = []
+
+    async def attempt():
+        async with llm_scheduler.aslot(llm_backend_key(llm), capacity=llm_backend_capacity(llm)):
+            with _route(llm, exclude=used_clients) as target:
+                used_clients.append(target)
+                return await llm_loop.run(call(generation_profiles.client_for(target, step, num_ctx=num_ctx)))
+
+    return await llm_hedger.run(step, attempt, hedgeable=llm_backend_capacity(llm) > 1, may_hedge=may_hedge)
+
+async def allm_chat(llm: Ollama | GoogleGenAI, fmt_messages: PromptTemplate, refresh: bool = False, step: str = None):
+    """
+    Chat with the LLM, serving identical requests from the LLM response cache.
+
+    With refresh, the cache lookup is skipped and the fresh response replaces the cached one.
+    Identical requests already in flight are awaited instead of generated again. The
+    request runs on the shared LLM loop and rate limit backoff uses asyncio.sleep, so
+    neither the call nor the wait blocks the workflow's event loop. step names the
+    workflow step for per-step latency tracking and hedging. Steps decoded at a temperature
+    above 0 are never cached, so they produce a new response every time.
+    """
+    if _sampled(llm, step):
+        return await _allm_chat_uncached(llm, fmt_messages, None, step)
+    cache_key = _chat_cache_key(llm, fmt_messages, step)
+    cached_response = None if refresh else _cached_chat_response(cache_key)
+    if cached_response is not None:
+        return cached_response
+    return await llm_single_flight.ado(cache_key, lambda: _allm_chat_uncached(llm, fmt_messages, cache_key, step))
+
+async def _allm_chat_uncached(llm: Ollama | GoogleGenAI, fmt_messages: PromptTemplate, cache_key: Optional[str], step: str = None):
     max_retries = 3
     retry_count = 0
-    
+
     while retry_count < max_retries:
         try:
-            chat_response = llm.chat(fmt_messages)
+            chat_response = await _arun_llm_call(
+                llm, lambda target: target.achat(fmt_messages), step,
+                prompt_text="\n".join(str(message.content) for message in fmt_messages)
+            )
+            llm_response_cache.set(cache_key, chat_response.message.content)
             return chat_response
         except Exception as e:
             error_str = str(e)
-            print(f"\033[91mError in llm_chat: {error_str}\033[0m")
-            
-            # Check for Google API rate limit with retry delay
-            retry_delay_match = re.search(r"'retryDelay': '(\d+)s'", error_str)
-            if retry_delay_match:
-                retry_seconds = int(retry_delay_match.group(1))
+            print(f"\033[91mError in allm_chat: {error_str}\033[0m")
+
+            retry_seconds = _retry_delay_seconds(error_str)
+            if retry_seconds is not None:
                 retry_count += 1
-                
+
                 if retry_count < max_retries:
                     print(f"\033[93mRate limit exceeded. Waiting for {retry_seconds} seconds before retry {retry_count}/{max_retries}...\033[0m")
-                    time.sleep(retry_seconds)
+                    await asyncio.sleep(retry_seconds)
                     continue
-            
-            # If we get here, either it's not a rate limit error or we've exhausted retries
+
             raise e
         
-def llm_chat_with_pydantic(llm: Ollama | GoogleGenAI, prompt: PromptTemplate, pydantic_model: BaseModel):
-    llm_kwargs = {
-        "generation_config": {
-            "thinking_config": {
-                "thinking_budget": 0
-            }
-        }
-    }
+async def allm_chat_with_pydantic(llm: Ollama | GoogleGenAI, prompt: PromptTemplate, pydantic_model: BaseModel, refresh: bool = False, step: str = None):
+    """Structured prediction into pydantic_model on the shared LLM loop, cached and coalesced like allm_chat."""
+    if _sampled(llm, step):
+        return await _allm_chat_with_pydantic_uncached(llm, prompt, pydantic_model, None, step)
+    cache_key = _structured_cache_key(llm, prompt, pydantic_model, step)
+    cached_response = None if refresh else _cached_structured_response(cache_key, pydantic_model)
+    if cached_response is not None:
+        return cached_response
+    return await llm_single_flight.ado(cache_key, lambda: _allm_chat_with_pydantic_uncached(llm, prompt, pydantic_model, cache_key, step))
 
+async def _allm_chat_with_pydantic_uncached(llm: Ollama | GoogleGenAI, prompt: PromptTemplate, pydantic_model: BaseModel, cache_key: Optional[str], step: str = None):
+    structured_output_stats.record_call(step, type(llm).__name__)
     try:
-        chat_response = llm.structured_predict(
-            output_cls=pydantic_model,
-            prompt=prompt,
-            llm_kwargs=llm_kwargs
+        chat_response = await _arun_llm_call(
+            llm,
+            lambda target: target.astructured_predict(
+                output_cls=pydantic_model,
+                prompt=prompt,
+                llm_kwargs=_structured_llm_kwargs()
+            ),
+            step,
+            prompt_text=prompt.get_template()
         )
-        return chat_response
+    except Exception as e:
+        _record_structured_error(e, llm, step)
+        error_str = str(e)
+        print(f"\033[91mError in allm_chat_with_pydantic: {error_str}\033[0m")
+        raise AppException(error_str, 500)
+    llm_response_cache.set(cache_key, chat_response.model_dump_json())
+    return chat_response
+
+def _sql_stream_cache_key(llm, prompt: str, step: str = None) -> str:
+    return llm_response_cache.make_key(llm, prompt, call_kwargs={"stream": "sql", **_profile_call_kwargs(step)})
+
+async def astream_sql(llm: Ollama | GoogleGenAI, prompt: str, on_progress=None, refresh: bool = False, step: str = None) -> str:
+    """
+    Stream an SQL completion and stop generating once a complete statement has been produced.
+
+    The response text up to the end of the first complete statement (a closed code fence,
+    or a semicolon-terminated statement that parses) is returned, so trailing explanations
+    are never decoded. on_progress(text) is called on the caller's event loop with the
+    text streamed so far; a request that is hedged reports only the text of the winning
+    attempt, and is only hedged before it has reported anything. Responses are cached and coalesced like allm_chat; cached and
+    coalesced responses report no progress.
+    """
+    if _sampled(llm, step):
+        return await _astream_sql_uncached(llm, prompt, None, on_progress, step)
+    cache_key = _sql_stream_cache_key(llm, prompt, step)
+    cached_text = None if refresh else llm_response_cache.get(cache_key)
+    if cached_text is not None:
+        logger.info(f"LLM response cache hit for {cache_key[:12]}")
+        return cached_text
+    return await llm_single_flight.ado(cache_key, lambda: _astream_sql_uncached(llm, prompt, cache_key, on_progress, step))
+
+async def _astream_sql_uncached(llm: Ollama | GoogleGenAI, prompt: str, cache_key: Optional[str], on_progress=None, step: str = None) -> str:
+    caller_loop = asyncio.get_running_loop()
+    progress = HedgedProgress(
+        (lambda text: caller_loop.call_soon_threadsafe(on_progress, text)) if on_progress is not None else None
+    )
+
+    async def consume(target) -> str:
+        text = ""
+        stream = await target.astream_complete(prompt)
+        try:
+            async for chunk in stream:
+                delta = chunk.delta or ""
+                text += delta
+                progress.report(text)
+                # A statement can only have completed with a closing fence or a semicolon
+                if ("`" in delta or ";" in delta) and complete_sql_statement(text):
+                    logger.info(f"Stopped SQL generation after {len(text)} characters: statement complete")
+                    break
+        finally:
+            # Closing the stream drops the connection, which aborts generation on the server
+            await stream.aclose()
+        return text
+
+    try:
+        text = await _arun_llm_call(llm, consume, step, prompt_text=prompt, may_hedge=progress.may_hedge)
     except Exception as e:
         error_str = str(e)
-        print(f"\033[91mError in llm_chat_with_pydantic: {error_str}\033[0m")
+        print(f"\033[91mError in astream_sql: {error_str}\033[0m")
         raise AppException(error_str, 500)
+    if progress.hedged and on_progress is not None:
+        # Nothing was reported while the attempts raced; report the winner's text
+        on_progress(text)
+    llm_response_cache.set(cache_key, text)
+    return text
@@ -88,6 +88,21 @@ QUERY_REFINEMENT_SKELETON = (
     "Return only the rewritten English question with no additional text."
 )
 
+TRANSLATE_AND_RETRIEVE_SKELETON = (
+    "You are a database schema analyst. Your task is to translate the user's question to English and identify the all potentially relevant tables for it.\n\n"
+    "### User question: {user_question}\n"
+    "### Database description: {database_description}\n"
+    "### Database schema:\n"
+    "{schema}\n\n"
+    "### Instructions:\n"
+    "1. Translate the user's question from its original language to English without altering its original meaning. If—and only if—the translated question directly relates to the database schema, refine the translation slightly to match the schema clearly and concisely. Do not introduce any additional details or modifications unrelated to the user's original intent.\n"
+    "2. Analyze the question intent and the database description to determine if the question is **AMBIGUOUS** or **NOT RELATED TO THE DATABASE**. If so, return an empty list of tables. Do not try to answer the question if it is ambiguous\n"
+    "3. Otherwise include ALL POTENTIALLY RELEVANT tables for the translated question, even if you're not sure that they're needed.\n"
+    "4. Use the table names exactly as they appear in the schema.\n"
+    "### Response Format:\n"
+    "Return only the translated question and the list of relevant tables with no additional text."
+)
+
 SQL_ERROR_REFLECTION_SKELETON = (
     "You are a {dialect} SQL expert. Reflect on the given SQL query and error message to determine the cause of the error and suggest a possible solution.\n\n"
     "# User query: {user_query}\n"
@@ -107,6 +122,99 @@ SQL_ERROR_REFLECTION_SKELETON = (
     "Corrected SQL query without explanations:\n"
 )
 
+# Prefix-stable layouts (prompt routing 2): the database description and schema come first and
+# the question, SQL and error last, so the backend's prompt cache reuses the schema prefix
+# across questions, retries and steps
+PREFIX_STABLE_PROMPT_ROUTING = 2
+
+TEXT_TO_SQL_SKELETON_PREFIX_STABLE = (
+    "### Database description: {database_description}\n"
+    "### Database schema:\n"
+    "{table_schemas}\n\n"
+    "You are a professional Database Engineer expert in {dialect} SQL. Generate a syntactically correct {dialect} SQL query for the given input question using the database above. Only return the {dialect} SQL query, no explanations.\n\n"
+    "### Requirements:\n"
+    "1. Write a precise SQL query that answers the user's question exactly\n"
+    "2. Use only the tables and columns provided above\n"
+    "3. Follow standard SQL syntax compatible with {dialect}\n"
+    "4. Include proper JOINs when data needs to be combined from multiple tables\n"
+    "5. Use appropriate aggregation functions (COUNT, SUM, AVG, etc.) when needed\n"
+    "6. Use set operations (UNION, INTERSECT, EXCEPT) when needed\n"
+    "7. **DO NOT** use `= NULL` in your query, use `IS NULL` instead.\n"
+    "8. **MUST** masking all the values belong to the column that might be sensitive in the query (e.g. phone number, email, password, etc.). DO NOT masking the column names.\n"
+    "9. Ensure your query is efficient and follows best practices\n"
+    "10. Return ONLY the SQL query without any additional text, comments, or explanations\n"
+    "\n"
+    "### Response Format:\n"
+    "Return only the {dialect} SQL query with no additional text.\n\n"
+    "### User question: {user_question}\n"
+)
+
+TABLE_RETRIEVAL_SKELETON_PREFIX_STABLE = (
+    "### Database description: {database_description}\n"
+    "### Database schema:\n"
+    "{schema}\n\n"
+    "You are a database schema analyst. Your task is to identify the all potentially relevant tables of the database above for the given question.\n\n"
+    "### Instructions:\n"
+    "0. Analyze the question intent and the database description to determine if the question is **AMBIGUOUS** or **NOT RELATED TO THE DATABASE**. Return an empty list. Do not try to answer the question if it is ambiguous\n"
+    "1. Include ALL POTENTIALLY RELEVANT tables, even if you're not sure that they're needed.\n"
+    "2. Return ONLY a Python list of table names in the format: ['table_name1', 'table_name2', 'table_name3']\n"
+    "3. Do not include any explanations, additional text, or markdown formatting.\n"
+    "4. If no tables are relevant or the question is not related to the database, return an empty list: []\n"
+    "5. Make sure your response can be directly parsed as a Python list.\n"
+    "\n"
+    "### Response Format:\n"
+    "Return only the Python list with no additional text.\n\n"
+    "### Question: {query}\n"
+)
+
+QUERY_REFINEMENT_SKELETON_PREFIX_STABLE = (
+    "### Database description: {database_description}\n"
+    "### Database schema:\n"
+    "{database_schema}\n\n"
+    "Translate the user's question from its original language to English without altering its original meaning. If—and only if—the translated question directly relates to the database schema above for a Text-to-SQL task, refine the translation slightly to match the schema clearly and concisely. Do not introduce any additional details or modifications unrelated to the user's original intent.\n\n"
+    "### Rules:\n"
+    "1. Translate the user's question from its original language to English without altering its original meaning.\n"
+    "2. If—and only if—the translated question directly relates to the provided database schema for a Text-to-SQL task, refine the translation slightly to match the schema clearly and concisely. Do not introduce any additional details or modifications unrelated to the user's original intent.\n"
+    "### Response Format:\n"
+    "Return only the rewritten English question with no additional text.\n\n"
+    "### User question: {user_question}\n"
+)
+
+TRANSLATE_AND_RETRIEVE_SKELETON_PREFIX_STABLE = (
+    "### Database description: {database_description}\n"
+    "### Database schema:\n"
+    "{schema}\n\n"
+    "You are a database schema analyst. Your task is to translate the user's question to English and identify the all potentially relevant tables of the database above for it.\n\n"
+    "### Instructions:\n"
+    "1. Translate the user's question from its original language to English without altering its original meaning. If—and only if—the translated question directly relates to the database schema, refine the translation slightly to match the schema clearly and concisely. Do not introduce any additional details or modifications unrelated to the user's original intent.\n"
+    "2. Analyze the question intent and the database description to determine if the question is **AMBIGUOUS** or **NOT RELATED TO THE DATABASE**. If so, return an empty list of tables. Do not try to answer the question if it is ambiguous\n"
+    "3. Otherwise include ALL POTENTIALLY RELEVANT tables for the translated question, even if you're not sure that they're needed.\n"
+    "4. Use the table names exactly as they appear in the schema.\n"
+    "### Response Format:\n"
+    "Return only the translated question and the list of relevant tables with no additional text.\n\n"
+    "### User question: {user_question}\n"
+)
+
+SQL_ERROR_REFLECTION_SKELETON_PREFIX_STABLE = (
+    "### Database description: {database_description}\n"
+    "### Database schema:\n"
+    "{database_schema}\n\n"
+    "You are a {dialect} SQL expert. Reflect on the given SQL query and error message to determine the cause of the error and suggest a possible solution.\n\n"
+    "Requirements:\n"
+    "1. Analyze the error and determine the cause\n"
+    "2. Fix the SQL query to resolve the error\n"
+    "3. Ensure compatibility with the database schema provided\n"
+    "4. Return ONLY the corrected SQL query with no explanations or comments\n"
+    "5. Maintain the original query's intent while fixing the syntax or logical errors\n"
+    "6. Follow standard SQL syntax compatible with the database type\n"
+    "7. If the query cannot be fixed with the given information, return a simplified valid query\n"
+    "8. Do not include any text before or after the SQL query\n\n"
+    "# User query: {user_query}\n"
+    "# Original SQL query: {sql_query}\n"
+    "# Error message: {error_message}\n\n"
+    "Corrected SQL query without explanations:\n"
+)
+
 SQL_JUDGER_SKELETON = (
     "You are a {dialect} SQL expert. Given a user query and a SQL query, determine if the SQL generated appropriately answers the given user question taking into account its generated query and response.\n\n"
     "### Database description: {database_description}\n"
@@ -154,7 +262,25 @@ def text2sql_prompt_routing(prompt_type: int) -> str:
         prompt = TEXT_TO_SQL_SKELETON
     elif prompt_type == 1:
         prompt = TEXT_TO_SQL_SKELETON_FINETUNED
+    elif prompt_type == PREFIX_STABLE_PROMPT_ROUTING:
+        prompt = TEXT_TO_SQL_SKELETON_PREFIX_STABLE
     else:
         raise ValueError("Invalid prompt type")
 
     return prompt
+
+def step_prompt_routing(prompt_type: int) -> dict:
+    """Retrieval, query refinement, fused translate-and-retrieve and error reflection templates of a prompt routing."""
+    if prompt_type == PREFIX_STABLE_PROMPT_ROUTING:
+        return {
+            "table_retrieval": TABLE_RETRIEVAL_SKELETON_PREFIX_STABLE,
+            "query_refinement": QUERY_REFINEMENT_SKELETON_PREFIX_STABLE,
+            "translate_and_retrieve": TRANSLATE_AND_RETRIEVE_SKELETON_PREFIX_STABLE,
+            "sql_error_reflection": SQL_ERROR_REFLECTION_SKELETON_PREFIX_STABLE
+        }
+    return {
+        "table_retrieval": TABLE_RETRIEVAL_SKELETON,
+        "query_refinement": QUERY_REFINEMENT_SKELETON,
+        "translate_and_retrieve": TRANSLATE_AND_RETRIEVE_SKELETON,
+        "sql_error_reflection": SQL_ERROR_REFLECTION_SKELETON
+    }
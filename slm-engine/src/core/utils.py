@@ -12,6 +12,7 @@ from typing import Tuple, Optional, Union
 from transformers import AutoTokenizer
 from functools import lru_cache
 from response.log_manager import log_prompt
+from core.profiling import format_column_stats
 
 
 # Configure logging
@@ -181,7 +182,10 @@ def schema_clustering(table_details: list, resolution_value = 1.0) -> list:
 
 
 
-def schema_parser(tables: list, type: str, include_sample_data: bool = False):
+def _column_stats_text(table: dict, column: dict) -> str:
+    return format_column_stats(table.get("column_stats", {}).get(column["columnIdentifier"]))
+
+def schema_parser(tables: list, type: str, include_sample_data: bool = False, include_column_stats: bool = False):
     """
     Phân tích cấu trúc schema và tạo ra các câu lệnh mô tả theo định dạng được chỉ định.
     
@@ -189,6 +193,7 @@ def schema_parser(tables: list, type: str, include_sample_data: bool = False):
         tables: Danh sách các bảng cùng thông tin cột và quan hệ
         type: Loại định dạng đầu ra ("DDL", "Synthesis", hoặc "Simple")
         include_sample_data: Có hiển thị dữ liệu mẫu hay không (mặc định: False)
+        include_column_stats: Có hiển thị thống kê cột (table["column_stats"]) hay không (mặc định: False)
         
     Returns:
         Chuỗi mô tả schema theo định dạng đã chọn
@@ -213,6 +218,10 @@ def schema_parser(tables: list, type: str, include_sample_data: bool = False):
                 if column.get("isPrimaryKey"):
                     column_def += " PRIMARY KEY"
                 description = column.get("columnDescription", None)
+                if include_column_stats:
+                    stats_text = _column_stats_text(table, column)
+                    if stats_text:
+                        description = f"{description}; {stats_text}" if description else stats_text
                 if description:
                     if column == columns[-1]:
                         column_def += f" -- {description}"
@@ -268,6 +277,10 @@ def schema_parser(tables: list, type: str, include_sample_data: bool = False):
             for column in columns:
                 description = column.get("columnDescription", None)
                 pk_info = " (Primary Key)" if column.get("isPrimaryKey") else ""
+                if include_column_stats:
+                    stats_text = _column_stats_text(table, column)
+                    if stats_text:
+                        description = f"{description}; {stats_text}" if description else stats_text
                 
                 # Collect foreign key relationships separately
                 if "relations" in column and column["relations"]:
@@ -316,8 +329,10 @@ def schema_parser(tables: list, type: str, include_sample_data: bool = False):
                 column_name = column["columnIdentifier"]
                 column_type = column["columnType"]
                 pk_info = " [PK]" if column.get("isPrimaryKey") else ""
+                stats_text = _column_stats_text(table, column) if include_column_stats else ""
+                stats_info = f" ({stats_text})" if stats_text else ""
                 
-                columns_chain.append(f"{column_name} {column_type}{pk_info}")
+                columns_chain.append(f"{column_name} {column_type}{pk_info}{stats_info}")
                 
                 # Collect foreign key relationships separately
                 if "relations" in column and column["relations"]:
@@ -598,6 +613,53 @@ def extract_sql_query(response_text):
             
         return sql
 
+# A statement starts a line: "I will select orders; ..." is prose, not a query
+_STATEMENT_START = re.compile(r"^[ \t]*(?:SELECT|WITH)\b", re.IGNORECASE | re.MULTILINE)
+
+def _is_query(sql: str) -> bool:
+    try:
+        parsed = parse_one(sql)
+    except Exception:
+        # Semicolons inside string literals leave the statement unparseable
+        return False
+    # A bare "select customers" parses too; a real query reads from something
+    return parsed is not None and parsed.find(exp.From) is not None
+
+def complete_sql_statement(response_text: str) -> Optional[str]:
+    """
+    The first complete SQL statement of a partial LLM response, or None while it is still incomplete.
+
+    A statement is complete once its code fence is closed, or, outside a code fence, once it
+    starts a line, ends in a semicolon and parses as a query with a FROM clause. An unfenced
+    statement only counts when nothing but a lead-in ending in a colon ("Here is the query:")
+    precedes it; after other prose the query may still come in a fence, so the response is
+    read to the end. Text inside an unfinished <think> block is never complete.
+    """
+    think_start = response_text.find("<think>")
+    if think_start != -1:
+        think_end = response_text.find("</think>", think_start)
+        if think_end == -1:
+            return None
+        response_text = response_text[think_end + len("</think>"):]
+
+    fence_match = re.search(r"```(?:sql|SQL)?\s*([\s\S]*?)```", response_text)
+    if fence_match and fence_match.group(1).strip():
+        return fence_match.group(1).strip()
+    if "```" in response_text:
+        # An open code fence: wait for it to close
+        return None
+
+    for start_match in _STATEMENT_START.finditer(response_text):
+        lead_in = response_text[:start_match.start()].strip()
+        if lead_in and not lead_in.endswith(":"):
+            return None
+        statement_start = start_match.start()
+        for semicolon in re.finditer(";", response_text[statement_start:]):
+            candidate = response_text[statement_start:statement_start + semicolon.end()].strip()
+            if _is_query(candidate[:-1]):
+                return candidate
+    return None
+
 def is_valid_sql_query(sql_query: str, dialect: str = "postgres") -> Tuple[bool, Optional[Exception]]:
 
     DIALECTS = [
@@ -11,7 +11,8 @@ from core.utils import (
 )
 from core.events import TextToSQLEvent, SQLValidatorEvent
 from core.models import SQLQuery
-from core.services import llm_chat, llm_chat_with_pydantic
+from core.services import allm_chat, allm_chat_with_pydantic
+from services.structured_output import structured_output_stats
 from response.log_manager import (
     log_step_start, 
     log_step_end, 
@@ -93,16 +94,18 @@ class BaselineWorkflow(Workflow):
         
         try:
             # First try with structured output
-            chat_response = llm_chat_with_pydantic(
+            chat_response = await allm_chat_with_pydantic(
                 llm=self.llm,
                 prompt=PromptTemplate(prompt_text),
-                pydantic_model=SQLQuery
+                pydantic_model=SQLQuery,
+                step="generate"
             )
             sql_query = chat_response.sql_query
         except Exception as e:
             # Fall back to raw output and extraction
             logger.warning(f"Structured output failed: {e}, falling back to extraction")
-            chat_response = llm_chat(self.llm, PromptTemplate(prompt_text).format_messages())
+            structured_output_stats.record_retry("generate")
+            chat_response = await allm_chat(self.llm, PromptTemplate(prompt_text).format_messages(), step="generate")
             sql_query = extract_sql_query(chat_response.message.content)
             
         log_llm_operation("GENERATE", "LLM response", llm_start_time, chat_response)
@@ -11,7 +11,7 @@ from core.utils import (
 from core.events import (
     SchemaEnrichmentEvent,
 )
-from core.services import llm_chat_with_pydantic
+from core.services import allm_chat_with_pydantic
 from response.log_manager import (
     log_step_start,
     log_step_end,
@@ -100,10 +100,11 @@ class QuestionSuggestionWorkflow(Workflow):
         # Get suggestions from LLM
         try:
             log_step_start("GENERATE", message=f"Requesting LLM to generate {top_k} questions")
-            suggestions = llm_chat_with_pydantic(
+            suggestions = await allm_chat_with_pydantic(
                 llm=self.llm, 
                 prompt=PromptTemplate(question_prompt), 
-                pydantic_model=QuestionSuggestions
+                pydantic_model=QuestionSuggestions,
+                step="suggest"
             )
             
             if not suggestions or not suggestions.questions:
@@ -15,7 +15,8 @@ from core.models import (
     DatabaseDescription,
     SchemaEnrichmentResponse
 )
-from core.services import get_sample_data_improved, llm_chat, llm_chat_with_pydantic
+from core.services import aget_sample_data_batch, aget_column_profiles, attach_column_profiles, allm_chat_with_pydantic
+from services.structured_output import structured_output_stats
 from response.log_manager import (
     log_step_start,
     log_step_end,
@@ -28,7 +29,9 @@ from response.log_manager import (
 from llama_index.core import PromptTemplate
 from llama_index.llms.ollama import Ollama
 from exceptions.app_exception import AppException
+from config.app_config import app_config
 import logging
+import asyncio
 import time
 
 logger = logging.getLogger(__name__)
@@ -99,10 +102,11 @@ class SchemaEnrichmentWorkflow(Workflow):
             )
             
             # Query LLM for database description
-            chat_response = llm_chat_with_pydantic(
+            chat_response = await allm_chat_with_pydantic(
                 llm=self.llm, 
                 prompt=PromptTemplate(DATABASE_DESCRIPTION_PROMPT), 
-                pydantic_model=DatabaseDescription
+                pydantic_model=DatabaseDescription,
+                step="describe"
             )
             
             database_description = chat_response.database_description
@@ -134,19 +138,30 @@ class SchemaEnrichmentWorkflow(Workflow):
                 
             log_step_start("WORKFLOW", message=f"Created {len(clusters)} clusters of related tables")
             
-            # Add sample data to each table in clusters
-            for cluster_idx, cluster in enumerate(clusters):
-                for table in cluster:
-                    try:
-                        table["sample_data"] = get_sample_data_improved(
-                            connection_payload=ev.connection_payload, 
-                            table_details=table
-                        )
-                    except Exception as e:
-                        warning_msg = f"Failed to get sample data for table {table.get('tableIdentifier', 'unknown')}: {str(e)}"
-                        log_warning("WARNING", warning_msg)
-                        self.workflow_logs["warnings"].append(warning_msg)
-                        table["sample_data"] = []
+            # Add column statistics or sample data to each table in clusters, batched across all clusters
+            all_tables = [table for cluster in clusters for table in cluster]
+            if app_config.USE_COLUMN_PROFILE:
+                try:
+                    profiles = await aget_column_profiles(ev.connection_payload, all_tables)
+                except Exception as e:
+                    warning_msg = f"Failed to get column statistics for tables: {str(e)}"
+                    log_warning("WARNING", warning_msg)
+                    self.workflow_logs["warnings"].append(warning_msg)
+                    profiles = {}
+                attach_column_profiles(all_tables, profiles)
+            else:
+                try:
+                    samples = await aget_sample_data_batch(
+                        connection_payload=ev.connection_payload, 
+                        tables=all_tables
+                    )
+                except Exception as e:
+                    warning_msg = f"Failed to get sample data for tables: {str(e)}"
+                    log_warning("WARNING", warning_msg)
+                    self.workflow_logs["warnings"].append(warning_msg)
+                    samples = [[] for _ in all_tables]
+                for table, sample_data in zip(all_tables, samples):
+                    table["sample_data"] = sample_data
             
             # Store cluster information in context
             await context.set("num_tables", total_tables)
@@ -171,7 +186,12 @@ class SchemaEnrichmentWorkflow(Workflow):
         
         # Parse cluster schema
         for cluster in ev.clusters:
-            prompt = schema_parser(cluster, "Simple", include_sample_data=True)
+            prompt = schema_parser(
+                cluster,
+                "Simple",
+                include_sample_data=not app_config.USE_COLUMN_PROFILE,
+                include_column_stats=app_config.USE_COLUMN_PROFILE
+            )
             cluster_infos.append(prompt)
             print(prompt)
         database_description = ev.database_description
@@ -196,11 +216,16 @@ class SchemaEnrichmentWorkflow(Workflow):
                 
                 # Try with Pydantic model first
                 for i in range(retries):
+                    if i > 0:
+                        structured_output_stats.record_retry("enrich")
                     try:
-                        chat_response = llm_chat_with_pydantic(
+                        chat_response = await allm_chat_with_pydantic(
                             llm=self.llm, 
                             prompt=PromptTemplate(SCHEMA_ENRICHMENT_PROMPT), 
-                            pydantic_model=SchemaEnrichmentResponse
+                            pydantic_model=SchemaEnrichmentResponse,
+                            # A cached empty answer would repeat on every retry
+                            refresh=i > 0,
+                            step="enrich"
                         )
                         enriched_data = chat_response.tables
                         print(enriched_data)
@@ -209,10 +234,10 @@ class SchemaEnrichmentWorkflow(Workflow):
                             break
                         
                         log_warning("WARNING", f"LLM returned empty schema for cluster {cluster_idx+1}, retry {i+1}/{retries}")
-                        time.sleep(1)
+                        await asyncio.sleep(1)
                     except Exception as e:
                         log_warning("WARNING", f"Failed to parse with Pydantic for cluster {cluster_idx+1}, retry {i+1}/{retries}: {str(e)}")
-                        time.sleep(1)
+                        await asyncio.sleep(1)
 
                 cluster_enriched.append({"tables": enriched_data})
                 
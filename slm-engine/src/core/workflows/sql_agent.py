@@ -7,7 +7,6 @@ from llama_index.core.workflow import (
 )
 from core.utils import (
     extract_tables_from_sql,
-    schema_parser,
     extract_sql_query,
     is_valid_sql_query
 )
@@ -17,13 +16,20 @@ from core.events import (
     SQLValidatorEvent,
     ExecuteSQLEvent,
     SQLReflectionEvent,
+    SQLProgressEvent,
 )
 from core.models import (
     ListOfRelevantTables,
     SQLQuery,
-    TranslatedQuery
+    TranslatedQuery,
+    TranslatedQueryWithTables
 )
-from core.services import execute_sql, llm_chat, llm_chat_with_pydantic, get_sample_data_improved   
+from core.services import aexecute_sql, allm_chat_with_pydantic, astream_sql, aget_sample_data_batch, aget_column_profiles, attach_column_profiles, connection_fingerprint
+from core.profiling import schema_version
+from core.prompt_budget import assemble_schema
+from core.language import translation_gate
+from core.templates import PREFIX_STABLE_PROMPT_ROUTING, step_prompt_routing
+from services.question_cache import question_cache
 from response.log_manager import (
     log_step_start,
     log_step_end,
@@ -41,7 +47,7 @@ from config.app_config import app_config
 import json
 import logging
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 import re
 
 logger = logging.getLogger(__name__)
@@ -53,11 +59,13 @@ class SQLAgentWorkflow(Workflow):
         self,
         text2sql_prompt: str,
         llm: Ollama | GoogleGenAI,
+        prompt_routing: int = 0,
         *args, **kwargs
     ) -> None:
         """Initialize the SQLAgent Workflow."""
         super().__init__(*args, **kwargs)
         self.text2sql_prompt = text2sql_prompt
+        self.prompt_routing = prompt_routing
         self.num_tables_threshold = 0  # Configurable threshold
         self.max_sql_retries = 3  # Reduced from 5 to avoid infinite loops
         self.llm = llm
@@ -67,6 +75,141 @@ class SQLAgentWorkflow(Workflow):
         """Normalize table name for consistent comparison."""
         return table_name.lower().strip()
 
+    def _schema_detail_options(self) -> Dict[str, bool]:
+        """Whether prompts show raw sample rows or precomputed column statistics."""
+        show_data = not app_config.PRIVACY_MODE
+        return {
+            "include_sample_data": show_data and not app_config.USE_COLUMN_PROFILE,
+            "include_column_stats": show_data and app_config.USE_COLUMN_PROFILE
+        }
+
+    def _budgeted_schema(self, step_name: str, tables: List[Dict[str, Any]], type: str, question: str, render, description: str = None, **options) -> str:
+        """Schema text for a prompt, trimmed to the prompt token budget; prefix-stable prompts trim the same sections for every question."""
+        assembled = assemble_schema(
+            tables, type, question, render, description=description,
+            stable=self.prompt_routing == PREFIX_STABLE_PROMPT_ROUTING, **options
+        )
+        report = assembled["report"]
+        if report and (report["dropped_sample_rows"] or report["dropped_columns"] or report["over_budget"]):
+            log_warning(
+                step_name,
+                f"Prompt trimmed to {report['prompt_tokens']}/{report['budget']} tokens "
+                f"(schema {report['full_schema_tokens']} -> {report['schema_tokens']}): "
+                f"dropped sample rows of {report['dropped_sample_rows']}, columns {report['dropped_columns']}"
+                + (" - still over budget" if report["over_budget"] else "")
+            )
+        return assembled["schema"]
+
+    async def _agenerate_sql(self, context: Context, step_name: str, prompt: str, step: str) -> str:
+        """
+        Ask the LLM for an SQL query.
+
+        With SQL_STREAMING the completion is streamed, stopped as soon as the statement is
+        complete, and the partial SQL is written to the event stream as SQLProgressEvents;
+        otherwise the query comes from structured output. A run that bypasses the question
+        cache regenerates instead of replaying cached LLM responses.
+        """
+        refresh = await context.get("bypass_cache")
+        llm_start_time = datetime.now()
+        if app_config.SQL_STREAMING:
+            text = await astream_sql(
+                llm=self.llm,
+                prompt=prompt,
+                on_progress=lambda partial: context.write_event_to_stream(SQLProgressEvent(step=step, text=partial)),
+                refresh=refresh,
+                step=step
+            )
+            log_llm_operation(step_name, "LLM response", llm_start_time, text)
+            return extract_sql_query(text)
+
+        chat_response = await allm_chat_with_pydantic(
+            llm=self.llm,
+            prompt=PromptTemplate(prompt),
+            pydantic_model=SQLQuery,
+            refresh=refresh,
+            step=step
+        )
+        log_llm_operation(step_name, "LLM response", llm_start_time, chat_response)
+        return chat_response.sql_query
+
+    def _prompt_tables(self, tables: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Tables in prompt order; prefix-stable prompts list them by name so the schema prefix repeats."""
+        if self.prompt_routing == PREFIX_STABLE_PROMPT_ROUTING:
+            return sorted(tables, key=lambda table: table["tableIdentifier"])
+        return tables
+
+    def _retrieval_schema(self, table_details: List[Dict[str, Any]], database_description: str, question: str, fused: bool) -> str:
+        """Schema shared by the translation and retrieval prompts, within the prompt token budget."""
+        templates = step_prompt_routing(self.prompt_routing)
+        if fused:
+            render = lambda schema: templates["translate_and_retrieve"].format(
+                user_question=question,
+                database_description=database_description,
+                schema=schema
+            )
+        else:
+            render = lambda schema: templates["table_retrieval"].format(
+                database_description=database_description,
+                query=question,
+                schema=schema
+            )
+        return self._budgeted_schema("RETRIEVE", table_details, "Simple", question, render=render, description=database_description)
+
+    async def _atranslate_query(self, question: str, schema: str, database_description: str, refresh: bool = False) -> str:
+        """Translate a question to English, refined against the schema."""
+        translated_query = await allm_chat_with_pydantic(
+            llm=self.llm,
+            prompt=PromptTemplate(step_prompt_routing(self.prompt_routing)["query_refinement"].format(
+                user_question=question,
+                database_description=database_description,
+                database_schema=schema
+            )),
+            pydantic_model=TranslatedQuery,
+            refresh=refresh,
+            step="translate"
+        )
+        return translated_query.translated_query
+
+    async def _aretrieve_tables(self, query: str, schema: str, database_description: str, refresh: bool = False) -> List[str]:
+        """Tables relevant to an English question."""
+        table_retrieval_prompt = step_prompt_routing(self.prompt_routing)["table_retrieval"].format(
+            database_description=database_description,
+            query=query,
+            schema=schema
+        )
+        log_prompt(table_retrieval_prompt, "RETRIEVE")
+        llm_start_time = datetime.now()
+
+        chat_response = await allm_chat_with_pydantic(
+            llm=self.llm,
+            prompt=PromptTemplate(table_retrieval_prompt),
+            pydantic_model=ListOfRelevantTables,
+            refresh=refresh,
+            step="retrieve"
+        )
+        log_llm_operation("RETRIEVE", "LLM response", llm_start_time, chat_response)
+        return chat_response.relevant_tables
+
+    async def _atranslate_and_retrieve(self, question: str, schema: str, database_description: str, refresh: bool = False) -> Tuple[str, List[str]]:
+        """Translate a question and retrieve its relevant tables in a single LLM call."""
+        fused_prompt = step_prompt_routing(self.prompt_routing)["translate_and_retrieve"].format(
+            user_question=question,
+            database_description=database_description,
+            schema=schema
+        )
+        log_prompt(fused_prompt, "RETRIEVE")
+        llm_start_time = datetime.now()
+
+        chat_response = await allm_chat_with_pydantic(
+            llm=self.llm,
+            prompt=PromptTemplate(fused_prompt),
+            pydantic_model=TranslatedQueryWithTables,
+            refresh=refresh,
+            step="translate_retrieve"
+        )
+        log_llm_operation("RETRIEVE", "LLM response", llm_start_time, chat_response)
+        return chat_response.translated_query, chat_response.relevant_tables
+
     def _find_tables_by_names(self, table_names: List[str], all_tables: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Find table details by names efficiently."""
         normalized_names = {self._normalize_table_name(name): name for name in table_names}
@@ -116,8 +259,18 @@ class SQLAgentWorkflow(Workflow):
         
         return sql_normalized.strip()
 
+    async def _cached_sql(self, context: Context, question: str, step_name: str) -> Optional[str]:
+        """Previously validated SQL of the same or a near-identical question, unless the cache is bypassed."""
+        if await context.get("bypass_cache"):
+            return None
+        cached = question_cache.lookup(await context.get("cache_scope"), question)
+        if cached is None:
+            return None
+        log_success(step_name, f"Question cache hit ({cached['similarity']}) for: {cached['question']}")
+        return cached["sql"]
+
     @step
-    async def Start_workflow(self, context: Context, ev: StartEvent) -> TableRetrieveEvent | TextToSQLEvent:
+    async def Start_workflow(self, context: Context, ev: StartEvent) -> TableRetrieveEvent | TextToSQLEvent | StopEvent:
         """Start the SQLAgent Workflow."""
         start_time = log_step_start("START", query=ev.query, connection_type=ev.connection_payload.get('dbType', 'unknown'))
         
@@ -126,8 +279,17 @@ class SQLAgentWorkflow(Workflow):
         await context.set("connection_payload", ev.connection_payload)
         await context.set("database_description", ev.database_description or "")
         await context.set("user_query", ev.query)
+        await context.set("original_query", ev.query)
         await context.set("session_information", ev.session_information)
         await context.set("retry_count", 0)
+        await context.set("bypass_cache", bool(ev.get("bypass_cache", False)))
+        await context.set("cache_scope", (connection_fingerprint(ev.connection_payload), schema_version(ev.table_details)))
+
+        # A question answered before against the same schema skips the whole pipeline
+        cached_sql = await self._cached_sql(context, ev.query, "START")
+        if cached_sql:
+            log_step_end("START", start_time)
+            return StopEvent(result=cached_sql)
 
         table_count = len(ev.table_details)
         table_identifiers = [table['tableIdentifier'] for table in ev.table_details]
@@ -153,46 +315,35 @@ class SQLAgentWorkflow(Workflow):
         try:
             table_details = await context.get("table_details")
             database_description = await context.get("database_description")
+            # Bypassing the question cache also skips the cached translation and retrieval responses
+            refresh = await context.get("bypass_cache")
 
-            # Load templates
-            from core.templates import TABLE_RETRIEVAL_SKELETON, QUERY_REFINEMENT_SKELETON
-            schema = schema_parser(table_details, "Simple", include_sample_data=False)
-
-            # Query translation step
-            log_step_start("RETRIEVE", message="Translating query to English")
-            translated_query = llm_chat_with_pydantic(
-                llm=self.llm,
-                prompt=PromptTemplate(QUERY_REFINEMENT_SKELETON.format(
-                    user_question=ev.query,
-                    database_schema=schema
-                )),
-                pydantic_model=TranslatedQuery
-            )
+            translate = translation_gate.needs_translation(ev.query, table_details)
+            fused = app_config.FUSED_RETRIEVAL and translate
+            schema = self._retrieval_schema(table_details, database_description, ev.query, fused)
 
-            query = translated_query.translated_query
+            if fused:
+                log_step_start("RETRIEVE", message="Translating query and querying LLM for relevant tables")
+                query, relevant_tables = await self._atranslate_and_retrieve(ev.query, schema, database_description, refresh=refresh)
+            elif translate:
+                log_step_start("RETRIEVE", message="Translating query to English")
+                query = await self._atranslate_query(ev.query, schema, database_description, refresh=refresh)
+            else:
+                log_step_start("RETRIEVE", message="Query is in English, skipping translation")
+                query = ev.query
             await context.set("user_query", query)
-            log_success("RETRIEVE", f"Translated query: {query}")
 
-            # Table retrieval step
-            table_retrieval_prompt = TABLE_RETRIEVAL_SKELETON.format(
-                database_description=database_description,
-                query=query,
-                schema=schema
-            )
-            
-            log_prompt(table_retrieval_prompt, "RETRIEVE")
-            
-            log_step_start("RETRIEVE", message="Querying LLM for relevant tables")
-            llm_start_time = datetime.now()
-            
-            chat_response = llm_chat_with_pydantic(
-                llm=self.llm,
-                prompt=PromptTemplate(table_retrieval_prompt),
-                pydantic_model=ListOfRelevantTables
-            )
-            
-            relevant_tables = chat_response.relevant_tables
-            log_llm_operation("RETRIEVE", "LLM response", llm_start_time, chat_response)
+            if translate:
+                log_success("RETRIEVE", f"Translated query: {query}")
+                # Questions asked in another language or wording often meet after translation
+                cached_sql = await self._cached_sql(context, query, "RETRIEVE")
+                if cached_sql:
+                    log_step_end("RETRIEVE", start_time)
+                    return StopEvent(result=cached_sql)
+
+            if not fused:
+                log_step_start("RETRIEVE", message="Querying LLM for relevant tables")
+                relevant_tables = await self._aretrieve_tables(query, schema, database_description, refresh=refresh)
 
             if not relevant_tables:
                 log_error("RETRIEVE", "No relevant tables found")
@@ -231,22 +382,43 @@ class SQLAgentWorkflow(Workflow):
                 log_error("GENERATE", "No valid tables found for SQL generation")
                 return StopEvent(result="No valid tables found for the query.")
             
-            # Add sample data if not in privacy mode
-            if not app_config.PRIVACY_MODE:
-                for table in selected_tables:
-                    try:
-                        table["sample_data"] = get_sample_data_improved(
-                            connection_payload=connection_payload, 
-                            table_details=table
-                        )
-                    except Exception as e:
-                        log_warning("GENERATE", f"Could not get sample data for table {table['tableIdentifier']}: {e}")
-                        table["sample_data"] = []
+            # Add column statistics or sample data if not in privacy mode
+            if not app_config.PRIVACY_MODE and app_config.USE_COLUMN_PROFILE:
+                missing_tables = [table for table in selected_tables if "column_stats" not in table]
+                try:
+                    profiles = await aget_column_profiles(connection_payload, missing_tables)
+                except Exception as e:
+                    log_warning("GENERATE", f"Could not get column statistics for tables: {e}")
+                    profiles = {}
+                attach_column_profiles(missing_tables, profiles)
+            elif not app_config.PRIVACY_MODE:
+                # Tables kept from an earlier pass already carry their sample data
+                missing_tables = [table for table in selected_tables if not table.get("sample_data")]
+                try:
+                    samples = await aget_sample_data_batch(
+                        connection_payload=connection_payload, 
+                        tables=missing_tables
+                    )
+                except Exception as e:
+                    log_warning("GENERATE", f"Could not get sample data for tables: {e}")
+                    samples = [[] for _ in missing_tables]
+                for table, sample_data in zip(missing_tables, samples):
+                    table["sample_data"] = sample_data
             
             await context.set("selected_tables", selected_tables)
             
             log_step_start("GENERATE", message=f"Generating SQL for {len(selected_tables)} tables")
-            table_schemas = schema_parser(selected_tables, "DDL", include_sample_data=not app_config.PRIVACY_MODE)
+            table_schemas = self._budgeted_schema(
+                "GENERATE", self._prompt_tables(selected_tables), "DDL", ev.query,
+                render=lambda schema: self.text2sql_prompt.format(
+                    user_question=ev.query,
+                    table_schemas=schema,
+                    database_description=database_description,
+                    dialect=dialect
+                ),
+                description=database_description,
+                **self._schema_detail_options()
+            )
             
             # Format prompt
             text_to_sql_prompt = self.text2sql_prompt.format(
@@ -260,17 +432,10 @@ class SQLAgentWorkflow(Workflow):
             
             # Generate SQL
             log_step_start("GENERATE", message="Querying LLM for SQL generation")
-            llm_start_time = datetime.now()
+            generated_sql = await self._agenerate_sql(context, "GENERATE", text_to_sql_prompt, step="generate")
             
-            chat_response = llm_chat_with_pydantic(
-                llm=self.llm,
-                prompt=PromptTemplate(text_to_sql_prompt),
-                pydantic_model=SQLQuery
-            )
-            
-            log_llm_operation("GENERATE", "LLM response", llm_start_time, chat_response)
             # Normalize SQL query formatting while preserving string literals
-            sql_query = self._normalize_sql_formatting(chat_response.sql_query)
+            sql_query = self._normalize_sql_formatting(generated_sql)
 
             # Basic validation
             if not sql_query or "SELECT" not in sql_query.upper():
@@ -363,7 +528,7 @@ class SQLAgentWorkflow(Workflow):
             log_step_start("EXECUTE", message="Executing SQL query")
             exec_start_time = datetime.now()
             
-            result = execute_sql(connection_payload, ev.sql_query)
+            result = await aexecute_sql(connection_payload, ev.sql_query)
             
             log_llm_operation("EXECUTE", "Database execution", exec_start_time)
             
@@ -382,6 +547,11 @@ class SQLAgentWorkflow(Workflow):
             row_count = len(data) if isinstance(data, list) else 0
             
             log_success("EXECUTE", f"SQL executed successfully, returned {row_count} rows")
+
+            # Remember the validated SQL under both the original and the translated question
+            cache_scope = await context.get("cache_scope")
+            for question in {await context.get("original_query"), await context.get("user_query")}:
+                question_cache.store(cache_scope, question, ev.sql_query)
             log_step_end("EXECUTE", start_time)
             
             return StopEvent(result=ev.sql_query)
@@ -428,12 +598,24 @@ class SQLAgentWorkflow(Workflow):
                 return StopEvent(result="Could not find valid tables for SQL correction.")
             
             # Prepare schema for reflection
-            table_schemas = schema_parser(selected_tables, "DDL", include_sample_data=not app_config.PRIVACY_MODE)
-            
             # Load error reflection template
-            from core.templates import SQL_ERROR_REFLECTION_SKELETON
+            reflection_template = step_prompt_routing(self.prompt_routing)["sql_error_reflection"]
+
+            table_schemas = self._budgeted_schema(
+                "REFLECT", self._prompt_tables(selected_tables), "DDL", user_query,
+                render=lambda schema: reflection_template.format(
+                    database_schema=schema,
+                    database_description=database_description,
+                    sql_query=ev.sql_query,
+                    error_message=ev.error,
+                    dialect=connection_payload.get("dbType", "").upper(),
+                    user_query=user_query
+                ),
+                description=database_description,
+                **self._schema_detail_options()
+            )
             
-            reflection_prompt = SQL_ERROR_REFLECTION_SKELETON.format(
+            reflection_prompt = reflection_template.format(
                 database_schema=table_schemas,
                 database_description=database_description,
                 sql_query=ev.sql_query,
@@ -446,17 +628,7 @@ class SQLAgentWorkflow(Workflow):
             
             # Get corrected SQL from LLM
             log_step_start("REFLECT", message="Querying LLM for SQL correction")
-            llm_start_time = datetime.now()
-            
-            chat_response = llm_chat_with_pydantic(
-                llm=self.llm,
-                prompt=PromptTemplate(reflection_prompt),
-                pydantic_model=SQLQuery
-            )
-            
-            log_llm_operation("REFLECT", "LLM response", llm_start_time, chat_response)
-            
-            corrected_sql = chat_response.sql_query.strip()
+            corrected_sql = (await self._agenerate_sql(context, "REFLECT", reflection_prompt, step="reflect")).strip()
             
             # Check if SQL was actually modified
             if corrected_sql == ev.sql_query:
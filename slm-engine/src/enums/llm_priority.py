@@ -0,0 +1,7 @@
+from enum import IntEnum
+
+class LLMPriority(IntEnum):
+    """Scheduling class of an LLM request; lower values are served first."""
+    INTERACTIVE = 0
+    SUGGESTION = 1
+    ENRICHMENT = 2
@@ -19,6 +19,7 @@ class ResponseEnum(Enum):
     TIMEOUT_ERROR = (5, "Query execution timed out after 200 seconds")
     FAILED_TO_EXECUTE_QUERY = (6, "Failed to execute query")
     WORKFLOW_FAILED = (7, "Workflow failed")
+    SQLITE_HANDLE_NOT_FOUND = (8, "SQLite handle not found or evicted")
     
     def __init__(self, code, message):
         self._code = code
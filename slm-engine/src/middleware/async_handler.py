@@ -1,6 +1,7 @@
 import asyncio
 import logging
 from functools import wraps
+from services.sqlite_store import sqlite_digest_scope
 
 logger = logging.getLogger(__name__)
 
@@ -8,5 +9,7 @@ def async_route(f):
     """Decorator to handle async routes in Flask-RESTX"""
     @wraps(f)
     def wrapped(*args, **kwargs):
-        return asyncio.run(f(*args, **kwargs))
+        # The request's SQLite upload is hashed once for all the calls it makes
+        with sqlite_digest_scope():
+            return asyncio.run(f(*args, **kwargs))
     return wrapped 
\ No newline at end of file
@@ -0,0 +1,106 @@
+import copy
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+from config.app_config import app_config
+
+logger = logging.getLogger(__name__)
+
+class TTLCache:
+    """Thread-safe, size-bounded LRU cache whose entries expire after a TTL."""
+
+    def __init__(self, name: str, max_size: int = 128, ttl_seconds: float = 600.0):
+        self.name = name
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return a copy of the cached value, or None on a miss or an expired entry."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self._expirations += 1
+                self._misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._hits += 1
+        # Callers mutate schema/table dicts in place, never hand out the cached object
+        return copy.deepcopy(value)
+
+    def set(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        """Store a copy of the value, evicting the least recently used entry when full."""
+        if self.max_size <= 0:
+            return
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        stored = copy.deepcopy(value)
+        with self._lock:
+            self._entries[key] = (stored, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def invalidate(self, key: Optional[Hashable] = None) -> int:
+        """Drop a single entry, or every entry when no key is given. Returns the number removed."""
+        with self._lock:
+            if key is None:
+                removed = len(self._entries)
+                self._entries.clear()
+                return removed
+            return 1 if self._entries.pop(key, None) is not None else 0
+
+    def invalidate_where(self, predicate: Callable[[Hashable], bool]) -> int:
+        """Drop every entry whose key matches the predicate. Returns the number removed."""
+        with self._lock:
+            keys = [key for key in self._entries if predicate(key)]
+            for key in keys:
+                del self._entries[key]
+            return len(keys)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters and current occupancy."""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "name": self.name,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+                "evictions": self._evictions,
+                "expirations": self._expirations
+            }
+
+# Create singleton instances
+schema_cache = TTLCache(
+    name="schema",
+    max_size=app_config.SCHEMA_CACHE_MAX_SIZE,
+    ttl_seconds=app_config.SCHEMA_CACHE_TTL
+)
+sample_cache = TTLCache(
+    name="sample",
+    max_size=app_config.SAMPLE_CACHE_MAX_SIZE,
+    ttl_seconds=app_config.SAMPLE_CACHE_TTL
+)
+profile_cache = TTLCache(
+    name="profile",
+    max_size=app_config.PROFILE_CACHE_MAX_SIZE,
+    ttl_seconds=app_config.PROFILE_CACHE_TTL
+)
@@ -0,0 +1,114 @@
+import logging
+import math
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from config.app_config import app_config
+
+logger = logging.getLogger(__name__)
+
+class _BackendWindow:
+    __slots__ = ("num_ctx", "last_used", "grows", "shrinks")
+
+    def __init__(self, num_ctx: int, now: float):
+        self.num_ctx = num_ctx
+        self.last_used = now
+        self.grows = 0
+        self.shrinks = 0
+
+class ContextWindowSizer:
+    """
+    Picks the num_ctx of each Ollama request from a small set of buckets.
+
+    Ollama reallocates the KV cache, and may reload the model, whenever num_ctx changes, and
+    silently truncates prompts longer than the window. The window is sized to the estimated
+    prompt tokens, padded by margin against underestimates, plus the tokens the step may
+    generate, rounded up to the smallest bucket that fits. The choice is sticky per backend
+    and model: a backend only moves to a larger bucket when a request needs it, and back to
+    a smaller one after idle_seconds without requests (by default the model's keep-alive, when
+    it would have been unloaded anyway), so interleaved steps never flip the window back and
+    forth. Requests that do not fit even the largest bucket, or a window fixed by the step's
+    profile, are counted as truncations.
+    """
+
+    def __init__(self, enabled: bool, buckets: List[int], reserve_tokens: int, margin: float = 0.25, idle_seconds: float = 1800.0):
+        self.enabled = enabled
+        self.buckets = sorted(buckets)
+        self.reserve_tokens = reserve_tokens
+        self.margin = margin
+        self.idle_seconds = idle_seconds
+        self._lock = threading.Lock()
+        self._sized = 0
+        self._bucket_usage: Dict[int, int] = {}
+        self._truncations: Dict[str, int] = {}
+        self._max_needed = 0
+        self._backends: Dict[str, _BackendWindow] = {}
+
+    def _sticky_bucket(self, backend: str, bucket: int, now: float) -> int:
+        # Called with the lock held
+        window = self._backends.get(backend)
+        if window is None:
+            window = self._backends[backend] = _BackendWindow(bucket, now)
+        elif bucket > window.num_ctx:
+            window.num_ctx = bucket
+            window.grows += 1
+        elif bucket < window.num_ctx and now - window.last_used >= self.idle_seconds:
+            window.num_ctx = bucket
+            window.shrinks += 1
+        window.last_used = now
+        return window.num_ctx
+
+    def size(
+        self,
+        prompt_tokens: int,
+        step: Optional[str] = None,
+        max_tokens: Optional[int] = None,
+        fixed: Optional[int] = None,
+        backend: Optional[str] = None
+    ) -> Optional[int]:
+        """num_ctx for a request to a backend, or None to leave the client's window as it is."""
+        if not self.enabled or not self.buckets:
+            return fixed
+        needed = math.ceil(prompt_tokens * (1 + self.margin)) + (max_tokens or self.reserve_tokens)
+        with self._lock:
+            if fixed:
+                num_ctx = fixed
+            else:
+                bucket = next((bucket for bucket in self.buckets if bucket >= needed), self.buckets[-1])
+                num_ctx = self._sticky_bucket(backend or "default", bucket, time.monotonic())
+            truncated = needed > num_ctx
+            self._sized += 1
+            self._max_needed = max(self._max_needed, needed)
+            self._bucket_usage[num_ctx] = self._bucket_usage.get(num_ctx, 0) + 1
+            if truncated:
+                self._truncations[step or "default"] = self._truncations.get(step or "default", 0) + 1
+        if truncated:
+            logger.warning(f"Prompt of step '{step}' needs about {needed} tokens but num_ctx is {num_ctx}; the backend will truncate it")
+        return num_ctx
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get request counts per num_ctx bucket, the window of each backend and truncation counts per step."""
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "buckets": self.buckets,
+                "margin": self.margin,
+                "idle_seconds": self.idle_seconds,
+                "sized_requests": self._sized,
+                "bucket_usage": {str(bucket): count for bucket, count in sorted(self._bucket_usage.items())},
+                "backends": {
+                    backend: {"num_ctx": window.num_ctx, "grows": window.grows, "shrinks": window.shrinks}
+                    for backend, window in self._backends.items()
+                },
+                "truncations": dict(self._truncations),
+                "max_needed_tokens": self._max_needed
+            }
+
+# Create a singleton instance
+context_window_sizer = ContextWindowSizer(
+    enabled=app_config.OLLAMA_NUM_CTX_AUTO,
+    buckets=app_config.OLLAMA_NUM_CTX_BUCKETS,
+    reserve_tokens=app_config.OLLAMA_NUM_CTX_RESERVE,
+    margin=app_config.OLLAMA_NUM_CTX_MARGIN,
+    idle_seconds=app_config.OLLAMA_NUM_CTX_IDLE_SECONDS
+)
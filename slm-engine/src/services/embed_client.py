@@ -0,0 +1,239 @@
+import contextlib
+import logging
+import threading
+import time
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from typing import Any, Dict, List, Optional
+from config.app_config import app_config
+from enums.response_enum import ResponseEnum
+from exceptions.app_exception import AppException
+from services.llm_loop import BackgroundLoop
+
+logger = logging.getLogger(__name__)
+
+# Embed service error code for an unknown or evicted SQLite handle
+EMBED_SQLITE_HANDLE_NOT_FOUND = 5001
+
+class EmbedClient:
+    """Shared HTTP client for the embed service with connection pooling and keep-alive."""
+
+    ENDPOINTS = {
+        "connect": "/api/v1/db/get-schema",
+        "connect_sqlite": "/api/v1/db/get-schema/sqlite",
+        "query": "/api/v1/db/query",
+        "query_sqlite": "/api/v1/db/query/sqlite",
+        "register_sqlite": "/api/v1/db/sqlite/register",
+        "connect_sqlite_handle": "/api/v1/db/get-schema/sqlite/{handle}",
+        "query_sqlite_handle": "/api/v1/db/query/sqlite/{handle}",
+        "query_batch": "/api/v1/db/query/batch",
+        "query_sqlite_handle_batch": "/api/v1/db/query/sqlite/{handle}/batch",
+    }
+
+    def __init__(
+        self,
+        base_url: str,
+        pool_size: int = 20,
+        connect_timeout: float = 5.0,
+        endpoint_timeouts: Optional[Dict[str, float]] = None
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.pool_size = pool_size
+        self.connect_timeout = connect_timeout
+        self.endpoint_timeouts = endpoint_timeouts or {}
+
+        # A single keep-alive session reuses TCP connections across requests and threads
+        self._adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=0)
+        self._session = requests.Session()
+        self._session.mount("http://", self._adapter)
+        self._session.mount("https://", self._adapter)
+
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._endpoint_stats: Dict[str, Dict[str, float]] = {}
+
+    def url_for(self, endpoint: str, path_params: Optional[Dict[str, str]] = None) -> str:
+        """Get the absolute URL for a named endpoint."""
+        return f"{self.base_url}{self.ENDPOINTS[endpoint].format(**(path_params or {}))}"
+
+    def timeout_for(self, endpoint: str):
+        """Get the (connect, read) timeout for a named endpoint."""
+        return (self.connect_timeout, self.endpoint_timeouts.get(endpoint))
+
+    @contextlib.contextmanager
+    def track(self, endpoint: str):
+        """Count a request to a named endpoint in the in-flight and per-endpoint statistics."""
+        start_time = time.monotonic()
+        with self._lock:
+            self._in_flight += 1
+        failed = False
+        try:
+            yield
+        except Exception:
+            failed = True
+            raise
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+                stats = self._endpoint_stats.setdefault(endpoint, {"requests": 0, "errors": 0, "total_seconds": 0.0})
+                stats["requests"] += 1
+                stats["errors"] += 1 if failed else 0
+                stats["total_seconds"] += time.monotonic() - start_time
+
+    def post(self, endpoint: str, path_params: Optional[Dict[str, str]] = None, **kwargs) -> requests.Response:
+        """POST to a named endpoint over the pooled session."""
+        kwargs.setdefault("timeout", self.timeout_for(endpoint))
+        with self.track(endpoint):
+            return self._session.post(self.url_for(endpoint, path_params), **kwargs)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get request counters and connection pool statistics."""
+        with self._lock:
+            endpoints = {
+                name: {
+                    "requests": int(stats["requests"]),
+                    "errors": int(stats["errors"]),
+                    "avg_seconds": round(stats["total_seconds"] / stats["requests"], 4) if stats["requests"] else 0.0
+                }
+                for name, stats in self._endpoint_stats.items()
+            }
+            in_flight = self._in_flight
+
+        pools = []
+        try:
+            pool_manager = self._adapter.poolmanager
+            for key in list(pool_manager.pools.keys()):
+                pool = pool_manager.pools.get(key)
+                if pool is None:
+                    continue
+                pools.append({
+                    "host": f"{pool.scheme}://{pool.host}:{pool.port}",
+                    "connections_created": pool.num_connections,
+                    "requests_served": pool.num_requests,
+                    "idle_connections": pool.pool.qsize() if pool.pool is not None else 0
+                })
+        except Exception as e:
+            logger.warning(f"Could not read embed client pool statistics: {e}")
+
+        return {
+            "base_url": self.base_url,
+            "pool_size": self.pool_size,
+            "in_flight": in_flight,
+            "endpoints": endpoints,
+            "pools": pools
+        }
+
+    def close(self) -> None:
+        """Close all pooled connections."""
+        self._session.close()
+
+class AsyncEmbedClient:
+    """Async HTTP client for the embed service, hosted on a shared background loop.
+
+    Each request handler runs its own short-lived event loop, while an async connection
+    pool is bound to the loop that created it. The pool lives on one long-lived loop, and
+    callers await their requests on it without holding a worker thread while the embed
+    service runs a query. Requests are counted in the statistics of the blocking client.
+    """
+
+    def __init__(self, client: EmbedClient, loop: BackgroundLoop):
+        self.client = client
+        self.loop = loop
+        # Created on the background loop by its first request
+        self._http: Optional[httpx.AsyncClient] = None
+
+    def _http_client(self) -> httpx.AsyncClient:
+        if self._http is None:
+            limits = httpx.Limits(max_connections=self.client.pool_size, max_keepalive_connections=self.client.pool_size)
+            self._http = httpx.AsyncClient(limits=limits)
+        return self._http
+
+    async def _post(self, endpoint: str, url: str, **kwargs) -> httpx.Response:
+        connect_timeout, read_timeout = self.client.timeout_for(endpoint)
+        kwargs.setdefault("timeout", httpx.Timeout(read_timeout, connect=connect_timeout))
+        return await self._http_client().post(url, **kwargs)
+
+    async def post(self, endpoint: str, path_params: Optional[Dict[str, str]] = None, **kwargs) -> httpx.Response:
+        """POST to a named endpoint without blocking the event loop.
+
+        Raises httpx.TimeoutException when the connect or read timeout of the endpoint expires.
+        """
+        url = self.client.url_for(endpoint, path_params)
+        with self.client.track(endpoint):
+            return await self.loop.run(self._post(endpoint, url, **kwargs))
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.client.get_stats(), "loop": self.loop.get_stats()}
+
+def parse_schema_response(response) -> list:
+    """Extract the table details from an embed service schema response."""
+    if response.status_code == 200:
+        result = response.json()
+        if result.get("code") == 0:
+            schema = result.get("data", {})
+            if not schema:
+                raise ValueError("Schema not found in the API response.")
+            table_details = schema.get("tables", [])
+            return table_details
+        elif result.get("code") == EMBED_SQLITE_HANDLE_NOT_FOUND:
+            raise AppException(ResponseEnum.SQLITE_HANDLE_NOT_FOUND)
+        else:
+            raise AppException(ResponseEnum.FAILED_TO_GET_SCHEMA)
+    else:
+        raise AppException(ResponseEnum.FAILED_TO_GET_SCHEMA)
+
+def parse_query_response(response) -> dict:
+    """Convert an embed service query response into the {"data", "error"} shape."""
+    result = response.json()
+    if response.status_code == 200 and result.get("code") == 0:
+        return {
+            "data": result.get("data", {}),
+            "error": None
+        }
+    elif response.status_code == 200 and (result.get("code") == 2002 or result.get("code") == 2004):
+        return {
+            "data": None,
+            "error": result.get("message", {})
+        }
+    elif response.status_code == 200 and result.get("code") == EMBED_SQLITE_HANDLE_NOT_FOUND:
+        raise AppException(ResponseEnum.SQLITE_HANDLE_NOT_FOUND)
+    else:
+        raise AppException(ResponseEnum.FAILED_TO_EXECUTE_QUERY)
+
+def parse_batch_response(response, expected_count: int) -> List[dict]:
+    """Convert an embed service batch response into one {"data", "error"} dict per statement."""
+    result = response.json()
+    if response.status_code == 200 and result.get("code") == 0:
+        statements = result.get("data") or []
+        if len(statements) != expected_count:
+            raise AppException(ResponseEnum.FAILED_TO_EXECUTE_QUERY)
+        return [
+            {"data": statement.get("data"), "error": None}
+            if statement.get("error") is None else
+            {"data": None, "error": statement.get("error")}
+            for statement in statements
+        ]
+    elif response.status_code == 200 and result.get("code") == EMBED_SQLITE_HANDLE_NOT_FOUND:
+        raise AppException(ResponseEnum.SQLITE_HANDLE_NOT_FOUND)
+    else:
+        raise AppException(ResponseEnum.FAILED_TO_EXECUTE_QUERY)
+
+# Create singleton instances
+embed_client = EmbedClient(
+    base_url=app_config.EMBED_HOST_API,
+    pool_size=app_config.EMBED_POOL_SIZE,
+    connect_timeout=app_config.EMBED_CONNECT_TIMEOUT,
+    endpoint_timeouts={
+        "connect": app_config.EMBED_SCHEMA_TIMEOUT,
+        "connect_sqlite": app_config.EMBED_SCHEMA_TIMEOUT,
+        "query": app_config.EMBED_QUERY_TIMEOUT,
+        "query_sqlite": app_config.EMBED_QUERY_TIMEOUT,
+        "register_sqlite": app_config.EMBED_SCHEMA_TIMEOUT,
+        "connect_sqlite_handle": app_config.EMBED_SCHEMA_TIMEOUT,
+        "query_sqlite_handle": app_config.EMBED_QUERY_TIMEOUT,
+        "query_batch": app_config.EMBED_QUERY_TIMEOUT,
+        "query_sqlite_handle_batch": app_config.EMBED_QUERY_TIMEOUT,
+    }
+)
+async_embed_client = AsyncEmbedClient(embed_client, BackgroundLoop(name="embed"))
@@ -0,0 +1,81 @@
+import asyncio
+import concurrent.futures
+import threading
+from collections import OrderedDict, deque
+from typing import Any, Dict, Hashable
+
+class AsyncLimiter:
+    """
+    Counting semaphore awaited on an event loop without holding a thread.
+
+    Waiters are concurrent futures, so requests running on different event loops (every
+    request has its own) and plain threads share one limit. release() is thread-safe and
+    may be called from the worker thread that did the limited work.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = max(1, limit)
+        self._in_flight = 0
+        self._waiters = deque()
+        self._lock = threading.Lock()
+
+    async def acquire(self) -> None:
+        with self._lock:
+            if self._in_flight < self.limit and not self._waiters:
+                self._in_flight += 1
+                return
+            future = concurrent.futures.Future()
+            self._waiters.append(future)
+        try:
+            await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            if not future.cancelled():
+                # Granted just as the caller gave up
+                self.release()
+            raise
+
+    def release(self) -> None:
+        with self._lock:
+            while self._waiters:
+                future = self._waiters.popleft()
+                # Hand the slot straight to the next waiter that has not been cancelled
+                if future.set_running_or_notify_cancel():
+                    future.set_result(None)
+                    return
+            self._in_flight -= 1
+
+    @property
+    def idle(self) -> bool:
+        with self._lock:
+            return self._in_flight == 0 and not self._waiters
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"limit": self.limit, "in_flight": self._in_flight, "waiting": len(self._waiters)}
+
+class KeyedLimiters:
+    """Bounded LRU map of AsyncLimiters; only idle limiters are evicted, so a limit never resets while in use."""
+
+    def __init__(self, limit: int, max_keys: int = 256):
+        self.limit = limit
+        self.max_keys = max_keys
+        self._limiters: "OrderedDict[Hashable, AsyncLimiter]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> AsyncLimiter:
+        with self._lock:
+            limiter = self._limiters.get(key)
+            if limiter is None:
+                limiter = AsyncLimiter(self.limit)
+                self._limiters[key] = limiter
+                for stale_key in list(self._limiters):
+                    if len(self._limiters) <= self.max_keys:
+                        break
+                    if stale_key != key and self._limiters[stale_key].idle:
+                        del self._limiters[stale_key]
+            self._limiters.move_to_end(key)
+            return limiter
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"keys": len(self._limiters), "max_keys": self.max_keys, "limit": self.limit}
@@ -0,0 +1,208 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+from config.app_config import app_config
+from services.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# LLM attributes that change the generated output for the same prompt
+_GENERATION_PARAMS = (
+    "temperature",
+    "max_tokens",
+    "context_window",
+    "json_mode",
+    "additional_kwargs",
+    "generation_config",
+)
+
+# Provider settings kept in private attributes, by the name they are keyed under
+_PRIVATE_GENERATION_PARAMS = {
+    # Gemini sends its temperature, max output tokens and thinking config from here
+    "generation_config": "_generation_config",
+}
+
+def llm_generation_params(llm) -> Dict[str, Any]:
+    """Output-affecting settings of an LLM instance, whatever its provider."""
+    params = {}
+    for name in _GENERATION_PARAMS:
+        value = getattr(llm, name, None)
+        if value is not None:
+            params[name] = value
+    for name, attribute in _PRIVATE_GENERATION_PARAMS.items():
+        value = getattr(llm, attribute, None)
+        if value and name not in params:
+            params[name] = value
+    return params
+
+def effective_temperature(llm, profile: Optional[Dict[str, Any]] = None) -> Optional[float]:
+    """
+    Temperature a request is decoded with: the step's generation profile first, then the
+    client's request options (Ollama) or generation config (Gemini), then its temperature.
+    """
+    if profile and profile.get("temperature") is not None:
+        return profile["temperature"]
+    params = llm_generation_params(llm)
+    for options in (params.get("additional_kwargs"), params.get("generation_config")):
+        if isinstance(options, dict) and options.get("temperature") is not None:
+            return options["temperature"]
+    return params.get("temperature")
+
+class LLMResponseCache:
+    """
+    Exact-match cache of LLM responses.
+
+    Responses are keyed by provider, model, generation parameters, prompt and output
+    schema, and stored as text. Only deterministic requests belong here: a request
+    sampled at a temperature above 0 must produce a new response every time. An in-memory TTLCache serves repeated prompts; when a
+    path is configured, entries are also written to a SQLite file so they survive restarts.
+    """
+
+    def __init__(self, enabled: bool, max_size: int, ttl_seconds: float, path: Optional[str] = None):
+        self.enabled = enabled
+        self.ttl_seconds = ttl_seconds
+        self.path = path
+        self._memory = TTLCache(name="llm_response", max_size=max_size, ttl_seconds=ttl_seconds)
+        self._disk = None
+        self._disk_lock = threading.Lock()
+        self._disk_hits = 0
+        self._disk_errors = 0
+        self._stores = 0
+        self._sampled = 0
+        if enabled and path:
+            self._open_disk(path)
+
+    def _open_disk(self, path: str) -> None:
+        try:
+            directory = os.path.dirname(os.path.abspath(path))
+            os.makedirs(directory, exist_ok=True)
+            self._disk = sqlite3.connect(path, check_same_thread=False)
+            self._disk.execute("PRAGMA journal_mode = WAL")
+            self._disk.execute(
+                "CREATE TABLE IF NOT EXISTS llm_response "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._disk.execute("DELETE FROM llm_response WHERE expires_at < ?", (time.time(),))
+            self._disk.commit()
+            logger.info(f"LLM response cache persisted at {path}")
+        except sqlite3.Error as e:
+            # The memory tier keeps working without persistence
+            logger.warning(f"Could not open LLM response cache at {path}: {e}")
+            self._disk = None
+
+    @staticmethod
+    def is_sampled(llm, profile: Optional[Dict[str, Any]] = None) -> bool:
+        """Whether requests with this client and generation profile are sampled, or of unknown temperature."""
+        temperature = effective_temperature(llm, profile)
+        return temperature is None or float(temperature) > 0
+
+    def record_sampled(self) -> None:
+        """Count a request that bypassed the cache because it is sampled."""
+        self._sampled += 1
+
+    @staticmethod
+    def make_key(llm, prompt: str, output_schema: Optional[Dict[str, Any]] = None, call_kwargs: Optional[Dict[str, Any]] = None) -> str:
+        """Hash of everything that determines the response to a prompt."""
+        material = json.dumps({
+            "provider": type(llm).__name__,
+            "model": getattr(llm, "model", None),
+            "params": llm_generation_params(llm),
+            "call_kwargs": call_kwargs or {},
+            "prompt": prompt,
+            "output_schema": output_schema,
+        }, sort_keys=True, default=str)
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Cached response text for a key, looking in memory first and then on disk."""
+        if not self.enabled:
+            return None
+        value = self._memory.get(key)
+        if value is not None or self._disk is None:
+            return value
+
+        try:
+            with self._disk_lock:
+                row = self._disk.execute(
+                    "SELECT value, expires_at FROM llm_response WHERE key = ?", (key,)
+                ).fetchone()
+        except sqlite3.Error as e:
+            self._disk_errors += 1
+            logger.warning(f"LLM response cache read failed: {e}")
+            return None
+        if row is None or row[1] < time.time():
+            return None
+
+        self._disk_hits += 1
+        # Promote to memory for the remaining lifetime of the entry
+        self._memory.set(key, row[0], ttl_seconds=row[1] - time.time())
+        return row[0]
+
+    def set(self, key: Optional[str], value: str) -> None:
+        """Store a response text in memory and, when persistence is on, on disk; a None key (a sampled request) stores nothing."""
+        if not self.enabled or key is None or value is None:
+            return
+        self._memory.set(key, value)
+        self._stores += 1
+        if self._disk is None:
+            return
+        try:
+            with self._disk_lock:
+                self._disk.execute(
+                    "INSERT OR REPLACE INTO llm_response (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, value, time.time() + self.ttl_seconds)
+                )
+                self._disk.commit()
+        except sqlite3.Error as e:
+            self._disk_errors += 1
+            logger.warning(f"LLM response cache write failed: {e}")
+
+    def invalidate(self) -> int:
+        """Drop every cached response. Returns the number removed from memory."""
+        removed = self._memory.invalidate()
+        if self._disk is not None:
+            try:
+                with self._disk_lock:
+                    self._disk.execute("DELETE FROM llm_response")
+                    self._disk.commit()
+            except sqlite3.Error as e:
+                self._disk_errors += 1
+                logger.warning(f"LLM response cache clear failed: {e}")
+        return removed
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get memory tier counters plus disk tier usage."""
+        stats = self._memory.get_stats()
+        disk_entries = None
+        if self._disk is not None:
+            try:
+                with self._disk_lock:
+                    disk_entries = self._disk.execute("SELECT COUNT(*) FROM llm_response").fetchone()[0]
+            except sqlite3.Error:
+                pass
+        lookups = stats["hits"] + stats["misses"]
+        stats.update({
+            "enabled": self.enabled,
+            "stores": self._stores,
+            "sampled_bypasses": self._sampled,
+            "disk_path": self.path if self._disk is not None else None,
+            "disk_entries": disk_entries,
+            "disk_hits": self._disk_hits,
+            "disk_errors": self._disk_errors,
+            # A disk hit follows a memory miss, so count it towards the overall hit rate
+            "overall_hit_rate": round((stats["hits"] + self._disk_hits) / lookups, 4) if lookups else 0.0
+        })
+        return stats
+
+# Create a singleton instance
+llm_response_cache = LLMResponseCache(
+    enabled=app_config.LLM_CACHE_ENABLED,
+    max_size=app_config.LLM_CACHE_MAX_SIZE,
+    ttl_seconds=app_config.LLM_CACHE_TTL,
+    path=app_config.LLM_CACHE_PATH
+)
@@ -0,0 +1,182 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Optional
+from config.app_config import app_config
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STEP = "default"
+
+class LLMHedger:
+    """
+    Hedged LLM requests against tail latency.
+
+    Latencies are tracked per workflow step. When a request has not completed within its
+    step's hedge delay (an explicit budget, or the configured percentile of recent
+    latencies), the same request is sent to another backend; the first successful response
+    wins and the other request is cancelled. Each attempt takes its own scheduler slot, so
+    hedges never exceed the in-flight limit of a backend. Once a hedge is running, a failed attempt
+    waits for the other one instead, so a hedge also absorbs a failing backend. Hedges are
+    capped to a fraction of all hedgeable requests so they cannot double the load during
+    a slowdown.
+    """
+
+    def __init__(
+        self,
+        enabled: bool,
+        percentile: float,
+        max_ratio: float,
+        min_samples: int,
+        budgets: Dict[str, float],
+        window: int = 500
+    ):
+        self.enabled = enabled
+        self.percentile = percentile
+        self.max_ratio = max_ratio
+        self.min_samples = min_samples
+        self.budgets = budgets
+        self.window = window
+        self._latencies: Dict[str, deque] = {}
+        self._lock = threading.Lock()
+        self._calls = 0
+        self._hedged = 0
+        self._hedge_wins = 0
+
+    def _record(self, step: str, seconds: float) -> None:
+        with self._lock:
+            self._latencies.setdefault(step, deque(maxlen=self.window)).append(seconds)
+
+    def hedge_delay(self, step: str) -> Optional[float]:
+        """Seconds to wait before hedging a request of a step, None when there is no basis yet."""
+        if step in self.budgets:
+            return self.budgets[step]
+        with self._lock:
+            samples = sorted(self._latencies.get(step, ()))
+        if len(samples) < self.min_samples:
+            return None
+        return samples[min(len(samples) - 1, int(self.percentile * len(samples)))]
+
+    def _allow_hedge(self, may_hedge: Optional[Callable[[], bool]] = None) -> bool:
+        with self._lock:
+            if self._hedged + 1 > self.max_ratio * self._calls:
+                return False
+            if may_hedge is not None and not may_hedge():
+                return False
+            self._hedged += 1
+            return True
+
+    async def run(
+        self,
+        step: Optional[str],
+        attempt: Callable[[], Awaitable[Any]],
+        hedgeable: bool,
+        may_hedge: Optional[Callable[[], bool]] = None
+    ) -> Any:
+        """
+        Await attempt(), starting a second attempt once the step's hedge delay has passed.
+
+        may_hedge(), when given, is asked last before a hedge starts and can veto it.
+        """
+        step = step or DEFAULT_STEP
+        start = time.monotonic()
+        delay = self.hedge_delay(step) if self.enabled and hedgeable else None
+        if delay is None:
+            result = await attempt()
+            self._record(step, time.monotonic() - start)
+            return result
+
+        with self._lock:
+            self._calls += 1
+        tasks = [asyncio.ensure_future(attempt())]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done and self._allow_hedge(may_hedge):
+                logger.info(f"Hedging '{step}' LLM request after {delay:.2f}s")
+                tasks.append(asyncio.ensure_future(attempt()))
+
+            pending = set(tasks)
+            while True:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                succeeded = [task for task in done if task.exception() is None]
+                if succeeded or not pending:
+                    break
+            winner = succeeded[0] if succeeded else next(iter(done))
+            if len(tasks) > 1 and winner is tasks[1]:
+                with self._lock:
+                    self._hedge_wins += 1
+            result = winner.result()
+        finally:
+            # The losing request is cancelled, which aborts it on its backend
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+        self._record(step, time.monotonic() - start)
+        return result
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hedge counts and the latency percentiles each step is hedged at."""
+        with self._lock:
+            steps = {step: sorted(samples) for step, samples in self._latencies.items()}
+            stats = {
+                "enabled": self.enabled,
+                "percentile": self.percentile,
+                "max_ratio": self.max_ratio,
+                "hedgeable_requests": self._calls,
+                "hedged": self._hedged,
+                "hedge_wins": self._hedge_wins,
+                "hedge_ratio": round(self._hedged / self._calls, 4) if self._calls else 0.0
+            }
+        stats["steps"] = {
+            step: {
+                "samples": len(samples),
+                "p50_seconds": round(samples[len(samples) // 2], 3),
+                "p99_seconds": round(samples[min(len(samples) - 1, int(0.99 * len(samples)))], 3),
+                "hedge_delay_seconds": self.hedge_delay(step)
+            }
+            for step, samples in steps.items() if samples
+        }
+        return stats
+
+class HedgedProgress:
+    """
+    Progress reports of a streamed request that may be hedged, limited to the winning attempt.
+
+    Reports pass through while the first attempt runs alone. A hedge may only start before
+    anything has been reported; once it has, every report is held back, and the caller
+    reports the text of the attempt that won. Clients therefore never see partial text of
+    two different generations.
+    """
+
+    def __init__(self, on_progress: Optional[Callable[[str], None]]):
+        self.on_progress = on_progress
+        self._lock = threading.Lock()
+        self._reported = False
+        self.hedged = False
+
+    def report(self, text: str) -> None:
+        if self.on_progress is None:
+            return
+        with self._lock:
+            if self.hedged:
+                return
+            self._reported = True
+        self.on_progress(text)
+
+    def may_hedge(self) -> bool:
+        with self._lock:
+            if self._reported:
+                return False
+            self.hedged = True
+            return True
+
+# Create a singleton instance
+llm_hedger = LLMHedger(
+    enabled=app_config.LLM_HEDGING_ENABLED,
+    percentile=app_config.LLM_HEDGE_PERCENTILE,
+    max_ratio=app_config.LLM_HEDGE_MAX_RATIO,
+    min_samples=app_config.LLM_HEDGE_MIN_SAMPLES,
+    budgets=app_config.LLM_HEDGE_BUDGETS
+)
@@ -0,0 +1,74 @@
+import asyncio
+import concurrent.futures
+import logging
+import threading
+from typing import Any, Coroutine, Dict
+
+logger = logging.getLogger(__name__)
+
+class BackgroundLoop:
+    """A long-lived event loop running in a daemon thread.
+
+    Each request handler runs its own short-lived event loop, while async HTTP clients
+    keep loop-bound connection pools. Running every call of such a client on one of these
+    loops lets all requests share it, and callers still await the result without
+    blocking their own loop.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+        self._submitted = 0
+
+    def _ensure_started(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None or not self._thread.is_alive():
+                loop = asyncio.new_event_loop()
+                ready = threading.Event()
+
+                def run():
+                    asyncio.set_event_loop(loop)
+                    loop.call_soon(ready.set)
+                    loop.run_forever()
+
+                self._thread = threading.Thread(target=run, name=f"{self.name}-loop", daemon=True)
+                self._thread.start()
+                ready.wait()
+                self._loop = loop
+                logger.info(f"Started background event loop '{self.name}'")
+            self._submitted += 1
+            return self._loop
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        return self._ensure_started()
+
+    def submit(self, coro: Coroutine) -> concurrent.futures.Future:
+        """Schedule a coroutine on the background loop from any thread.
+
+        The caller's context variables are carried over, so tracing spans opened by the
+        caller remain the parent of the work done on the background loop.
+        """
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_started())
+
+    async def run(self, coro: Coroutine) -> Any:
+        """Await a coroutine executed on the background loop.
+
+        Cancelling the awaiting task cancels the coroutine on the background loop too.
+        """
+        return await asyncio.wrap_future(self.submit(coro))
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            running = self._loop is not None and self._thread.is_alive()
+            pending = len(asyncio.all_tasks(self._loop)) if running else 0
+            return {
+                "running": running,
+                "submitted": self._submitted,
+                "pending_tasks": pending
+            }
+
+# Create a singleton instance
+llm_loop = BackgroundLoop(name="llm")
@@ -0,0 +1,189 @@
+import asyncio
+import concurrent.futures
+import contextlib
+import contextvars
+import itertools
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List
+from config.app_config import app_config
+from enums.llm_priority import LLMPriority
+
+logger = logging.getLogger(__name__)
+
+# Scheduling class of the LLM requests made in the current context
+_current_priority: contextvars.ContextVar = contextvars.ContextVar("llm_priority", default=LLMPriority.INTERACTIVE)
+
+@contextlib.contextmanager
+def llm_priority(priority: LLMPriority):
+    """Schedule the LLM requests made inside the block, including workflow steps it starts, at a priority."""
+    token = _current_priority.set(priority)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+def current_llm_priority() -> LLMPriority:
+    return _current_priority.get()
+
+def llm_backend_key(llm) -> str:
+    """Identity of the server, or pool of servers, an LLM instance sends requests to."""
+    return str(getattr(llm, "backend_key", None) or getattr(llm, "base_url", None) or type(llm).__name__)
+
+def llm_backend_capacity(llm) -> int:
+    """Number of servers behind an LLM instance; a pool keeps proportionally more requests in flight."""
+    return getattr(llm, "capacity", 1)
+
+class _Waiter:
+    __slots__ = ("priority", "sequence", "enqueued_at", "future")
+
+    def __init__(self, priority: LLMPriority, sequence: int):
+        self.priority = priority
+        self.sequence = sequence
+        self.enqueued_at = time.monotonic()
+        self.future = concurrent.futures.Future()
+
+class _Backend:
+    __slots__ = ("in_flight", "limit", "waiters")
+
+    def __init__(self, limit: int):
+        self.in_flight = 0
+        self.limit = limit
+        self.waiters: List[_Waiter] = []
+
+class LLMScheduler:
+    """
+    Priority scheduler bounding the in-flight LLM requests per backend.
+
+    Requests wait in a queue per backend and are dispatched by priority class, first come
+    first served within a class. Waiting requests age: every aging_seconds spent in the
+    queue promotes a request by one class, so enrichment keeps making progress behind a
+    steady stream of interactive queries. Waiters are concurrent futures, so threaded and
+    event-loop callers share the same queues. The limit is max_in_flight per server, so a
+    pool of servers shares one queue whose limit scales with the servers taking requests.
+    """
+
+    def __init__(self, max_in_flight: int, aging_seconds: float, wait_samples: int = 1000):
+        self.max_in_flight = max_in_flight
+        self.aging_seconds = aging_seconds
+        self._backends: Dict[str, _Backend] = {}
+        self._lock = threading.Lock()
+        self._sequence = itertools.count()
+        self._dispatched = {priority: 0 for priority in LLMPriority}
+        self._waits = {priority: deque(maxlen=wait_samples) for priority in LLMPriority}
+
+    def _effective_priority(self, waiter: _Waiter, now: float) -> tuple:
+        promotions = int((now - waiter.enqueued_at) / self.aging_seconds) if self.aging_seconds > 0 else 0
+        return (max(0, int(waiter.priority) - promotions), waiter.sequence)
+
+    def _grant(self, waiter: _Waiter, now: float) -> bool:
+        # Fails when the waiter was cancelled while queued
+        if not waiter.future.set_running_or_notify_cancel():
+            return False
+        self._dispatched[waiter.priority] += 1
+        self._waits[waiter.priority].append(now - waiter.enqueued_at)
+        waiter.future.set_result(None)
+        return True
+
+    def _dispatch(self, backend: _Backend) -> None:
+        now = time.monotonic()
+        while backend.waiters and backend.in_flight < backend.limit:
+            waiter = min(backend.waiters, key=lambda w: self._effective_priority(w, now))
+            backend.waiters.remove(waiter)
+            if self._grant(waiter, now):
+                backend.in_flight += 1
+
+    def _enqueue(self, backend_key: str, priority: LLMPriority, capacity: int) -> _Waiter:
+        with self._lock:
+            backend = self._backends.setdefault(backend_key, _Backend(self.max_in_flight))
+            # Pools grow and shrink as servers are ejected and come back
+            backend.limit = self.max_in_flight * max(1, capacity)
+            waiter = _Waiter(priority, next(self._sequence))
+            backend.waiters.append(waiter)
+            self._dispatch(backend)
+            return waiter
+
+    def _release(self, backend_key: str) -> None:
+        with self._lock:
+            backend = self._backends[backend_key]
+            backend.in_flight -= 1
+            self._dispatch(backend)
+
+    def _discard(self, backend_key: str, waiter: _Waiter) -> None:
+        with self._lock:
+            backend = self._backends[backend_key]
+            if waiter in backend.waiters:
+                backend.waiters.remove(waiter)
+
+    @contextlib.contextmanager
+    def slot(self, backend_key: str, priority: LLMPriority = None, capacity: int = 1):
+        """Hold one in-flight slot of a backend, blocking the thread until it is granted."""
+        waiter = self._enqueue(backend_key, current_llm_priority() if priority is None else priority, capacity)
+        waiter.future.result()
+        try:
+            yield
+        finally:
+            self._release(backend_key)
+
+    @contextlib.asynccontextmanager
+    async def aslot(self, backend_key: str, priority: LLMPriority = None, capacity: int = 1):
+        """Hold one in-flight slot of a backend, awaiting it without blocking the event loop."""
+        waiter = self._enqueue(backend_key, current_llm_priority() if priority is None else priority, capacity)
+        try:
+            await asyncio.wrap_future(waiter.future)
+        except asyncio.CancelledError:
+            if waiter.future.cancelled():
+                self._discard(backend_key, waiter)
+            else:
+                # Granted just as the caller gave up
+                self._release(backend_key)
+            raise
+        try:
+            yield
+        finally:
+            self._release(backend_key)
+
+    @staticmethod
+    def _percentile(samples: List[float], fraction: float) -> float:
+        if not samples:
+            return 0.0
+        ordered = sorted(samples)
+        return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))], 3)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get queue depth and in-flight count per backend, and wait times per priority class."""
+        with self._lock:
+            backends = {
+                key: {
+                    "in_flight": backend.in_flight,
+                    "limit": backend.limit,
+                    "queued": {
+                        priority.name.lower(): sum(1 for w in backend.waiters if w.priority == priority)
+                        for priority in LLMPriority
+                    }
+                }
+                for key, backend in self._backends.items()
+            }
+            classes = {}
+            for priority in LLMPriority:
+                waits = list(self._waits[priority])
+                classes[priority.name.lower()] = {
+                    "dispatched": self._dispatched[priority],
+                    "wait_p50_seconds": self._percentile(waits, 0.5),
+                    "wait_p99_seconds": self._percentile(waits, 0.99),
+                    "wait_max_seconds": round(max(waits), 3) if waits else 0.0
+                }
+        return {
+            "max_in_flight": self.max_in_flight,
+            "aging_seconds": self.aging_seconds,
+            "backends": backends,
+            "classes": classes
+        }
+
+# Create a singleton instance
+llm_scheduler = LLMScheduler(
+    max_in_flight=app_config.LLM_MAX_IN_FLIGHT,
+    aging_seconds=app_config.LLM_SCHEDULER_AGING_SECONDS
+)
@@ -0,0 +1,71 @@
+import logging
+import threading
+from collections import deque
+from typing import Any, Dict
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STEP = "default"
+
+def common_prefix_length(left: str, right: str) -> int:
+    """Length of the longest common prefix of two strings, by binary search over slice comparisons."""
+    low, high = 0, min(len(left), len(right))
+    while low < high:
+        middle = (low + high + 1) // 2
+        if left[:middle] == right[:middle]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+class PrefixReuseTracker:
+    """
+    Measures how much of each LLM prompt repeats the start of a recent prompt.
+
+    The backend's prompt (KV) cache only skips prefill for a prefix it has just processed,
+    so per workflow step this records the longest common prefix with the last few prompts
+    sent, as an estimate of the prefill the cache can save. Comparing the stats across
+    prompt routings shows what a prompt layout gains.
+    """
+
+    def __init__(self, window: int = 8):
+        self.window = window
+        self._recent = deque(maxlen=window)
+        self._steps: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, step: str, prompt: str) -> int:
+        """Record a prompt sent for a step and return the length of its reusable prefix."""
+        step = step or DEFAULT_STEP
+        with self._lock:
+            recent = list(self._recent)
+            self._recent.append(prompt)
+        # Prompts of other steps count too: retrieval follows translation over the same schema
+        reusable = max((common_prefix_length(prompt, previous) for previous in recent), default=0)
+        with self._lock:
+            stats = self._steps.setdefault(step, {"prompts": 0, "prompt_chars": 0, "reusable_chars": 0, "hits": 0})
+            stats["prompts"] += 1
+            stats["prompt_chars"] += len(prompt)
+            stats["reusable_chars"] += reusable
+            # A hit reuses at least half of the prompt
+            if reusable * 2 >= len(prompt):
+                stats["hits"] += 1
+        return reusable
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get the share of prompt characters each step could serve from the prompt cache."""
+        with self._lock:
+            return {
+                "window": self.window,
+                "steps": {
+                    step: {
+                        **stats,
+                        "reuse_ratio": round(stats["reusable_chars"] / stats["prompt_chars"], 4) if stats["prompt_chars"] else 0.0,
+                        "hit_rate": round(stats["hits"] / stats["prompts"], 4) if stats["prompts"] else 0.0
+                    }
+                    for step, stats in self._steps.items()
+                }
+            }
+
+# Create a singleton instance
+prompt_prefix_tracker = PrefixReuseTracker()
@@ -0,0 +1,205 @@
+import logging
+import math
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+from unidecode import unidecode
+from config.app_config import app_config
+
+logger = logging.getLogger(__name__)
+
+def normalize_question(question: str) -> str:
+    """Lower-case ASCII form of a question with punctuation and repeated whitespace removed."""
+    text = unidecode(question or "").lower()
+    text = re.sub(r"[^a-z0-9]+", " ", text)
+    return text.strip()
+
+def question_vector(normalized: str, n: int = 3) -> Counter:
+    """Character n-gram counts of a normalized question, padded so short words still count."""
+    padded = f" {normalized} "
+    return Counter(padded[i:i + n] for i in range(max(1, len(padded) - n + 1)))
+
+def cosine_similarity(left: Counter, right: Counter) -> float:
+    if len(left) > len(right):
+        left, right = right, left
+    dot = sum(count * right.get(gram, 0) for gram, count in left.items())
+    if not dot:
+        return 0.0
+    norm = math.sqrt(sum(c * c for c in left.values())) * math.sqrt(sum(c * c for c in right.values()))
+    return dot / norm
+
+def _numbers(normalized: str) -> tuple:
+    # "top 5" and "top 10" are near-identical as text but need different SQL
+    return tuple(sorted(re.findall(r"\d+", normalized)))
+
+# Words that never change the SQL a question needs
+_STOPWORDS = {
+    "a", "an", "the", "me", "us", "i", "we", "you", "please", "show", "list", "give", "get", "find", "display",
+    "tell", "what", "which", "are", "is", "was", "were", "be", "can", "could", "would", "do", "does", "did",
+    "cho", "toi", "hay", "la", "nhung", "cac"
+}
+
+# Negations and words with an opposite that needs different SQL: one small difference in them
+# flips the answer while the text stays near-identical, so they always count as content
+_NEGATION_WORDS = {"not", "no", "never", "without", "none", "nor", "except", "excluding", "exclude", "khong", "chua", "chang"}
+_ANTONYM_WORDS = {
+    "asc", "ascending", "desc", "descending", "north", "south", "east", "west", "highest", "lowest", "most",
+    "least", "max", "maximum", "min", "minimum", "first", "last", "before", "after", "above", "below", "more",
+    "less", "greater", "smaller", "larger", "top", "bottom", "oldest", "newest", "earliest", "latest", "best",
+    "worst", "increase", "decrease", "active", "inactive", "paid", "unpaid", "open", "closed", "in", "out"
+}
+_POLARITY_WORDS = _NEGATION_WORDS | _ANTONYM_WORDS
+
+def _stem(word: str) -> str:
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+def question_terms(normalized: str) -> tuple:
+    """
+    Content words of a normalized question in order, singular, without stopwords; negations
+    and antonyms always kept. The order matters: "customers per order" is not "orders per customer".
+    """
+    return tuple(
+        word if word in _POLARITY_WORDS else _stem(word)
+        for word in normalized.split()
+        if word in _POLARITY_WORDS or word not in _STOPWORDS
+    )
+
+class QuestionCache:
+    """
+    Near-duplicate lookup of validated SQL by question, per schema scope.
+
+    Questions are normalized (case, accents, punctuation, whitespace) and compared as
+    character trigram vectors; a cached question matches when its cosine similarity is at
+    least the threshold, it mentions the same numbers and it has the same content words in
+    the same order. Trigrams alone rate "shipped" and "not shipped", "north" and "south
+    region", or "orders per customer" and "customers per order" above 0.9, so a question
+    differing in any content word, negation, antonym or in their order is never served
+    another question's SQL. Scopes identify a connection and schema version, so SQL
+    is never reused against a different schema.
+    """
+
+    def __init__(self, enabled: bool, threshold: float, max_size: int, max_scopes: int, ttl_seconds: float):
+        self.enabled = enabled
+        self.threshold = threshold
+        self.max_size = max_size
+        self.max_scopes = max_scopes
+        self.ttl_seconds = ttl_seconds
+        self._scopes: "OrderedDict[Hashable, OrderedDict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._exact_hits = 0
+        self._similar_hits = 0
+        self._misses = 0
+        self._stores = 0
+        self._evictions = 0
+
+    def lookup(self, scope: Hashable, question: str) -> Optional[Dict[str, Any]]:
+        """Best cached entry for a question in a scope: sql, matched question and similarity."""
+        if not self.enabled:
+            return None
+        normalized = normalize_question(question)
+        if not normalized:
+            return None
+
+        now = time.monotonic()
+        with self._lock:
+            entries = self._scopes.get(scope)
+            if entries is None:
+                self._misses += 1
+                return None
+            self._scopes.move_to_end(scope)
+
+            for key in [key for key, entry in entries.items() if entry["expires_at"] < now]:
+                del entries[key]
+
+            entry = entries.get(normalized)
+            if entry is not None:
+                entries.move_to_end(normalized)
+                self._exact_hits += 1
+                return {"sql": entry["sql"], "question": entry["question"], "similarity": 1.0}
+
+            vector = question_vector(normalized)
+            numbers = _numbers(normalized)
+            terms = question_terms(normalized)
+            best_key, best_similarity = None, 0.0
+            for key, entry in entries.items():
+                if entry["numbers"] != numbers or entry["terms"] != terms:
+                    continue
+                similarity = cosine_similarity(vector, entry["vector"])
+                if similarity > best_similarity:
+                    best_key, best_similarity = key, similarity
+
+            if best_key is None or best_similarity < self.threshold:
+                self._misses += 1
+                return None
+            entries.move_to_end(best_key)
+            self._similar_hits += 1
+            entry = entries[best_key]
+            return {"sql": entry["sql"], "question": entry["question"], "similarity": round(best_similarity, 4)}
+
+    def store(self, scope: Hashable, question: str, sql: str) -> None:
+        """Remember the validated SQL of a question, evicting the least recently used entries."""
+        if not self.enabled or self.max_size <= 0:
+            return
+        normalized = normalize_question(question)
+        if not normalized or not sql:
+            return
+
+        with self._lock:
+            entries = self._scopes.setdefault(scope, OrderedDict())
+            self._scopes.move_to_end(scope)
+            entries[normalized] = {
+                "question": question,
+                "sql": sql,
+                "vector": question_vector(normalized),
+                "numbers": _numbers(normalized),
+                "terms": question_terms(normalized),
+                "expires_at": time.monotonic() + self.ttl_seconds
+            }
+            entries.move_to_end(normalized)
+            self._stores += 1
+            while len(entries) > self.max_size:
+                entries.popitem(last=False)
+                self._evictions += 1
+            while len(self._scopes) > self.max_scopes:
+                _, dropped = self._scopes.popitem(last=False)
+                self._evictions += len(dropped)
+
+    def invalidate_where(self, predicate: Callable[[Hashable], bool]) -> int:
+        """Drop every scope matching the predicate. Returns the number of entries removed."""
+        with self._lock:
+            scopes = [scope for scope in self._scopes if predicate(scope)]
+            return sum(len(self._scopes.pop(scope)) for scope in scopes)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters and current occupancy."""
+        with self._lock:
+            hits = self._exact_hits + self._similar_hits
+            lookups = hits + self._misses
+            return {
+                "enabled": self.enabled,
+                "threshold": self.threshold,
+                "scopes": len(self._scopes),
+                "size": sum(len(entries) for entries in self._scopes.values()),
+                "max_size": self.max_size,
+                "exact_hits": self._exact_hits,
+                "similar_hits": self._similar_hits,
+                "misses": self._misses,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+                "stores": self._stores,
+                "evictions": self._evictions
+            }
+
+# Create a singleton instance
+question_cache = QuestionCache(
+    enabled=app_config.QUESTION_CACHE_ENABLED,
+    threshold=app_config.QUESTION_CACHE_THRESHOLD,
+    max_size=app_config.QUESTION_CACHE_MAX_SIZE,
+    max_scopes=app_config.QUESTION_CACHE_MAX_SCOPES,
+    ttl_seconds=app_config.QUESTION_CACHE_TTL
+)
@@ -0,0 +1,105 @@
+import asyncio
+import concurrent.futures
+import logging
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+logger = logging.getLogger(__name__)
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent calls so that only one of them does the work.
+
+    The first caller for a key becomes the leader and runs the call; callers arriving with
+    the same key while it runs wait for the leader's result or exception instead. In-flight
+    calls are tracked as concurrent futures, so threaded callers (do) and event-loop
+    callers (ado) coalesce with each other. If a leader is cancelled, a waiting caller
+    takes over and runs the call itself.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: Dict[Hashable, concurrent.futures.Future] = {}
+        self._lock = threading.Lock()
+        self._leaders = 0
+        self._coalesced = 0
+
+    def _join(self, key: Hashable):
+        """Return (future, is_leader) for a key, registering a new flight when none is running."""
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                self._coalesced += 1
+                return future, False
+            future = concurrent.futures.Future()
+            self._inflight[key] = future
+            self._leaders += 1
+            return future, True
+
+    def _finish(self, key: Hashable, future: concurrent.futures.Future) -> None:
+        with self._lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """Run fn once per key among concurrent threaded callers and share its outcome."""
+        while True:
+            future, is_leader = self._join(key)
+            if not is_leader:
+                try:
+                    return future.result()
+                except concurrent.futures.CancelledError:
+                    continue
+
+            try:
+                result = fn()
+            except BaseException as e:
+                self._finish(key, future)
+                future.set_exception(e)
+                raise
+            self._finish(key, future)
+            future.set_result(result)
+            return result
+
+    async def ado(self, key: Hashable, coro_fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Await coro_fn() once per key among concurrent callers and share its outcome."""
+        while True:
+            future, is_leader = self._join(key)
+            if not is_leader:
+                try:
+                    # Shielded: a cancelled follower must not cancel the shared flight
+                    return await asyncio.shield(asyncio.wrap_future(future))
+                except asyncio.CancelledError:
+                    if future.cancelled():
+                        continue
+                    raise
+
+            try:
+                result = await coro_fn()
+            except asyncio.CancelledError:
+                # Followers see the cancellation and one of them runs the call instead
+                self._finish(key, future)
+                future.cancel()
+                raise
+            except BaseException as e:
+                self._finish(key, future)
+                future.set_exception(e)
+                raise
+            self._finish(key, future)
+            future.set_result(result)
+            return result
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get counts of executed and coalesced calls."""
+        with self._lock:
+            calls = self._leaders + self._coalesced
+            return {
+                "name": self.name,
+                "in_flight": len(self._inflight),
+                "executed": self._leaders,
+                "coalesced": self._coalesced,
+                "coalesced_rate": round(self._coalesced / calls, 4) if calls else 0.0
+            }
+
+# Create a singleton instance
+llm_single_flight = SingleFlight(name="llm")
@@ -0,0 +1,504 @@
+import base64
+import contextlib
+import contextvars
+import hashlib
+import logging
+import math
+import os
+import pathlib
+import queue
+import sqlite3
+import tempfile
+import threading
+import time
+import requests
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+from config.app_config import app_config
+from enums.response_enum import ResponseEnum
+from exceptions.app_exception import AppException
+from services.embed_client import EmbedClient, embed_client, parse_schema_response, parse_query_response, parse_batch_response
+
+logger = logging.getLogger(__name__)
+
+# Digests of the uploads hashed in the current request, keyed by object identity: (file object, digest).
+# The memo only lives as long as its scope, so no upload is kept in memory past its request
+_digest_memo: contextvars.ContextVar = contextvars.ContextVar("sqlite_digest_memo", default=None)
+
+@contextlib.contextmanager
+def sqlite_digest_scope():
+    """Hash each SQLite upload once for the calls made inside the block, e.g. one request."""
+    token = _digest_memo.set({})
+    try:
+        yield
+    finally:
+        _digest_memo.reset(token)
+
+def sqlite_payload_bytes(connection_payload) -> bytes:
+    """Return the raw SQLite database bytes from a connection payload."""
+    file_data = connection_payload["file"]
+    if isinstance(file_data, str):
+        try:
+            # Decode base64 to binary
+            return base64.b64decode(file_data)
+        except Exception as e:
+            raise ValueError(f"Invalid base64 encoded file: {str(e)}")
+    # Already binary data
+    return file_data
+
+def sqlite_payload_digest(connection_payload) -> str:
+    """
+    Content hash of the SQLite file carried by a connection payload.
+
+    The hash is always taken over the payload's file as received (no base64 decode), never
+    trusted from the client. Inside a sqlite_digest_scope it is memoized per file object,
+    so the schema/sample/validation calls of one request hash the same upload once; a
+    payload whose file is replaced is hashed again.
+    """
+    file_data = connection_payload["file"]
+    if not isinstance(file_data, (str, bytes)):
+        # Mutable buffers can change under the same identity
+        return hashlib.sha256(bytes(file_data)).hexdigest()
+    memo = _digest_memo.get()
+    # The memo holds a reference, so the id cannot have been reused by another object
+    entry = memo.get(id(file_data)) if memo is not None else None
+    if entry is not None and entry[0] is file_data:
+        return entry[1]
+    raw = file_data.encode("utf-8") if isinstance(file_data, str) else file_data
+    digest = hashlib.sha256(raw).hexdigest()
+    if memo is not None:
+        memo[id(file_data)] = (file_data, digest)
+    return digest
+
+class SqliteStore(ABC):
+    """
+    Contract for content-addressed SQLite databases: a file is registered once and
+    every later schema or query call refers to it by handle.
+    """
+
+    def __init__(self, max_handles: int = 32):
+        self.max_handles = max_handles
+        self._handles: "OrderedDict[str, str]" = OrderedDict()
+        self._register_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._registrations = 0
+        self._reuses = 0
+        self._reregistrations = 0
+
+    @abstractmethod
+    def register(self, file_bytes: bytes) -> str:
+        """Store a SQLite file and return its handle."""
+        pass
+
+    @abstractmethod
+    def get_schema(self, handle: str) -> List[Dict[str, Any]]:
+        """Get the table details of a registered database."""
+        pass
+
+    @abstractmethod
+    def execute(self, handle: str, sql_query: str) -> Dict[str, Any]:
+        """Execute a query against a registered database, returning {"data", "error"}."""
+        pass
+
+    @abstractmethod
+    def execute_batch(self, handle: str, sql_queries: List[str], timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Execute several queries against a registered database, one result per query."""
+        pass
+
+    def resolve(self, connection_payload) -> str:
+        """Get the handle for the payload's database, uploading it only if it is unknown."""
+        digest = sqlite_payload_digest(connection_payload)
+        handle = self._lookup(digest)
+        if handle is not None:
+            return handle
+
+        with self._lock:
+            register_lock = self._register_locks.setdefault(digest, threading.Lock())
+        with register_lock:
+            # Another thread may have registered the same file while we waited
+            handle = self._lookup(digest)
+            if handle is not None:
+                return handle
+            handle = self.register(sqlite_payload_bytes(connection_payload))
+            with self._lock:
+                self._handles[digest] = handle
+                self._registrations += 1
+                while len(self._handles) > self.max_handles:
+                    self._handles.popitem(last=False)
+                self._register_locks.pop(digest, None)
+        return handle
+
+    def forget(self, connection_payload) -> None:
+        """Drop the remembered handle so the next call registers the file again."""
+        with self._lock:
+            self._handles.pop(sqlite_payload_digest(connection_payload), None)
+
+    def get_schema_for(self, connection_payload) -> List[Dict[str, Any]]:
+        return self._with_handle(connection_payload, self.get_schema)
+
+    def execute_for(self, connection_payload, sql_query: str) -> Dict[str, Any]:
+        return self._with_handle(connection_payload, lambda handle: self.execute(handle, sql_query))
+
+    def execute_batch_for(self, connection_payload, sql_queries: List[str], timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        return self._with_handle(connection_payload, lambda handle: self.execute_batch(handle, sql_queries, timeout))
+
+    def _with_handle(self, connection_payload, operation: Callable[[str], Any]):
+        handle = self.resolve(connection_payload)
+        try:
+            return operation(handle)
+        except AppException as e:
+            if e.code != ResponseEnum.SQLITE_HANDLE_NOT_FOUND.code:
+                raise
+            # The store restarted or evicted the file: upload it again and retry once
+            logger.info(f"SQLite handle {handle} is no longer registered, uploading again")
+            self.forget(connection_payload)
+            with self._lock:
+                self._reregistrations += 1
+            return operation(self.resolve(connection_payload))
+
+    def _lookup(self, digest: str) -> Optional[str]:
+        with self._lock:
+            handle = self._handles.get(digest)
+            if handle is not None:
+                self._handles.move_to_end(digest)
+                self._reuses += 1
+            return handle
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get handle registration counters."""
+        with self._lock:
+            return {
+                "backend": type(self).__name__,
+                "handles": len(self._handles),
+                "max_handles": self.max_handles,
+                "registrations": self._registrations,
+                "reuses": self._reuses,
+                "reregistrations": self._reregistrations
+            }
+
+class EmbedSqliteStore(SqliteStore):
+    """SQLite store backed by the embed service's handle endpoints."""
+
+    def __init__(self, client: EmbedClient, max_handles: int = 32):
+        super().__init__(max_handles=max_handles)
+        self.client = client
+
+    def register(self, file_bytes: bytes) -> str:
+        files = {'file': ('database.sqlite', file_bytes, 'application/octet-stream')}
+        try:
+            response = self.client.post("register_sqlite", files=files)
+        except Exception as e:
+            raise AppException(ResponseEnum.CANNOT_CONNECT_TO_EMBEB_SERVER)
+
+        result = response.json() if response.status_code == 200 else {}
+        if result.get("code") != 0 or not result.get("data"):
+            raise AppException(result.get("message") or ResponseEnum.FAILED_TO_GET_SCHEMA.message, ResponseEnum.FAILED_TO_GET_SCHEMA.code)
+        handle = result["data"]["handle"]
+        logger.info(f"Registered SQLite file with embed service as {handle}")
+        return handle
+
+    def get_schema(self, handle: str) -> List[Dict[str, Any]]:
+        try:
+            response = self.client.post("connect_sqlite_handle", path_params={"handle": handle})
+        except Exception as e:
+            raise AppException(ResponseEnum.CANNOT_CONNECT_TO_EMBEB_SERVER)
+        return parse_schema_response(response)
+
+    def execute(self, handle: str, sql_query: str) -> Dict[str, Any]:
+        try:
+            response = self.client.post("query_sqlite_handle", path_params={"handle": handle}, json={"query": sql_query})
+        except requests.exceptions.Timeout:
+            raise AppException(ResponseEnum.TIMEOUT_ERROR)
+        except Exception as e:
+            raise AppException(ResponseEnum.CANNOT_CONNECT_TO_EMBEB_SERVER)
+        return parse_query_response(response)
+
+    def execute_batch(self, handle: str, sql_queries: List[str], timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        payload = {"queries": sql_queries}
+        if timeout is not None:
+            payload["timeoutSeconds"] = max(1, int(math.ceil(timeout)))
+        try:
+            response = self.client.post("query_sqlite_handle_batch", path_params={"handle": handle}, json=payload)
+        except requests.exceptions.Timeout:
+            raise AppException(ResponseEnum.TIMEOUT_ERROR)
+        except Exception as e:
+            raise AppException(ResponseEnum.CANNOT_CONNECT_TO_EMBEB_SERVER)
+        return parse_batch_response(response, len(sql_queries))
+
+def _remove_file(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        logger.warning(f"Failed to delete SQLite file: {path}")
+
+class _ConnectionPool:
+    """
+    Bounded pool of read-only connections to one SQLite file.
+
+    Connections are leased: once the pool is closed, acquire raises SQLITE_HANDLE_NOT_FOUND
+    (so the caller registers the file again), and a file closed with remove_file is deleted
+    only after the last leased connection comes back.
+    """
+
+    def __init__(self, path: str, size: int, mmap_size: int):
+        self.path = path
+        self.size = size
+        self.mmap_size = mmap_size
+        self._idle: "queue.LifoQueue[Optional[sqlite3.Connection]]" = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._leased = 0
+        self._closed = False
+        self._remove_file = False
+
+    def _open(self) -> sqlite3.Connection:
+        # immutable=1 lets SQLite skip locking and change detection on a file that never changes
+        uri = f"{pathlib.Path(self.path).as_uri()}?mode=ro&immutable=1"
+        connection = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        connection.execute("PRAGMA query_only = ON")
+        connection.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+        return connection
+
+    def acquire(self, timeout: Optional[float] = None) -> sqlite3.Connection:
+        with self._lock:
+            if self._closed:
+                raise AppException(ResponseEnum.SQLITE_HANDLE_NOT_FOUND)
+            self._leased += 1
+        try:
+            return self._checkout(timeout)
+        except BaseException:
+            self._end_lease()
+            raise
+
+    def _checkout(self, timeout: Optional[float]) -> sqlite3.Connection:
+        try:
+            connection = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                if self._created < self.size:
+                    self._created += 1
+                    create = True
+                else:
+                    create = False
+            if create:
+                try:
+                    return self._open()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            try:
+                connection = self._idle.get(timeout=timeout)
+            except queue.Empty:
+                raise AppException(ResponseEnum.TIMEOUT_ERROR)
+        if connection is None:
+            # The pool was closed while we waited: pass the wake-up on to the next waiter
+            self._idle.put(None)
+            raise AppException(ResponseEnum.SQLITE_HANDLE_NOT_FOUND)
+        return connection
+
+    def release(self, connection: sqlite3.Connection) -> None:
+        with self._lock:
+            closed = self._closed
+        if closed:
+            connection.close()
+        else:
+            self._idle.put(connection)
+        self._end_lease()
+
+    def _end_lease(self) -> None:
+        with self._lock:
+            self._leased -= 1
+            remove = self._closed and self._remove_file and self._leased == 0
+            if remove:
+                self._remove_file = False
+        if remove:
+            _remove_file(self.path)
+
+    def close(self, remove_file: bool = False) -> None:
+        """Close the idle connections; with remove_file, delete the file once no connection is leased."""
+        with self._lock:
+            self._closed = True
+            remove = remove_file and self._leased == 0
+            self._remove_file = remove_file and not remove
+        while True:
+            try:
+                connection = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            if connection is not None:
+                connection.close()
+        # Wakes a waiter, which passes it on to the next one
+        self._idle.put(None)
+        if remove:
+            _remove_file(self.path)
+
+class LocalSqliteStore(SqliteStore):
+    """
+    In-process SQLite engine implementing the same handle contract with the stdlib
+    sqlite3 module. Files are stored once per content hash and opened read-only and
+    memory-mapped, each with its own connection pool, so queries skip the embed
+    service round trip entirely. Files are evicted in least-recently-used order; an
+    evicted file is deleted once the queries still running against it have finished.
+    """
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        max_files: int = 32,
+        pool_size: int = 4,
+        mmap_size: int = 256 * 1024 * 1024,
+        query_timeout: float = 30.0
+    ):
+        super().__init__(max_handles=max_files)
+        self.directory = directory or tempfile.mkdtemp(prefix="slm_sqlite_")
+        os.makedirs(self.directory, exist_ok=True)
+        self.max_files = max_files
+        self.pool_size = pool_size
+        self.mmap_size = mmap_size
+        self.query_timeout = query_timeout
+        self._pools: "OrderedDict[str, _ConnectionPool]" = OrderedDict()
+        self._files_lock = threading.Lock()
+        self._queries = 0
+        self._timeouts = 0
+
+    def register(self, file_bytes: bytes) -> str:
+        handle = hashlib.sha256(file_bytes).hexdigest()
+        with self._files_lock:
+            if handle not in self._pools:
+                # A fresh name per registration: an evicted copy of the same file may still be in use
+                fd, path = tempfile.mkstemp(prefix=f"{handle}.", suffix=".sqlite", dir=self.directory)
+                with os.fdopen(fd, "wb") as f:
+                    f.write(file_bytes)
+                self._pools[handle] = _ConnectionPool(path, self.pool_size, self.mmap_size)
+                logger.info(f"Registered local SQLite file {handle} ({len(file_bytes)} bytes)")
+                while len(self._pools) > self.max_files:
+                    evicted_handle, evicted_pool = self._pools.popitem(last=False)
+                    logger.info(f"Evicting local SQLite file {evicted_handle}")
+                    evicted_pool.close(remove_file=True)
+            self._pools.move_to_end(handle)
+        return handle
+
+    def _pool_for(self, handle: str) -> _ConnectionPool:
+        with self._files_lock:
+            pool = self._pools.get(handle)
+            if pool is None or not os.path.exists(pool.path):
+                self._pools.pop(handle, None)
+                raise AppException(ResponseEnum.SQLITE_HANDLE_NOT_FOUND)
+            self._pools.move_to_end(handle)
+            return pool
+
+    def get_schema(self, handle: str) -> List[Dict[str, Any]]:
+        pool = self._pool_for(handle)
+        connection = pool.acquire(timeout=self.query_timeout)
+        try:
+            return read_sqlite_schema(connection)
+        except sqlite3.Error as e:
+            logger.error(f"SQLite schema retrieval error: {e}")
+            raise AppException(ResponseEnum.FAILED_TO_GET_SCHEMA)
+        finally:
+            pool.release(connection)
+
+    def execute(self, handle: str, sql_query: str) -> Dict[str, Any]:
+        return self.execute_batch(handle, [sql_query])[0]
+
+    def execute_batch(self, handle: str, sql_queries: List[str], timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        pool = self._pool_for(handle)
+        timeout = timeout if timeout is not None else self.query_timeout
+        connection = pool.acquire(timeout=timeout)
+        try:
+            return [self._run_statement(connection, sql_query, timeout) for sql_query in sql_queries]
+        finally:
+            connection.set_progress_handler(None, 0)
+            pool.release(connection)
+
+    def _run_statement(self, connection: sqlite3.Connection, sql_query: str, timeout: float) -> Dict[str, Any]:
+        deadline = time.monotonic() + timeout
+        # Abort the statement from inside the VM once the deadline passes
+        connection.set_progress_handler(lambda: 1 if time.monotonic() > deadline else 0, 10000)
+        with self._files_lock:
+            self._queries += 1
+        try:
+            return {"data": fetch_rows(connection, sql_query), "error": None}
+        except sqlite3.OperationalError as e:
+            if time.monotonic() > deadline:
+                with self._files_lock:
+                    self._timeouts += 1
+                return {"data": None, "error": f"Query timed out after {timeout} seconds"}
+            return {"data": None, "error": str(e)}
+        except sqlite3.Error as e:
+            return {"data": None, "error": str(e)}
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = super().get_stats()
+        with self._files_lock:
+            stats.update({
+                "files": len(self._pools),
+                "pool_size": self.pool_size,
+                "queries": self._queries,
+                "timeouts": self._timeouts
+            })
+        return stats
+
+def _quote(identifier: str) -> str:
+    return '"' + identifier.replace('"', '""') + '"'
+
+def read_sqlite_schema(connection: sqlite3.Connection) -> List[Dict[str, Any]]:
+    """Introspect a SQLite database into the embed service's table details shape."""
+    tables = []
+    table_names = [row[0] for row in connection.execute(
+        "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'"
+    )]
+    for table_name in table_names:
+        foreign_keys: Dict[str, List[Dict[str, str]]] = {}
+        for fk in connection.execute(f"PRAGMA foreign_key_list({_quote(table_name)})"):
+            # id, seq, table, from, to, on_update, on_delete, match
+            foreign_keys.setdefault(fk[3], []).append({
+                "toColumn": fk[4],
+                "tableIdentifier": fk[2],
+                "type": "OTM"
+            })
+
+        columns = []
+        for column in connection.execute(f"PRAGMA table_info({_quote(table_name)})"):
+            # cid, name, type, notnull, dflt_value, pk
+            columns.append({
+                "columnIdentifier": column[1],
+                "columnType": column[2],
+                "isPrimaryKey": column[5] == 1,
+                "columnDescription": column[4] if column[4] is not None else "",
+                "relations": foreign_keys.get(column[1], [])
+            })
+
+        tables.append({"tableIdentifier": table_name, "columns": columns})
+    return tables
+
+def _json_value(value: Any) -> Any:
+    # BLOBs are base64 strings, as the embed service's JSON serializer writes byte arrays
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return base64.b64encode(bytes(value)).decode("ascii")
+    return value
+
+def fetch_rows(connection: sqlite3.Connection, sql_query: str) -> List[Dict[str, Any]]:
+    """Run a query and return its rows as column-name keyed dicts of JSON-serializable values."""
+    cursor = connection.execute(sql_query)
+    try:
+        column_names = [description[0] for description in cursor.description or []]
+        return [dict(zip(column_names, map(_json_value, row))) for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+
+def _create_sqlite_store() -> SqliteStore:
+    if app_config.SQLITE_EXECUTION_BACKEND == "local":
+        return LocalSqliteStore(
+            directory=app_config.SQLITE_LOCAL_DIR,
+            max_files=app_config.SQLITE_HANDLE_CACHE_SIZE,
+            pool_size=app_config.SQLITE_LOCAL_POOL_SIZE,
+            mmap_size=app_config.SQLITE_LOCAL_MMAP_SIZE,
+            query_timeout=app_config.SQLITE_LOCAL_QUERY_TIMEOUT
+        )
+    return EmbedSqliteStore(embed_client, max_handles=app_config.SQLITE_HANDLE_CACHE_SIZE)
+
+# Create a singleton instance
+sqlite_store = _create_sqlite_store()
@@ -0,0 +1,57 @@
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STEP = "default"
+
+class StructuredOutputStats:
+    """
+    Counts structured LLM calls per step and provider, how many of them produced output
+    that did not parse into the expected model, and how many were retried or fell back to
+    another method because of it. Every failed parse costs a full extra generation.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._steps: Dict[str, Dict[str, Any]] = {}
+
+    def _entry(self, step: Optional[str]) -> Dict[str, Any]:
+        return self._steps.setdefault(step or DEFAULT_STEP, {"calls": {}, "parse_failures": {}, "retries": 0})
+
+    def record_call(self, step: Optional[str], provider: str) -> None:
+        with self._lock:
+            calls = self._entry(step)["calls"]
+            calls[provider] = calls.get(provider, 0) + 1
+
+    def record_parse_failure(self, step: Optional[str], provider: str, error: Exception) -> None:
+        logger.warning(f"Structured output of step '{step}' ({provider}) did not parse: {error}")
+        with self._lock:
+            failures = self._entry(step)["parse_failures"]
+            failures[provider] = failures.get(provider, 0) + 1
+
+    def record_retry(self, step: Optional[str]) -> None:
+        """A structured call of a step was repeated, or replaced by a fallback, after a bad response."""
+        with self._lock:
+            self._entry(step)["retries"] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get calls, parse failures and retries per step, and the parse failure rate per provider."""
+        with self._lock:
+            steps = {
+                step: {"calls": dict(entry["calls"]), "parse_failures": dict(entry["parse_failures"]), "retries": entry["retries"]}
+                for step, entry in self._steps.items()
+            }
+        totals = {}
+        for entry in steps.values():
+            for provider, count in entry["calls"].items():
+                totals.setdefault(provider, {"calls": 0, "parse_failures": 0})["calls"] += count
+            for provider, count in entry["parse_failures"].items():
+                totals.setdefault(provider, {"calls": 0, "parse_failures": 0})["parse_failures"] += count
+        for total in totals.values():
+            total["parse_failure_rate"] = round(total["parse_failures"] / total["calls"], 4) if total["calls"] else 0.0
+        return {"providers": totals, "steps": steps}
+
+# Create a singleton instance
+structured_output_stats = StructuredOutputStats()
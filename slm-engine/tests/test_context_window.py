@@ -0,0 +1,41 @@
+from services import context_window
+from services.context_window import ContextWindowSizer
+
+
+def _sizer(**overrides):
+    options = {"enabled": True, "buckets": [8192, 2048, 4096], "reserve_tokens": 512, "margin": 0.25, "idle_seconds": 60.0}
+    return ContextWindowSizer(**{**options, **overrides})
+
+
+def test_margin_pads_the_prompt_estimate():
+    sizer = _sizer()
+    # 1400 * 1.25 + 512 = 2262 does not fit 2048
+    assert sizer.size(1400, backend="a") == 4096
+    assert sizer.size(100, max_tokens=1000, backend="b") == 2048
+
+
+def test_window_is_sticky_until_idle(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(context_window.time, "monotonic", lambda: now[0])
+    sizer = _sizer()
+    assert sizer.size(3000, step="generate", backend="a") == 8192
+    assert sizer.size(100, step="translate", backend="a") == 8192
+    assert sizer.size(100, backend="b") == 2048
+    now[0] += 61
+    assert sizer.size(100, backend="a") == 2048
+    assert sizer.size(3000, backend="a") == 8192
+    backends = sizer.get_stats()["backends"]
+    assert backends["a"] == {"num_ctx": 8192, "grows": 1, "shrinks": 1}
+
+
+def test_oversized_and_fixed_windows_count_as_truncations():
+    sizer = _sizer()
+    assert sizer.size(10000, step="generate", backend="a") == 8192
+    assert sizer.size(3000, step="refine", fixed=2048, backend="a") == 2048
+    assert sizer.get_stats()["truncations"] == {"generate": 1, "refine": 1}
+
+
+def test_disabled_sizer_keeps_the_fixed_window():
+    sizer = _sizer(enabled=False)
+    assert sizer.size(3000) is None
+    assert sizer.size(3000, fixed=4096) == 4096
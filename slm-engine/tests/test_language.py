@@ -0,0 +1,54 @@
+import pytest
+
+from core.language import (
+    ENGLISH, OTHER, UNKNOWN, VIETNAMESE, TranslationGate, detect_language,
+    schema_ambiguous_terms, schema_vocabulary,
+)
+
+TABLES = [
+    {"tableIdentifier": "customers", "columns": [{"columnIdentifier": "id"}, {"columnIdentifier": "fullName"}]},
+    {"tableIdentifier": "order_items", "columns": [{"columnIdentifier": "order_id"}, {"columnIdentifier": "quantity"}]},
+]
+
+
+@pytest.mark.parametrize("text, language", [
+    ("How many orders did each customer place last month?", ENGLISH),
+    ("Số lượng khách hàng theo tháng", VIETNAMESE),
+    ("so luong khach hang theo thang", VIETNAMESE),
+    ("¿Cuántos pedidos hay por cliente?", OTHER),
+    ("Combien de clients à Paris?", OTHER),
+    ("每个客户有多少订单", OTHER),
+    ("Сколько заказов", OTHER),
+    ("12345 ?", UNKNOWN),
+])
+def test_detect_language(text, language):
+    assert detect_language(text) == language
+
+
+def test_schema_vocabulary_splits_identifiers():
+    vocabulary = schema_vocabulary(TABLES)
+    assert {"customers", "fullname", "full", "name", "order_items", "order", "items"} <= vocabulary
+
+
+def test_schema_ambiguous_terms():
+    vocabulary = schema_vocabulary(TABLES)
+    assert schema_ambiguous_terms("list all customer names", vocabulary) == []
+    assert schema_ambiguous_terms("list all custmers", vocabulary) == ["custmers"]
+    assert schema_ambiguous_terms("total qty_sold per item", vocabulary) == ["qty_sold"]
+
+
+def test_gate_skips_only_plain_english_questions():
+    gate = TranslationGate(enabled=True)
+    assert gate.needs_translation("How many customers are there?", TABLES) is False
+    assert gate.needs_translation("Có bao nhiêu khách hàng?", TABLES) is True
+    assert gate.needs_translation("How many custmers are there?", TABLES) is True
+    stats = gate.get_stats()
+    assert stats["checked"] == 3 and stats["skipped"] == 1
+    assert stats["languages"] == {ENGLISH: 2, VIETNAMESE: 1}
+    assert stats["reasons"] == {"english": 1, "not_english": 1, "schema_ambiguous_terms": 1}
+
+
+def test_disabled_gate_always_translates():
+    gate = TranslationGate(enabled=False)
+    assert gate.needs_translation("How many customers are there?", TABLES) is True
+    assert gate.get_stats()["checked"] == 0
@@ -0,0 +1,45 @@
+from services.llm_cache import LLMResponseCache, effective_temperature, llm_generation_params
+
+
+class _Ollama:
+    def __init__(self, temperature=0.7, additional_kwargs=None):
+        self.model = "qwen"
+        self.temperature = temperature
+        self.additional_kwargs = additional_kwargs or {}
+
+
+class _Gemini:
+    def __init__(self, temperature=0.5, generation_config=None):
+        self.model = "gemini"
+        self.temperature = temperature
+        self._generation_config = generation_config or {}
+
+
+def test_effective_temperature_prefers_the_profile_then_request_options():
+    assert effective_temperature(_Ollama(), {"temperature": 0.0}) == 0.0
+    assert effective_temperature(_Ollama(additional_kwargs={"temperature": 0.0})) == 0.0
+    assert effective_temperature(_Ollama()) == 0.7
+    assert effective_temperature(_Gemini(generation_config={"temperature": 0.2})) == 0.2
+    assert effective_temperature(object()) is None
+
+
+def test_sampled_requests_are_detected():
+    assert not LLMResponseCache.is_sampled(_Ollama(), {"temperature": 0.0})
+    assert LLMResponseCache.is_sampled(_Ollama(), {"temperature": 0.7})
+    assert LLMResponseCache.is_sampled(_Ollama(), {})
+    assert LLMResponseCache.is_sampled(object())
+
+
+def test_private_generation_config_is_part_of_the_key():
+    thinking = _Gemini(generation_config={"thinking_config": {"thinking_budget": 0}})
+    assert llm_generation_params(thinking)["generation_config"] == {"thinking_config": {"thinking_budget": 0}}
+    assert LLMResponseCache.make_key(thinking, "prompt") != LLMResponseCache.make_key(_Gemini(), "prompt")
+    assert LLMResponseCache.make_key(_Gemini(), "prompt") == LLMResponseCache.make_key(_Gemini(), "prompt")
+
+
+def test_none_key_stores_nothing():
+    cache = LLMResponseCache(enabled=True, max_size=8, ttl_seconds=60)
+    cache.set(None, "SELECT 1")
+    cache.set("key", "SELECT 2")
+    assert cache.get("key") == "SELECT 2"
+    assert cache.get_stats()["stores"] == 1
@@ -0,0 +1,100 @@
+import asyncio
+
+from services.llm_hedging import HedgedProgress, LLMHedger
+
+
+def _hedger(**overrides):
+    options = {"enabled": True, "percentile": 0.9, "max_ratio": 1.0, "min_samples": 5, "budgets": {}}
+    return LLMHedger(**{**options, **overrides})
+
+
+def _attempts(*delays, fail_first=False):
+    """attempt() whose n-th call sleeps delays[n]; records starts and cancellations."""
+    log = {"started": [], "cancelled": []}
+
+    async def attempt():
+        index = len(log["started"])
+        log["started"].append(index)
+        try:
+            await asyncio.sleep(delays[index])
+        except asyncio.CancelledError:
+            log["cancelled"].append(index)
+            raise
+        if fail_first and index == 0:
+            raise RuntimeError("backend down")
+        return index
+
+    return attempt, log
+
+
+def test_hedge_delay_from_budget_or_percentile():
+    hedger = _hedger(budgets={"generate": 2.5})
+    assert hedger.hedge_delay("generate") == 2.5
+    for seconds in (0.1, 0.2, 0.3, 0.4):
+        hedger._record("translate", seconds)
+    assert hedger.hedge_delay("translate") is None
+    for seconds in (0.5, 0.6, 0.7, 0.8, 0.9, 1.0):
+        hedger._record("translate", seconds)
+    assert hedger.hedge_delay("translate") == 1.0
+
+
+def test_slow_attempt_is_hedged_and_the_loser_cancelled():
+    hedger = _hedger(budgets={"generate": 0.01})
+    attempt, log = _attempts(1.0, 0.01)
+    assert asyncio.run(hedger.run("generate", attempt, hedgeable=True)) == 1
+    assert log == {"started": [0, 1], "cancelled": [0]}
+    stats = hedger.get_stats()
+    assert stats["hedged"] == 1 and stats["hedge_wins"] == 1
+
+
+def test_fast_attempt_is_not_hedged():
+    hedger = _hedger(budgets={"generate": 0.5})
+    attempt, log = _attempts(0.01)
+    assert asyncio.run(hedger.run("generate", attempt, hedgeable=True)) == 0
+    assert log["started"] == [0]
+
+
+def test_failed_attempt_waits_for_the_hedge():
+    hedger = _hedger(budgets={"generate": 0.01})
+    attempt, log = _attempts(0.03, 0.05, fail_first=True)
+    assert asyncio.run(hedger.run("generate", attempt, hedgeable=True)) == 1
+    assert log["cancelled"] == []
+
+
+def test_hedges_are_capped_to_a_ratio_of_requests():
+    hedger = _hedger(budgets={"generate": 0.01}, max_ratio=0.5)
+    first, first_log = _attempts(0.05, 0.01)
+    second, second_log = _attempts(0.05, 0.01)
+    asyncio.run(hedger.run("generate", first, hedgeable=True))
+    asyncio.run(hedger.run("generate", second, hedgeable=True))
+    # A hedge is only allowed while it keeps hedged / requests within the ratio
+    assert first_log["started"] == [0]
+    assert second_log["started"] == [0, 1]
+    assert hedger.get_stats()["hedge_ratio"] == 0.5
+
+
+def test_unhedgeable_requests_and_vetoes_run_once():
+    hedger = _hedger(budgets={"generate": 0.01})
+    attempt, log = _attempts(0.05)
+    asyncio.run(hedger.run("generate", attempt, hedgeable=False))
+    vetoed, vetoed_log = _attempts(0.05)
+    asyncio.run(hedger.run("generate", vetoed, hedgeable=True, may_hedge=lambda: False))
+    assert log["started"] == [0] and vetoed_log["started"] == [0]
+    assert hedger.get_stats()["hedged"] == 0
+
+
+def test_progress_is_held_back_once_a_hedge_starts():
+    reported = []
+    progress = HedgedProgress(reported.append)
+    assert progress.may_hedge() is True
+    progress.report("SELECT")
+    assert reported == [] and progress.hedged
+
+
+def test_reported_progress_vetoes_a_hedge():
+    reported = []
+    progress = HedgedProgress(reported.append)
+    progress.report("SELECT")
+    assert progress.may_hedge() is False
+    progress.report("SELECT id")
+    assert reported == ["SELECT", "SELECT id"] and not progress.hedged
@@ -0,0 +1,101 @@
+import asyncio
+
+import pytest
+
+from enums.llm_priority import LLMPriority
+from services import llm_scheduler as scheduler_module
+from services.llm_scheduler import LLMScheduler
+
+BACKEND = "http://ollama:11434"
+
+
+def _queued(scheduler):
+    return scheduler.get_stats()["backends"][BACKEND]["queued"]
+
+
+def _in_flight(scheduler):
+    return scheduler.get_stats()["backends"][BACKEND]["in_flight"]
+
+
+def test_waiters_are_granted_by_priority_then_arrival():
+    scheduler = LLMScheduler(max_in_flight=1, aging_seconds=0)
+    holder = scheduler._enqueue(BACKEND, LLMPriority.INTERACTIVE, 1)
+    assert holder.future.done()
+    waiters = [
+        scheduler._enqueue(BACKEND, priority, 1)
+        for priority in (LLMPriority.ENRICHMENT, LLMPriority.INTERACTIVE, LLMPriority.SUGGESTION, LLMPriority.INTERACTIVE)
+    ]
+    order = []
+    for _ in waiters:
+        scheduler._release(BACKEND)
+        order += [i for i, waiter in enumerate(waiters) if waiter.future.done() and i not in order]
+    assert order == [1, 3, 2, 0]
+
+
+def test_waiting_requests_are_promoted_by_age(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(scheduler_module.time, "monotonic", lambda: now[0])
+    scheduler = LLMScheduler(max_in_flight=1, aging_seconds=10)
+    scheduler._enqueue(BACKEND, LLMPriority.INTERACTIVE, 1)
+    enrichment = scheduler._enqueue(BACKEND, LLMPriority.ENRICHMENT, 1)
+    now[0] += 25
+    interactive = scheduler._enqueue(BACKEND, LLMPriority.INTERACTIVE, 1)
+
+    # Two promotions put the enrichment request in the interactive class, ahead by arrival
+    scheduler._release(BACKEND)
+    assert enrichment.future.done() and not interactive.future.done()
+
+
+def test_pool_capacity_scales_the_limit():
+    scheduler = LLMScheduler(max_in_flight=2, aging_seconds=0)
+    waiters = [scheduler._enqueue(BACKEND, LLMPriority.INTERACTIVE, 3) for _ in range(7)]
+    assert sum(waiter.future.done() for waiter in waiters) == 6
+    assert scheduler.get_stats()["backends"][BACKEND]["limit"] == 6
+
+
+def test_cancelled_queued_request_leaves_no_trace():
+    scheduler = LLMScheduler(max_in_flight=1, aging_seconds=0)
+
+    async def main():
+        async with scheduler.aslot(BACKEND):
+            queued = asyncio.ensure_future(_hold(scheduler))
+            await asyncio.sleep(0.01)
+            assert _queued(scheduler)["interactive"] == 1
+            queued.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await queued
+            assert _queued(scheduler)["interactive"] == 0
+        assert _in_flight(scheduler) == 0
+
+    asyncio.run(main())
+
+
+def test_slot_granted_while_the_caller_is_cancelled_is_released():
+    scheduler = LLMScheduler(max_in_flight=1, aging_seconds=0)
+
+    async def main():
+        holder = scheduler._enqueue(BACKEND, LLMPriority.INTERACTIVE, 1)
+        queued = asyncio.ensure_future(_hold(scheduler))
+        await asyncio.sleep(0.01)
+        # Grant the queued request and cancel it before it gets to run
+        scheduler._release(BACKEND)
+        queued.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await queued
+        assert holder.future.done()
+        assert _in_flight(scheduler) == 0
+
+    asyncio.run(main())
+
+
+def test_threaded_slots_share_the_limit_and_count_dispatches():
+    scheduler = LLMScheduler(max_in_flight=1, aging_seconds=0)
+    with scheduler.slot(BACKEND, priority=LLMPriority.SUGGESTION):
+        assert _in_flight(scheduler) == 1
+    assert _in_flight(scheduler) == 0
+    assert scheduler.get_stats()["classes"]["suggestion"]["dispatched"] == 1
+
+
+async def _hold(scheduler, seconds=1.0):
+    async with scheduler.aslot(BACKEND):
+        await asyncio.sleep(seconds)
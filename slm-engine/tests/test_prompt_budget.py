@@ -0,0 +1,112 @@
+import math
+
+import pytest
+
+from config.app_config import app_config
+from core import prompt_budget
+from core.prompt_budget import assemble_schema, prompt_tokens
+from core.utils import schema_parser
+
+QUESTION = "total amount of orders per customer name"
+
+
+@pytest.fixture(autouse=True)
+def estimated_tokens(monkeypatch):
+    monkeypatch.setattr(app_config, "PROMPT_TOKENIZER", "")
+
+
+def _column(name, column_type="varchar", **extra):
+    return {"columnIdentifier": name, "columnType": column_type, **extra}
+
+
+def _tables():
+    customers = {
+        "tableIdentifier": "customers",
+        "columns": [
+            _column("id", "int", isPrimaryKey=True),
+            _column("name"),
+            _column("fax_number"),
+            _column("legacy_code"),
+        ],
+        "sample_data": [f"({i}, 'Customer {i}', '555-01{i:02d}', 'LC{i}')" for i in range(10)],
+    }
+    orders = {
+        "tableIdentifier": "orders",
+        "columns": [
+            _column("id", "int", isPrimaryKey=True),
+            _column("customer_id", "int", relations=[{"type": "OTM", "tableIdentifier": "customers", "toColumn": "id"}]),
+            _column("amount", "decimal"),
+            _column("internal_note"),
+            _column("warehouse_bin"),
+        ],
+        "sample_data": [f"({i}, {i % 3}, {i * 10}.00, 'note {i}', 'BIN-{i}')" for i in range(10)],
+    }
+    return [customers, orders]
+
+
+def _render(schema):
+    return f"Answer the question with one SQL query.\n\n{schema}\n\nQuestion: {QUESTION}"
+
+
+def _full_tokens():
+    return prompt_tokens(_render(schema_parser(_tables(), "DDL", include_sample_data=True)))
+
+
+def test_prompt_tokens_estimate_from_length():
+    assert prompt_tokens("") == 0
+    assert prompt_tokens("x" * 35) == math.ceil(35 / prompt_budget.CHARS_PER_TOKEN)
+
+
+def test_zero_budget_keeps_the_full_schema():
+    result = assemble_schema(_tables(), "DDL", QUESTION, _render, include_sample_data=True, budget=0)
+    assert result["report"] is None
+    assert result["schema"] == schema_parser(_tables(), "DDL", include_sample_data=True)
+
+
+def test_schema_within_budget_is_untouched():
+    total = _full_tokens()
+    result = assemble_schema(_tables(), "DDL", QUESTION, _render, include_sample_data=True, budget=total)
+    report = result["report"]
+    assert report["prompt_tokens"] == total
+    assert report["dropped_sample_rows"] == [] and report["dropped_columns"] == {}
+    assert not report["over_budget"]
+
+
+def test_sample_rows_are_dropped_before_columns():
+    result = assemble_schema(_tables(), "DDL", QUESTION, _render, include_sample_data=True, budget=_full_tokens() - 5)
+    report = result["report"]
+    assert report["dropped_sample_rows"]
+    assert report["dropped_columns"] == {}
+    assert report["prompt_tokens"] <= report["budget"]
+    assert prompt_tokens(_render(result["schema"])) == report["prompt_tokens"]
+
+
+def test_key_columns_survive_a_tight_budget():
+    result = assemble_schema(_tables(), "DDL", QUESTION, _render, include_sample_data=True, budget=1)
+    report = result["report"]
+    assert report["over_budget"]
+    assert report["dropped_sample_rows"] == ["customers", "orders"]
+    assert "id" not in report["dropped_columns"].get("customers", [])
+    assert not {"id", "customer_id"} & set(report["dropped_columns"]["orders"])
+    assert "customer_id int" in result["schema"]
+    assert "orders.customer_id can be joined with  customers.id" in result["schema"]
+
+
+def test_least_relevant_columns_are_dropped_first():
+    bare = [{**table, "sample_data": []} for table in _tables()]
+    full = prompt_tokens(_render(schema_parser(bare, "DDL")))
+    result = assemble_schema(bare, "DDL", QUESTION, _render, budget=full - 3)
+    dropped = [c for columns in result["report"]["dropped_columns"].values() for c in columns]
+    assert dropped and not {"amount", "name"} & set(dropped)
+
+
+def test_stable_mode_drops_the_same_sections_for_every_question():
+    bare = [{**table, "sample_data": []} for table in _tables()]
+    render = lambda question: lambda schema: f"Answer with one SQL query.\n\n{schema}\n\nQuestion: {question}"
+    questions = ["which warehouse_bin holds notes", "total amount per customer name!"]
+    full = prompt_tokens(render(questions[0])(schema_parser(bare, "DDL")))
+    results = [assemble_schema(bare, "DDL", q, render(q), budget=full - 3, stable=True) for q in questions]
+    assert results[0]["schema"] == results[1]["schema"]
+    assert results[0]["report"]["dropped_columns"] == {"orders": ["warehouse_bin"]}
+    relevant = [assemble_schema(bare, "DDL", q, render(q), budget=full - 3) for q in questions]
+    assert relevant[0]["schema"] != relevant[1]["schema"]
@@ -0,0 +1,58 @@
+import pytest
+
+from services.question_cache import QuestionCache, normalize_question, question_terms
+
+SCOPE = ("postgresql:abc", "v1")
+
+
+@pytest.fixture
+def cache():
+    return QuestionCache(enabled=True, threshold=0.9, max_size=8, max_scopes=2, ttl_seconds=3600)
+
+
+def test_exact_match_ignores_case_punctuation_and_accents(cache):
+    cache.store(SCOPE, "How many orders per customer?", "SELECT 1")
+    hit = cache.lookup(SCOPE, "  how many ORDERS per customer ")
+    assert hit == {"sql": "SELECT 1", "question": "How many orders per customer?", "similarity": 1.0}
+    assert normalize_question("Số lượng khách hàng?") == "so luong khach hang"
+
+
+def test_near_duplicate_with_the_same_content_words_hits(cache):
+    cache.store(SCOPE, "total revenue per product category", "SELECT 1")
+    hit = cache.lookup(SCOPE, "total revenue per product categories")
+    assert hit is not None and hit["sql"] == "SELECT 1"
+
+
+@pytest.mark.parametrize("stored, asked", [
+    ("customers who placed an order", "customers who never placed an order"),
+    ("total sales in the north region", "total sales in the south region"),
+    ("orders that were shipped", "orders that were not shipped"),
+    ("list products by price ascending", "list products by price descending"),
+    ("number of orders per customer", "number of customers per order"),
+    ("customers who bought from suppliers", "suppliers who bought from customers"),
+    ("average salary of managers older than employees", "average salary of employees older than managers"),
+])
+def test_negations_antonyms_and_swapped_words_never_match(cache, stored, asked):
+    cache.store(SCOPE, stored, "SELECT 1")
+    assert cache.lookup(SCOPE, asked) is None
+
+
+def test_different_numbers_never_match(cache):
+    cache.store(SCOPE, "top 5 customers by revenue", "SELECT 1")
+    assert cache.lookup(SCOPE, "top 10 customers by revenue") is None
+
+
+def test_scopes_are_isolated(cache):
+    cache.store(SCOPE, "count all orders", "SELECT 1")
+    assert cache.lookup(("postgresql:abc", "v2"), "count all orders") is None
+
+
+def test_content_words_keep_polarity_words():
+    assert "not" in question_terms("orders that were not shipped")
+    assert question_terms("show me the customers") == question_terms("list customer")
+
+
+def test_disabled_cache_stores_nothing():
+    cache = QuestionCache(enabled=False, threshold=0.9, max_size=8, max_scopes=2, ttl_seconds=3600)
+    cache.store(SCOPE, "count all orders", "SELECT 1")
+    assert cache.lookup(SCOPE, "count all orders") is None
@@ -0,0 +1,79 @@
+import pytest
+
+from core.profiling import profile_table_query, _RANGE_TYPE_HINTS
+from core.sampling import (
+    distinct_table_query, parse_row_estimate, plan_sampling, sampled_columns, sample_projection, type_matches,
+    TEXT_TYPE_HINTS, OPAQUE_TYPE_HINTS,
+)
+
+
+def _table(*columns):
+    return {
+        "tableIdentifier": "places",
+        "columns": [{"columnIdentifier": name, "columnType": column_type} for name, column_type in columns]
+    }
+
+
+def test_type_names_match_whole_words_only():
+    assert not type_matches("point", _RANGE_TYPE_HINTS)
+    assert not type_matches("interval", _RANGE_TYPE_HINTS)
+    assert type_matches("int4", _RANGE_TYPE_HINTS)
+    assert type_matches("BIGINT UNSIGNED", _RANGE_TYPE_HINTS)
+    assert type_matches("timestamp(3) with time zone", _RANGE_TYPE_HINTS)
+    assert type_matches("numeric(10,2)", _RANGE_TYPE_HINTS)
+
+
+def test_type_parameters_are_ignored():
+    assert type_matches("character varying(255)", TEXT_TYPE_HINTS)
+    assert not type_matches("enum('int','text')", _RANGE_TYPE_HINTS)
+    assert not type_matches("enum('int','text')", TEXT_TYPE_HINTS)
+
+
+def test_spatial_and_binary_columns_are_not_sampled():
+    table = _table(("id", "integer"), ("location", "point"), ("area", "polygon"), ("photo", "bytea"), ("name", "text"))
+    assert [column["columnIdentifier"] for column in sampled_columns(table)] == ["id", "name"]
+    assert all(type_matches(column_type, OPAQUE_TYPE_HINTS) for column_type in ("point", "polygon", "line", "bytea"))
+
+
+def test_profile_has_no_min_max_on_point_columns():
+    query = profile_table_query("postgresql", _table(("id", "integer"), ("location", "point")), 1000)
+    assert 'MIN("id")' in query
+    assert "location" not in query
+
+
+def test_sample_projection_truncates_text_only():
+    projection = sample_projection("postgresql", _table(("id", "integer"), ("name", "varchar(20)")), 100)
+    assert projection == '"id", SUBSTR(CAST("name" AS TEXT), 1, 100) AS "name"'
+
+
+@pytest.mark.parametrize("db_type", ["postgresql", "mysql", "sqlite"])
+@pytest.mark.parametrize("row_estimate", [None, 0, 500, 1000, 5000000])
+def test_every_plan_reads_a_bounded_source(db_type, row_estimate):
+    plan = plan_sampling(db_type, "orders", row_estimate, large_table_rows=1000, scan_rows=100)
+    assert "TABLESAMPLE" in plan["source"] or "LIMIT 100" in plan["source"]
+    query = distinct_table_query(db_type, ["id", "note"], 3, plan)
+    assert query.count(plan["source"]) == 2
+
+
+def test_unknown_size_counts_as_large():
+    plan = plan_sampling("postgresql", "orders", parse_row_estimate([{"row_estimate": -1}]), 1000, 100)
+    assert plan == {"strategy": "limit", "source": '(SELECT * FROM "orders" LIMIT 100) AS bounded', "random_order": False}
+    assert "RAND()" not in distinct_table_query("mysql", ["id"], 3, plan_sampling("mysql", "orders", None, 1000, 100))
+
+
+def test_known_small_table_is_shuffled_within_its_window():
+    plan = plan_sampling("mysql", "orders", 500, 1000, 100)
+    assert plan["strategy"] == "window"
+    assert "ORDER BY RAND() LIMIT 3" in distinct_table_query("mysql", ["id"], 3, plan)
+
+
+def test_large_postgres_table_uses_tablesample():
+    plan = plan_sampling("postgresql", "orders", 5000000, 1000, 100)
+    assert plan["source"] == '"orders" TABLESAMPLE SYSTEM (0.0020)'
+
+
+def test_row_estimate_parses_under_any_column_name():
+    assert parse_row_estimate([{"row_estimate": 42}]) == 42
+    assert parse_row_estimate([{"TABLE_ROWS": 42}]) == 42
+    assert parse_row_estimate([{"row_estimate": None}]) is None
+    assert parse_row_estimate([]) is None
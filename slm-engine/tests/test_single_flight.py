@@ -0,0 +1,126 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from services.single_flight import SingleFlight
+
+
+def _counting(result=None, error=None, delay=0.05):
+    calls = []
+
+    async def call():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        if error is not None:
+            raise error
+        return result
+
+    return call, calls
+
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight(name="test")
+    call, calls = _counting(result="sql")
+
+    async def main():
+        return await asyncio.gather(*(flight.ado("key", call) for _ in range(5)))
+
+    assert asyncio.run(main()) == ["sql"] * 5
+    assert len(calls) == 1
+    assert flight.get_stats() == {"name": "test", "in_flight": 0, "executed": 1, "coalesced": 4, "coalesced_rate": 0.8}
+
+
+def test_different_keys_and_later_calls_run_again():
+    flight = SingleFlight(name="test")
+    call, calls = _counting(result="sql", delay=0)
+
+    async def main():
+        await asyncio.gather(flight.ado("a", call), flight.ado("b", call))
+        await flight.ado("a", call)
+
+    asyncio.run(main())
+    assert len(calls) == 3
+
+
+def test_followers_receive_the_leaders_exception():
+    flight = SingleFlight(name="test")
+    error = ValueError("bad response")
+    call, calls = _counting(error=error)
+
+    async def main():
+        return await asyncio.gather(*(flight.ado("key", call) for _ in range(3)), return_exceptions=True)
+
+    assert asyncio.run(main()) == [error, error, error]
+    assert len(calls) == 1
+
+
+def test_follower_takes_over_when_the_leader_is_cancelled():
+    flight = SingleFlight(name="test")
+    call, calls = _counting(result="sql")
+
+    async def main():
+        leader = asyncio.ensure_future(flight.ado("key", call))
+        await asyncio.sleep(0.01)
+        follower = asyncio.ensure_future(flight.ado("key", call))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(main()) == "sql"
+    assert len(calls) == 2
+    assert flight.get_stats()["in_flight"] == 0
+
+
+def test_cancelled_follower_leaves_the_flight_running():
+    flight = SingleFlight(name="test")
+    call, calls = _counting(result="sql")
+
+    async def main():
+        leader = asyncio.ensure_future(flight.ado("key", call))
+        await asyncio.sleep(0.01)
+        follower = asyncio.ensure_future(flight.ado("key", call))
+        await asyncio.sleep(0.01)
+        follower.cancel()
+        return await leader
+
+    assert asyncio.run(main()) == "sql"
+    assert len(calls) == 1
+
+
+def test_threads_and_event_loops_coalesce():
+    flight = SingleFlight(name="test")
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def blocking_call():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "sql"
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.do("key", blocking_call)))
+    leader.start()
+    assert started.wait(5)
+
+    async def follower():
+        return await flight.ado("key", _counting(result="other")[0])
+
+    # A follower on another thread's event loop waits for the threaded leader
+    loop_thread = threading.Thread(target=lambda: results.append(asyncio.run(follower())))
+    loop_thread.start()
+    threaded_follower = threading.Thread(target=lambda: results.append(flight.do("key", blocking_call)))
+    threaded_follower.start()
+    deadline = time.monotonic() + 5
+    while flight.get_stats()["coalesced"] < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    release.set()
+    for thread in (leader, loop_thread, threaded_follower):
+        thread.join(5)
+
+    assert results == ["sql", "sql", "sql"]
+    assert len(calls) == 1
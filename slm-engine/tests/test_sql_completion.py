@@ -0,0 +1,41 @@
+import pytest
+
+from core.utils import complete_sql_statement
+
+
+@pytest.mark.parametrize("text", [
+    "I will select orders; then group them by customer.",
+    "We need to select customers; here is the query\nSELECT id FROM customers;",
+    "select customers;",
+    "SELECT id FROM orders WHERE note = 'a",
+    "SELECT id FROM orders",
+    "```sql\nSELECT id FROM orders;",
+    "<think>\nSELECT id FROM orders;\n",
+])
+def test_incomplete_or_prose_responses_are_not_complete(text):
+    assert complete_sql_statement(text) is None
+
+
+def test_closed_fence_is_complete_even_after_prose():
+    text = "I will select orders; grouping by customer.\n```sql\nSELECT customer_id, COUNT(*) FROM orders GROUP BY customer_id;\n```"
+    assert complete_sql_statement(text) == "SELECT customer_id, COUNT(*) FROM orders GROUP BY customer_id;"
+
+
+def test_semicolon_inside_a_literal_does_not_end_the_statement():
+    text = "SELECT id FROM notes WHERE body = 'a;b'; -- done"
+    assert complete_sql_statement(text) == "SELECT id FROM notes WHERE body = 'a;b';"
+
+
+def test_lead_in_ending_in_a_colon_is_allowed():
+    text = "Here is the query:\nSELECT name FROM customers;\nIt lists every customer."
+    assert complete_sql_statement(text) == "SELECT name FROM customers;"
+
+
+def test_with_query_is_recognised():
+    text = "WITH totals AS (SELECT customer_id, SUM(amount) AS total FROM orders GROUP BY customer_id)\nSELECT * FROM totals;"
+    assert complete_sql_statement(text) == text
+
+
+def test_statement_after_a_closed_think_block():
+    text = "<think>maybe select orders; or customers</think>\nSELECT id FROM orders;"
+    assert complete_sql_statement(text) == "SELECT id FROM orders;"
@@ -0,0 +1,129 @@
+import base64
+import json
+import os
+import sqlite3
+
+import pytest
+
+from enums.response_enum import ResponseEnum
+from exceptions.app_exception import AppException
+from services import sqlite_store as sqlite_store_module
+from services.sqlite_store import LocalSqliteStore, SqliteStore, sqlite_digest_scope, sqlite_payload_digest
+
+
+def _database(tmp_path, name, rows):
+    path = tmp_path / f"{name}.sqlite"
+    connection = sqlite3.connect(path)
+    connection.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT, data BLOB)")
+    connection.executemany("INSERT INTO items (name, data) VALUES (?, ?)", rows)
+    connection.commit()
+    connection.close()
+    return {"dbType": "sqlite", "file": path.read_bytes()}
+
+
+@pytest.fixture
+def store(tmp_path):
+    return LocalSqliteStore(directory=str(tmp_path / "store"), max_files=1, pool_size=2, query_timeout=5)
+
+
+def test_evicted_file_is_kept_until_its_leased_connections_return(tmp_path, store):
+    first = _database(tmp_path, "first", [("a", None)])
+    pool = store._pool_for(store.resolve(first))
+    connection = pool.acquire()
+
+    store.resolve(_database(tmp_path, "second", [("b", None)]))
+    assert os.path.exists(pool.path)
+    with pytest.raises(AppException) as error:
+        pool.acquire()
+    assert error.value.code == ResponseEnum.SQLITE_HANDLE_NOT_FOUND.code
+
+    assert connection.execute("SELECT name FROM items").fetchall() == [("a",)]
+    pool.release(connection)
+    assert not os.path.exists(pool.path)
+
+
+def test_evicted_handle_is_registered_again(tmp_path, store):
+    # Remember more handles than files, so the stale handle reaches the store
+    store.max_handles = 4
+    first = _database(tmp_path, "first", [("a", None)])
+    assert store.execute_for(first, "SELECT name FROM items") == {"data": [{"name": "a"}], "error": None}
+    store.resolve(_database(tmp_path, "second", [("b", None)]))
+
+    assert store.execute_for(first, "SELECT name FROM items")["data"] == [{"name": "a"}]
+    assert store.get_stats()["reregistrations"] == 1
+
+
+def test_same_upload_resolves_to_one_handle(tmp_path, store):
+    payload = _database(tmp_path, "first", [("a", None)])
+    handle = store.resolve(payload)
+    assert store.resolve({"dbType": "sqlite", "file": bytes(payload["file"])}) == handle
+    stats = store.get_stats()
+    assert stats["registrations"] == 1 and stats["reuses"] == 1
+
+
+def test_digest_is_memoized_only_inside_a_scope():
+    payload = {"file": base64.b64encode(b"not really sqlite").decode("ascii")}
+    with sqlite_digest_scope():
+        digest = sqlite_payload_digest(payload)
+        assert sqlite_payload_digest(payload) == digest
+        assert len(sqlite_store_module._digest_memo.get()) == 1
+    assert sqlite_store_module._digest_memo.get() is None
+    assert sqlite_payload_digest(payload) == digest
+    assert sqlite_payload_digest({"file": payload["file"] + "A"}) != digest
+
+
+def test_blobs_are_base64_encoded(tmp_path, store):
+    payload = _database(tmp_path, "first", [("a", b"\x00\xffdata")])
+    result = store.execute_for(payload, "SELECT name, data FROM items")
+    assert result == {"data": [{"name": "a", "data": base64.b64encode(b"\x00\xffdata").decode("ascii")}], "error": None}
+    assert json.dumps(result)
+
+
+def test_long_query_times_out_without_failing_the_batch(tmp_path, store):
+    payload = _database(tmp_path, "first", [("a", None)])
+    endless = "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n) SELECT COUNT(*) FROM n"
+    results = store.execute_batch_for(payload, [endless, "SELECT COUNT(*) AS c FROM items"], timeout=0.2)
+    assert results[0]["data"] is None and "timed out" in results[0]["error"]
+    assert results[1] == {"data": [{"c": 1}], "error": None}
+    assert store.get_stats()["timeouts"] == 1
+
+
+class _ForgetfulStore(SqliteStore):
+    """Store whose backend loses handles, like an embed service restart."""
+
+    def __init__(self, lose_every_handle=False):
+        super().__init__()
+        self.lose_every_handle = lose_every_handle
+        self.registered = []
+
+    def register(self, file_bytes):
+        self.registered.append(file_bytes)
+        return f"handle-{len(self.registered)}"
+
+    def get_schema(self, handle):
+        return self.execute(handle, "schema")
+
+    def execute(self, handle, sql_query):
+        if self.lose_every_handle or handle == "handle-1":
+            raise AppException(ResponseEnum.SQLITE_HANDLE_NOT_FOUND)
+        return {"data": [{"handle": handle}], "error": None}
+
+    def execute_batch(self, handle, sql_queries, timeout=None):
+        return [self.execute(handle, sql_query) for sql_query in sql_queries]
+
+
+def test_lost_handle_is_registered_again():
+    store = _ForgetfulStore()
+    payload = {"file": b"sqlite bytes"}
+    assert store.execute_for(payload, "SELECT 1") == {"data": [{"handle": "handle-2"}], "error": None}
+    assert store.execute_for(payload, "SELECT 1") == {"data": [{"handle": "handle-2"}], "error": None}
+    assert store.registered == [b"sqlite bytes", b"sqlite bytes"]
+    assert store.get_stats()["reregistrations"] == 1
+
+
+def test_lost_handle_is_retried_only_once():
+    store = _ForgetfulStore(lose_every_handle=True)
+    with pytest.raises(AppException) as error:
+        store.execute_for({"file": b"sqlite bytes"}, "SELECT 1")
+    assert error.value.code == ResponseEnum.SQLITE_HANDLE_NOT_FOUND.code
+    assert len(store.registered) == 2